@@ -0,0 +1,36 @@
+"""
+Microbenchmark of the authenticated request path: get_current_user with the principal
+already cached in the worker, with and without the cache of verified tokens.
+
+    python -m benchmarks.auth_path [iterations]
+"""
+import asyncio
+import sys
+import time
+
+from src.database.models import UserRole
+from src.services import auth
+from src.services.auth import auth_token, auth_user
+from src.services.principals import Principal, principal_cache
+from src.services.token_cache import VerifiedTokens
+
+
+async def measure(iterations: int, token: str) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await auth_user.get_current_user(token, db=None)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def main(iterations: int):
+    principal = Principal(1, "bench@example.com", "bench", UserRole.user, True)
+    principal_cache.local.set(principal.email, principal)
+    token = await auth_token.create_access_token(data={"sub": principal.email})
+    for name, size in (("jwt.decode on every request", 0), ("verified token cache", 10000)):
+        auth.verified_tokens = VerifiedTokens(size)
+        await measure(1000, token)
+        print(f"{name:>28}: {await measure(iterations, token):8.2f} us per request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,49 @@
+"""
+Compares bcrypt and argon2id with the configured costs: time of one login, logins per second
+on as many threads as the password hashing pool has, and how much the peak memory of the process
+grows while that many logins run at once.
+
+    python -m benchmarks.password_hashing [logins]
+"""
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from src.conf.config import settings
+from src.services.auth import password_context
+
+
+PASSWORD = "benchmark password"
+
+
+def peak_rss_kib() -> int:
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(name: str, context: CryptContext, logins: int):
+    stored = context.hash(PASSWORD)
+    start = time.perf_counter()
+    context.verify(PASSWORD, stored)
+    single = (time.perf_counter() - start) * 1000
+
+    rss = peak_rss_kib()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(settings.password_hash_workers) as pool:
+        list(pool.map(lambda _: context.verify(PASSWORD, stored), range(logins)))
+    throughput = logins / (time.perf_counter() - start)
+    growth = peak_rss_kib() - rss
+
+    print(f"{name:>10}: {single:7.1f} ms per login, {throughput:6.1f} logins/s, "
+          f"peak memory +{growth / 1024:.1f} MiB with {settings.password_hash_workers} logins at once")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    # bcrypt first: argon2 raises the peak RSS, which would hide the small memory of bcrypt.
+    run("bcrypt", CryptContext(schemes=["bcrypt"]), count)
+    run("argon2id", password_context(settings.argon2_time_cost, settings.argon2_memory_cost,
+                                     settings.argon2_parallelism), count)
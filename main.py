@@ -3,16 +3,16 @@
 # import base64
 # import binascii
 import time
+from contextlib import asynccontextmanager
 from ipaddress import ip_address
 from typing import Callable
 
-import redis.asyncio as redis
 import uvicorn
 from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse, HTMLResponse
 # from starlette.authentication import AuthenticationBackend, AuthenticationError, AuthCredentials, SimpleUser
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 # from starlette.authentication import AuthenticationBackend
 # from starlette.middleware.authentication import AuthenticationMiddleware
@@ -24,26 +24,45 @@ from fastapi.staticfiles import StaticFiles
 # SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # sys.path.append(os.path.dirname(SCRIPT_DIR))
 # from src.repositories.users import AuthServices
-from src.database.connection import get_db
+from src.database.connection import get_db, SessionLocal
+from src.database.redis_pool import redis_pool
 # from src.database.models import BanList
-from src.routes import images, auth, users, rating, images_tags, images_comments, images_search, users_accounts
+from src.routes import images, auth, users, rating, images_tags, images_comments, images_search, users_accounts, admin
+from src.routes import files
 from src.conf.config import settings
 from src.services.tasks import remove_tokens
+from src.services.principals import principal_cache
+from src.services.ban_list_redis import auth_ban_list
+from src.services.storage import storage
 # from src.conf import messages
 
 
-app = FastAPI()
-
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    The lifespan function opens the shared Redis connection pool before the first request
+    and closes it on shutdown. The rate limiter, the caches and the ban list all use this pool.
+    The connections of the file storage are closed on shutdown as well.
 
-@app.on_event("startup")
-async def startup():
-    db = next(get_db())
-    r_t = await remove_tokens(db)
+    :param _: FastAPI: The application
+    :return: None
+    :doc-author: Trelent
+    """
+    async with SessionLocal() as db:
+        r_t = await remove_tokens(db)
     print(r_t)
-    red = await redis.Redis(host=settings.redis_host, port=settings.redis_port,
-                            password=settings.redis_password,
-                            db=0, encoding="utf-8", decode_responses=True)
+    red = redis_pool.connect()
     await FastAPILimiter.init(red)
+    principal_cache.start()
+    auth_ban_list.start()
+    yield
+    await auth_ban_list.stop()
+    await principal_cache.stop()
+    await redis_pool.close()
+    await storage.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 origins = [
@@ -199,17 +218,17 @@ async def root(request: Request):
 
 
 @app.get("/api/healthchecker")
-def healthchecker(db: Session = Depends(get_db)):
+async def healthchecker(db: AsyncSession = Depends(get_db)):
     """
     The healthchecker function is a simple function that checks the database connection.
     It returns a JSON object with the message &quot;Welcome to FastAPI&quot; if everything is working correctly.
 
-    :param db: Session: Get the database session from the dependency
+    :param db: AsyncSession: Get the database session from the dependency
     :return: A dictionary with a message
     :doc-author: Trelent
     """
     try:
-        result = db.execute(text("SELECT 1")).fetchone()
+        result = (await db.execute(text("SELECT 1"))).fetchone()
         if not result:
             raise HTTPException(status_code=500, detail="Database is not configured correctly")
         return {"message": "Welcome to FastAPI"}
@@ -226,6 +245,8 @@ app.include_router(images_comments.router, prefix="/api")
 app.include_router(images_tags.router, prefix="/api")
 app.include_router(rating.router, prefix="/api")
 app.include_router(images_search.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+app.include_router(files.router, prefix="/api")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,33 @@
+"""image rating aggregate
+
+Revision ID: 5f0c2d7e9a41
+Revises: 2c4ebc9762c5
+Create Date: 2026-10-18 10:12:04.318215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0c2d7e9a41'
+down_revision: Union[str, None] = '2c4ebc9762c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('images', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('images', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE images SET "
+        "rating_sum = COALESCE((SELECT SUM(ratings.rate) FROM ratings WHERE ratings.image_id = images.id), 0), "
+        "rating_count = (SELECT COUNT(ratings.id) FROM ratings WHERE ratings.image_id = images.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('images', 'rating_count')
+    op.drop_column('images', 'rating_sum')
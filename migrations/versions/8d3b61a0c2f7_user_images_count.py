@@ -0,0 +1,29 @@
+"""user images count
+
+Revision ID: 8d3b61a0c2f7
+Revises: 5f0c2d7e9a41
+Create Date: 2026-10-18 11:02:47.906133
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3b61a0c2f7'
+down_revision: Union[str, None] = '5f0c2d7e9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('images_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE users SET images_count = (SELECT COUNT(images.id) FROM images WHERE images.user_id = users.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'images_count')
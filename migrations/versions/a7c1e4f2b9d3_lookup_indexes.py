@@ -0,0 +1,45 @@
+"""lookup indexes
+
+Revision ID: a7c1e4f2b9d3
+Revises: 8d3b61a0c2f7
+Create Date: 2026-10-18 14:21:05.318620
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c1e4f2b9d3'
+down_revision: Union[str, None] = '8d3b61a0c2f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Duplicates would break the unique indexes; keep the earliest row of each pair.
+    op.execute("DELETE FROM ratings WHERE id NOT IN (SELECT MIN(id) FROM ratings GROUP BY image_id, user_id)")
+    op.execute("DELETE FROM tag_images WHERE id NOT IN (SELECT MIN(id) FROM tag_images GROUP BY image_id, tag_id)")
+    op.execute(
+        "UPDATE images SET "
+        "rating_sum = COALESCE((SELECT SUM(ratings.rate) FROM ratings WHERE ratings.image_id = images.id), 0), "
+        "rating_count = (SELECT COUNT(ratings.id) FROM ratings WHERE ratings.image_id = images.id)"
+    )
+    op.create_index('ix_ratings_image_id_user_id', 'ratings', ['image_id', 'user_id'], unique=True)
+    op.create_index('ix_tag_images_image_id_tag_id', 'tag_images', ['image_id', 'tag_id'], unique=True)
+    op.create_index('ix_tag_images_tag_id', 'tag_images', ['tag_id'])
+    op.create_index('ix_comment_images_image_id', 'comment_images', ['image_id', 'comment_id'])
+    op.create_index('ix_images_user_id_created_at', 'images', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_ban_lists_access_token', 'ban_lists', ['access_token'])
+    op.create_index('ix_accounts_username', 'accounts', ['username'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_accounts_username', table_name='accounts')
+    op.drop_index('ix_ban_lists_access_token', table_name='ban_lists')
+    op.drop_index('ix_images_user_id_created_at', table_name='images')
+    op.drop_index('ix_comment_images_image_id', table_name='comment_images')
+    op.drop_index('ix_tag_images_tag_id', table_name='tag_images')
+    op.drop_index('ix_tag_images_image_id_tag_id', table_name='tag_images')
+    op.drop_index('ix_ratings_image_id_user_id', table_name='ratings')
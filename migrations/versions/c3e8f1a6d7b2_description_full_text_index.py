@@ -0,0 +1,29 @@
+"""description full text index
+
+Revision ID: c3e8f1a6d7b2
+Revises: a7c1e4f2b9d3
+Create Date: 2026-10-18 16:40:12.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8f1a6d7b2'
+down_revision: Union[str, None] = 'a7c1e4f2b9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_images_description_fts', 'images', [sa.text("to_tsvector('simple', description)")],
+                        postgresql_using='gin')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_images_description_fts', table_name='images')
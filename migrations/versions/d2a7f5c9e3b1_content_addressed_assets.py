@@ -0,0 +1,44 @@
+"""content addressed assets
+
+Revision ID: d2a7f5c9e3b1
+Revises: e5b9a2d4c1f8
+Create Date: 2026-10-18 16:24:51.370218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7f5c9e3b1'
+down_revision: Union[str, None] = 'e5b9a2d4c1f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('assets',
+                    sa.Column('sha256', sa.String(length=64), nullable=False),
+                    sa.Column('public_id', sa.String(length=255), nullable=False),
+                    sa.Column('origin_path', sa.String(length=255), nullable=False),
+                    sa.Column('refs', sa.Integer(), server_default='1', nullable=False),
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('created_at', sa.DateTime(), nullable=True),
+                    sa.Column('updated_at', sa.DateTime(), nullable=True),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ix_assets_sha256', 'assets', ['sha256'], unique=True)
+    # Images uploaded before keep asset_id NULL: their content was never hashed, they own their file alone.
+    op.add_column('images', sa.Column('asset_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('images_asset_id_fkey', 'images', 'assets', ['asset_id'], ['id'])
+    op.create_index('ix_images_asset_id', 'images', ['asset_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_images_asset_id', table_name='images')
+    op.drop_constraint('images_asset_id_fkey', 'images', type_='foreignkey')
+    op.drop_column('images', 'asset_id')
+    op.drop_index('ix_assets_sha256', table_name='assets')
+    op.drop_table('assets')
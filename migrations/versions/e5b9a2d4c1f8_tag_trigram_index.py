@@ -0,0 +1,29 @@
+"""tag trigram index
+
+Revision ID: e5b9a2d4c1f8
+Revises: c3e8f1a6d7b2
+Create Date: 2026-10-18 18:05:44.120957
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9a2d4c1f8'
+down_revision: Union[str, None] = 'c3e8f1a6d7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_tags_tag_trgm', 'tags', ['tag'], postgresql_using='gin',
+                        postgresql_ops={'tag': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == 'postgresql':
+        op.drop_index('ix_tags_tag_trgm', table_name='tags')
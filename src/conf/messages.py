@@ -28,3 +28,9 @@ NOT_YOUR_IMAGE = "You do not have permission to edit or delete this image"
 ACCOUNT_EXISTS = "Account already exists"
 LOGOUT = "Logout successful"
 NO_FOLDER = "There is not a user's folder in Cloudinary"
+FILE_TOO_LARGE = "The image is too large"
+NOT_AN_IMAGE = "Only PNG, JPEG, GIF and WebP images can be uploaded"
+CLOUD_UNAVAILABLE = "The image storage is not available, please try again later"
+INVALID_CURSOR = "Invalid pagination cursor"
+CACHE_UNAVAILABLE = "The search cache is not available"
+SERVER_BUSY = "The server is busy, please try again later"
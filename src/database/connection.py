@@ -1,31 +1,109 @@
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException, status
 
 from src.conf.config import settings
+from src.database.metrics import MeasuredQueuePool, log_slow_queries
 
 
 url = settings.sqlalchemy_database_url
 
-engine = create_engine(url, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def build_engine(db_url: str) -> AsyncEngine:
+    pool_options = {} if db_url.startswith("sqlite") else dict(poolclass=MeasuredQueuePool,
+                                                               pool_size=settings.db_pool_size,
+                                                               max_overflow=settings.db_max_overflow,
+                                                               pool_timeout=settings.db_pool_timeout,
+                                                               pool_pre_ping=settings.db_pool_pre_ping,
+                                                               pool_recycle=settings.db_pool_recycle)
+    new_engine = create_async_engine(db_url, echo=settings.db_echo, **pool_options)
+    log_slow_queries(new_engine.sync_engine, settings.db_slow_query_ms)
+    return new_engine
 
-def get_db():
+
+class ReplicaRouter:
+    def __init__(self, engines: list[AsyncEngine], weights: list[int]):
+        """
+        The __init__ function stores the replica engines together with their weights.
+        Replicas without an explicit weight get a weight of 1.
+
+        :param self: Represent the instance of the class
+        :param engines: list[AsyncEngine]: Engines of the read replicas
+        :param weights: list[int]: Relative capacity of each replica
+        :return: None
+        :doc-author: Trelent
+        """
+        self.engines = engines
+        self.weights = [weights[i] if i < len(weights) else 1 for i in range(len(engines))]
+        self._turn = 0
+
+    @staticmethod
+    def load(replica: AsyncEngine) -> int:
+        pool = replica.pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+    def choose(self) -> AsyncEngine | None:
+        """
+        The choose function picks the least loaded replica: the one with the fewest checked out
+        connections per unit of weight. The scan starts from a rotating position, so idle replicas
+        with equal weights share the traffic evenly.
+
+        :param self: Represent the instance of the class
+        :return: The engine of the chosen replica or None when no replicas are configured
+        :doc-author: Trelent
+        """
+        if not self.engines:
+            return None
+        self._turn = (self._turn + 1) % len(self.engines)
+        order = list(range(self._turn, len(self.engines))) + list(range(self._turn))
+        best = min(order, key=lambda i: (self.load(self.engines[i]) + 1) / self.weights[i])
+        return self.engines[best]
+
+    def serves(self, db: AsyncSession) -> bool:
+        return db.bind in self.engines
+
+
+engine = build_engine(url)
+replica_router = ReplicaRouter([build_engine(replica_url) for replica_url in settings.sqlalchemy_replica_urls],
+                               settings.sqlalchemy_replica_weights)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autocommit=False, autoflush=False,
+                                  expire_on_commit=False)
+
+
+async def get_db():
     """
-    The get_db function is a context manager that returns the database session.
+    The get_db function is an async generator that returns the database session.
     It also handles any exceptions that may occur during the session, and closes
     the connection when it's done.
 
-    :return: A database session
+    :return: An async database session
     :doc-author: Trelent
     """
     db = SessionLocal()
     try:
         yield db
     except SQLAlchemyError as error:
-        db.rollback()
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(error))
+    finally:
+        await db.close()
+
+
+async def get_read_db():
+    """
+    The get_read_db function returns a session bound to a read replica for read-only routes.
+    Writes and read-after-write paths must keep using get_db, which always targets the primary.
+    Without configured replicas the session is bound to the primary as well.
+
+    :return: An async database session
+    :doc-author: Trelent
+    """
+    replica = replica_router.choose()
+    db = SessionLocal(bind=replica) if replica else SessionLocal()
+    try:
+        yield db
+    except SQLAlchemyError as error:
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(error))
     finally:
-        db.close()
+        await db.close()
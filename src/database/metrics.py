@@ -0,0 +1,86 @@
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.slow_queries = 0
+
+    def observe_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool) -> dict:
+        """
+        The snapshot function combines the live state of a queue pool with the
+        counters collected since the application started.
+
+        :param self: Represent the instance of the class
+        :param pool: The pool of the engine to report on
+        :return: A dictionary ready to be returned as a response
+        :doc-author: Trelent
+        """
+        live = {"size": pool.size(), "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(), "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow} if isinstance(pool, AsyncAdaptedQueuePool) else {}
+        return {"pool": type(pool).__name__,
+                **live,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                "wait_max_ms": self.wait_max * 1000,
+                "slow_queries": self.slow_queries}
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.observe_wait(time.perf_counter() - start)
+
+
+def log_slow_queries(engine, threshold_ms: int):
+    """
+    The log_slow_queries function attaches cursor listeners to the engine and logs
+    every statement which takes longer than the threshold.
+
+    :param engine: The sync engine behind the async one
+    :param threshold_ms: int: Statements slower than this are logged; 0 disables logging
+    :return: None
+    :doc-author: Trelent
+    """
+    if threshold_ms <= 0:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        if duration >= threshold_ms:
+            pool_metrics.slow_queries += 1
+            logger.warning("Slow query (%.1f ms): %s", duration, statement)
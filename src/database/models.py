@@ -1,10 +1,10 @@
 import enum
 
-from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Enum, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Enum, ForeignKey, Float, func, select
+from sqlalchemy import Index, Table, MetaData, DDL, event, text
+from sqlalchemy import case, cast
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.orm import declarative_base, relationship
-
-from src.database.connection import SessionLocal
+from sqlalchemy.orm import declarative_base, relationship, column_property
 
 
 Base = declarative_base()
@@ -35,6 +35,7 @@ class User(BaseModel):
     refresh_token = Column(String(255), nullable=True)
     roles = Column("roles", Enum(UserRole), default=UserRole.user)
     confirmed = Column(Boolean, default=False)
+    images_count = Column(Integer, nullable=False, default=0, server_default="0")
     # created_at = Column(DateTime, default=func.now())
     # updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     images = relationship("Image", backref="users")
@@ -44,6 +45,7 @@ class User(BaseModel):
 
 class Account(BaseModel):
     __tablename__ = "accounts"
+    __table_args__ = (Index("ix_accounts_username", "username"),)
 
     # id = Column(Integer, primary_key=True)
     username = Column(String, ForeignKey("users.username"))
@@ -59,25 +61,34 @@ class Account(BaseModel):
     # created_at = Column(DateTime, default=func.now())
     # updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
-    @hybrid_property
-    def images_quantity(self):
-        db = SessionLocal()
-        user = db.query(User).filter(User.username == self.username).first()
-        if user:
-            quantity = db.query(func.count(Image.user_id)).filter(Image.user_id == user.id)
-            return quantity.scalar()
+
+class Asset(BaseModel):
+    __tablename__ = "assets"
+    __table_args__ = (Index("ix_assets_sha256", "sha256", unique=True),)
+
+    sha256 = Column(String(64), nullable=False)
+    public_id = Column(String(255), nullable=False)
+    origin_path = Column(String(255), nullable=False)
+    refs = Column(Integer, nullable=False, default=1, server_default="1")
 
 
 class Image(BaseModel):
     __tablename__ = "images"
+    __table_args__ = (Index("ix_images_user_id_created_at", "user_id", "created_at", "id"),
+                      Index("ix_images_asset_id", "asset_id"),
+                      Index("ix_images_description_fts", text("to_tsvector('simple', description)"),
+                            postgresql_using="gin").ddl_if(dialect="postgresql"))
 
     # id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
+    asset_id = Column(Integer, ForeignKey("assets.id"), nullable=True)
     description = Column(String(50), nullable=False)
     public_id = Column(String(255), nullable=False)
     origin_path = Column(String(255), nullable=False)
     transformed_path = Column(String(255), nullable=True)
     slug = Column(String(255), nullable=True)
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
     # created_at = Column(DateTime, default=func.now())
     # updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     comments = relationship("Comment", secondary="comment_images", backref="images")
@@ -86,13 +97,14 @@ class Image(BaseModel):
 
     @hybrid_property
     def rating(self):
-        db = SessionLocal()
-        query = func.sum(Rating.rate) / func.count(Rating.user_id)
-        result = db.query(query).filter(Rating.image_id == self.id).first()
-        if result[0]:
-            return float(result[0])
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
         return 0
 
+    @rating.expression
+    def rating(cls):
+        return case((cls.rating_count > 0, cast(cls.rating_sum, Float) / cls.rating_count), else_=0.0)
+
 
 class Comment(BaseModel):
     __tablename__ = "comments"
@@ -109,11 +121,14 @@ class Tag(BaseModel):
 
     # id = Column(Integer, primary_key=True)
     tag = Column(String(50), nullable=False, unique=True)
+    # On Postgres the column also has a pg_trgm GIN index, ix_tags_tag_trgm. It is created
+    # by the migration only, because it depends on the extension being installed.
     # created_at = Column(DateTime, default=func.now())
 
 
 class CommentToImage(BaseModel):
     __tablename__ = "comment_images"
+    __table_args__ = (Index("ix_comment_images_image_id", "image_id", "comment_id"),)
 
     # id = Column(Integer, primary_key=True)
     image_id = Column(Integer, ForeignKey("images.id"), nullable=False)
@@ -122,6 +137,8 @@ class CommentToImage(BaseModel):
 
 class TagToImage(BaseModel):
     __tablename__ = "tag_images"
+    __table_args__ = (Index("ix_tag_images_image_id_tag_id", "image_id", "tag_id", unique=True),
+                      Index("ix_tag_images_tag_id", "tag_id"))
 
     # id = Column(Integer, primary_key=True)
     tag_id = Column(Integer, ForeignKey("tags.id"), nullable=False)
@@ -130,6 +147,7 @@ class TagToImage(BaseModel):
 
 class Rating(BaseModel):
     __tablename__ = "ratings"
+    __table_args__ = (Index("ix_ratings_image_id_user_id", "image_id", "user_id", unique=True),)
 
     # id = Column(Integer, primary_key=True)
     image_id = Column(Integer, ForeignKey("images.id"))
@@ -140,6 +158,39 @@ class Rating(BaseModel):
 
 class BanList(BaseModel):
     __tablename__ = "ban_lists"
+    __table_args__ = (Index("ix_ban_lists_access_token", "access_token"),)
 
     access_token = Column(String(255), nullable=False)
     reason = Column(String(50), default="logout")
+
+
+# Reads the maintained counter of the account owner within the same SELECT as the account.
+Account.images_quantity = column_property(
+    select(User.images_count)
+    .where(User.username == Account.username)
+    .correlate_except(User)
+    .scalar_subquery()
+)
+
+
+# SQLite has no tsvector, so full-text search there goes through an FTS5 index
+# kept in sync with images.description by triggers. It lives in its own metadata,
+# the table is created and dropped together with the images table.
+images_fts = Table("images_fts", MetaData(),
+                   Column("rowid", Integer, primary_key=True),
+                   Column("description", String),
+                   Column("rank", Float))
+
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5(description, content='images', content_rowid='id')",
+    "CREATE TRIGGER images_fts_insert AFTER INSERT ON images BEGIN "
+    "INSERT INTO images_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER images_fts_delete AFTER DELETE ON images BEGIN "
+    "INSERT INTO images_fts(images_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER images_fts_update AFTER UPDATE OF description ON images BEGIN "
+    "INSERT INTO images_fts(images_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO images_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO images_fts(images_fts) VALUES ('rebuild')",
+):
+    event.listen(Image.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Image.__table__, "before_drop", DDL("DROP TABLE IF EXISTS images_fts").execute_if(dialect="sqlite"))
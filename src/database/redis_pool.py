@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis, ConnectionPool
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class RedisPool:
+    def __init__(self):
+        """
+        The __init__ function creates an empty holder for the Redis client shared by the application.
+        The client is created in the lifespan of the application and reused by every component.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Trelent
+        """
+        self.client: Redis | None = None
+        self.loop = None
+
+    def connect(self) -> Redis:
+        """
+        The connect function creates the connection pool and the client on the running event loop.
+
+        :param self: Represent the instance of the class
+        :return: The client
+        :doc-author: Trelent
+        """
+        pool = ConnectionPool(host=settings.redis_host,
+                              port=settings.redis_port,
+                              password=settings.redis_password,
+                              db=0,
+                              max_connections=settings.redis_max_connections,
+                              socket_timeout=settings.redis_socket_timeout,
+                              socket_connect_timeout=settings.redis_socket_connect_timeout,
+                              health_check_interval=settings.redis_health_check_interval)
+        self.client = Redis(connection_pool=pool)
+        self.loop = asyncio.get_running_loop()
+        return self.client
+
+    def get(self) -> Redis:
+        """
+        The get function returns the shared client. Connections of asyncio belong to the event loop
+        which opened them, so code running on another loop, e.g. a celery task or a test, gets its own pool.
+
+        :param self: Represent the instance of the class
+        :return: The client
+        :doc-author: Trelent
+        """
+        if self.client is None or self.loop is not asyncio.get_running_loop():
+            return self.connect()
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            await self.client.connection_pool.disconnect()
+            self.client = None
+            self.loop = None
+
+
+redis_pool = RedisPool()
+
+
+async def subscribe(channel: str, on_message: Callable[[bytes], None],
+                    on_subscribe: Callable[[], Awaitable[None]] | None = None,
+                    on_disconnect: Callable[[], None] | None = None):
+    """
+    The subscribe function delivers the messages of a channel for the lifetime of the application.
+    Messages published while the subscription was lost are gone, so the hooks let the caller
+    distrust its state on disconnect and rebuild it once the subscription is back.
+
+    :param channel: str: The channel to listen to
+    :param on_message: Callable[[bytes], None]: Called with the data of every message
+    :param on_subscribe: Callable[[], Awaitable[None]] | None: Awaited after every (re)subscription
+    :param on_disconnect: Callable[[], None] | None: Called when the subscription is lost
+    :return: None
+    :doc-author: Trelent
+    """
+    while True:
+        try:
+            async with redis_pool.get().pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(channel)
+                if on_subscribe is not None:
+                    await on_subscribe()
+                while True:
+                    # A blocking read would hit the socket timeout of the pool, so wait in short polls.
+                    message = await pubsub.get_message(timeout=1)
+                    if message is not None:
+                        on_message(message["data"])
+        except RedisError as error:
+            logger.warning("Subscription to %s is lost: %s", channel, error)
+            if on_disconnect is not None:
+                on_disconnect()
+            await asyncio.sleep(1)
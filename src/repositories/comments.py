@@ -1,69 +1,64 @@
-from typing import List, Type
+from typing import Type
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import Comment, CommentToImage
 from src.database.models import User
 from src.schemes.comments import CommentModel
 from src.repositories.images import ImageServices
+from src.repositories.pagination import paginate
+from src.schemes.pagination import Page
 
 
 class CommentServices:
     @staticmethod
-    async def get_comments(image_id: int, limit: int, offset: int, db: Session) -> List[Type[Comment]]:
-        comment_ids = await get_image_comments_ids(image_id, db)
-        comment_ids = [comm.comment_id for comm in comment_ids]
-        comments = db.query(Comment).filter(Comment.id.in_(comment_ids)).limit(limit).offset(offset).all()
-        return comments
+    async def get_comments(image_id: int, cursor: str | None, limit: int, db: AsyncSession) -> Page:
+        stmt = select(Comment).join(CommentToImage, CommentToImage.comment_id == Comment.id)\
+            .filter(CommentToImage.image_id == image_id)
+        return await paginate(stmt, Comment, cursor, limit, db)
 
     @staticmethod
-    async def get_comment(comment_id: int, db: Session) -> Type[Comment] | None:
-        return db.query(Comment).filter(Comment.id == comment_id).first()
+    async def get_comment(comment_id: int, db: AsyncSession) -> Type[Comment] | None:
+        return await db.scalar(select(Comment).filter(Comment.id == comment_id))
 
     @staticmethod
-    async def create_comment(body: CommentModel, user: User, db: Session) -> Comment:
-        user_images = await ImageServices.get_all_images(user.id, db)
-        if user_images and body.image_id not in [user_image.id for user_image in user_images]:
+    async def create_comment(body: CommentModel, user: User, db: AsyncSession) -> Comment:
+        own_image = await ImageServices.check_image_owner(body.image_id, user, db)
+        if not own_image:
             comment = Comment(comment=body.content, user_id=user.id)
             db.add(comment)
-            db.commit()
-            db.refresh(comment)
-            await create_record(comment.id, body.image_id, db)
-            return comment
-        if not user_images:
-            comment = Comment(comment=body.content, user_id=user.id)
-            db.add(comment)
-            db.commit()
-            db.refresh(comment)
+            await db.commit()
+            await db.refresh(comment)
             await create_record(comment.id, body.image_id, db)
             return comment
 
     @staticmethod
-    async def update_comment(new_comment: str, comment_id: int, db: Session) -> Type[Comment] | None:
-        comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    async def update_comment(new_comment: str, comment_id: int, db: AsyncSession) -> Type[Comment] | None:
+        comment = await db.scalar(select(Comment).filter(Comment.id == comment_id))
         if len(new_comment) > 2:
             comment.comment = new_comment
-            db.commit()
-            db.refresh(comment)
+            await db.commit()
+            await db.refresh(comment)
             return comment
 
     @staticmethod
-    async def delete_comment(comment_id: int, db: Session) -> Type[Comment] | None:
-        comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    async def delete_comment(comment_id: int, db: AsyncSession) -> Type[Comment] | None:
+        comment = await db.scalar(select(Comment).filter(Comment.id == comment_id))
         if comment:
-            db.delete(comment)
-            db.commit()
+            await db.delete(comment)
+            await db.commit()
         return comment
 
 
-async def create_record(comment_id: int, image_id: int, db: Session):
+async def create_record(comment_id: int, image_id: int, db: AsyncSession):
     new_record = CommentToImage(image_id=image_id, comment_id=comment_id)
     db.add(new_record)
-    db.commit()
-    db.refresh(new_record)
+    await db.commit()
+    await db.refresh(new_record)
     return new_record
 
 
-async def get_image_comments_ids(image_id: int, db: Session):
-    comment_ids = db.query(CommentToImage).filter_by(image_id=image_id).all()
+async def get_image_comments_ids(image_id: int, db: AsyncSession):
+    comment_ids = (await db.scalars(select(CommentToImage).filter_by(image_id=image_id))).all()
     return comment_ids
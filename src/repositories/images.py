@@ -1,96 +1,330 @@
-from typing import Type
+import logging
+from typing import Type, List, Sequence
 
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import select, update, delete, func, Select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+from src.conf import messages
+from src.services.cloud_client import CloudError
 from src.services.cloud_image import CloudImage
-from src.database.models import User, Image
-from src.schemes.images import ImageResponse
+from src.services.upload import UploadStream
+from src.database.models import User, Image, Asset
+from src.schemes.images import ImageResponse, ImageTagsResponse
+from src.schemes.pagination import Page
+from src.repositories.pagination import paginate, KEYSET
+from src.services import search_cache as cache
+from src.services.search_cache import search_cache
+
+
+logger = logging.getLogger(__name__)
+
+ASSET_ATTEMPTS = 3
+
+image_list = TypeAdapter(List[ImageResponse])
+image_tags_list = TypeAdapter(List[ImageTagsResponse])
 
 
 class ImageServices:
     @staticmethod
-    async def upload_file(file, description: str, user: User, db: Session):
-        public_id = CloudImage.generate_file_name(user.username)
-        res = CloudImage.upload(file.file, public_id)
-        scr_url = CloudImage.get_url_for_avatar(public_id, res)
-        image = Image(user_id=user.id, description=description, public_id=public_id, origin_path=scr_url)
+    async def upload_file(file, description: str, user: User, db: AsyncSession):
+        stream = UploadStream(file)
+        await stream.check()
+        sha256 = await stream.digest()
+        asset = await acquire_asset(sha256, db)
+        if asset is None:
+            public_id = CloudImage.generate_asset_name(sha256)
+            res = await CloudImage.upload(stream, public_id)
+            scr_url = CloudImage.get_url_for_avatar(public_id, res)
+            asset = await add_asset(sha256, public_id, scr_url, db)
+        image = Image(user_id=user.id, description=description, public_id=asset.public_id,
+                      origin_path=asset.origin_path, asset_id=asset.id)
         db.add(image)
-        db.commit()
-        db.refresh(image)
+        await change_images_count(user.id, 1, db)
+        await db.commit()
+        await search_cache.touch(cache.UPLOADED)
+        await db.refresh(image)
         res = await form_answer(image)
         return res
 
     @staticmethod
-    async def get_image(image_id: int, db: Session):
+    async def get_image(image_id: int, db: AsyncSession):
         image = await get_image_by_id(image_id, db)
         res = await form_answer(image)
         return res
 
     @staticmethod
-    async def get_all_images(user_id: int, db: Session):
-        images = db.query(Image).filter(Image.user_id == user_id).all()
-        if images:
-            res = []
-            for image in images:
-                response = await form_answer(image)
-                res.append(response)
-            return res
+    async def get_all_images(user_id: int, cursor: str | None, limit: int, db: AsyncSession, with_tags: bool = False):
+        page = await get_image_responses(select(Image).filter(Image.user_id == user_id), cursor, limit, db, with_tags)
+        if page.items:
+            return page
 
     @staticmethod
-    async def update_description(image_id: int, description: str, db: Session):
+    async def update_description(image_id: int, description: str, db: AsyncSession):
         image = await get_image_by_id(image_id, db)
         if image:
             image.description = description
-            db.commit()
-            db.refresh(image)
+            await db.commit()
+            await search_cache.touch(cache.DESCRIBED)
+            await db.refresh(image)
             res = await form_answer(image)
             return res
 
     @staticmethod
-    async def delete_image(image_id: int, username: str, db: Session):
+    async def delete_image(image_id: int, db: AsyncSession):
         image = await get_image_by_id(image_id, db)
         if image:
-            CloudImage.remove_image(username, image.public_id)
-            db.delete(image)
-            db.commit()
+            await db.delete(image)
+            await db.flush()
+            orphan = await release_asset(image, db)
+            await change_images_count(image.user_id, -1, db)
+            await db.commit()
+            await search_cache.touch(cache.DELETED)
+            # The file goes last: a file left behind by a failed call costs less than an image without one.
+            if orphan:
+                await remove_file(orphan)
         return image
 
     @staticmethod
-    async def check_image_owner(image_id: int, user: User, db: Session):
-        user_image = db.query(Image).filter(Image.id == image_id, Image.user_id == int(user.id)).first()
+    async def check_image_owner(image_id: int, user: User, db: AsyncSession):
+        user_image = await db.scalar(select(Image).filter(Image.id == image_id, Image.user_id == int(user.id)))
         return user_image
 
     @staticmethod
-    async def get_image_from_cloud(image_id: int, db: Session):
+    async def get_image_from_cloud(image_id: int, db: AsyncSession):
         image = await get_image_by_id(image_id, db)
         if image:
-            file = CloudImage.get_file_by_url(image.public_id)
+            file = await CloudImage.get_file_by_url(image.public_id)
             return file if file else None
 
     @staticmethod
-    async def transform_image_to_db(transformed_url, image_id: int, db: Session):
+    async def transform_image_to_db(transformed_url, image_id: int, db: AsyncSession):
         image = await get_image_by_id(image_id, db)
         image.transformed_path = transformed_url["url"]
-        db.commit()
-        db.refresh(image)
+        await db.commit()
+        await db.refresh(image)
 
     @staticmethod
-    async def add_qrcode_to_db(image_id: int, qr_code: str, db: Session):
+    async def add_qrcode_to_db(image_id: int, qr_code: str, db: AsyncSession):
         image = await get_image_by_id(image_id, db)
         if image:
             image.slug = qr_code
-            db.commit()
-            db.refresh(image)
+            await db.commit()
+            await db.refresh(image)
         return image
 
 
-async def get_image_by_id(image_id: int, db: Session):
-    image = db.query(Image).filter(Image.id == image_id).first()
+async def get_image_by_id(image_id: int, db: AsyncSession):
+    image = await db.scalar(select(Image).filter(Image.id == image_id))
     return image
 
 
+async def acquire_asset(sha256: str, db: AsyncSession) -> Asset | None:
+    """
+    The acquire_asset function takes one more reference to the stored file with the given content.
+    The counter is raised in the same statement which finds the row, so a concurrent delete
+    either sees the new reference or has already removed the row.
+
+    :param sha256: str: The SHA-256 of the content
+    :param db: AsyncSession: Get the database session
+    :return: The asset, or None when the content is not stored yet
+    :doc-author: Trelent
+    """
+    result = await db.execute(update(Asset).filter(Asset.sha256 == sha256).values(refs=Asset.refs + 1)
+                              .execution_options(synchronize_session=False))
+    if result.rowcount:
+        return await db.scalar(select(Asset).filter(Asset.sha256 == sha256))
+
+
+async def add_asset(sha256: str, public_id: str, origin_path: str, db: AsyncSession) -> Asset:
+    """
+    The add_asset function records a newly uploaded file with one reference. When another request
+    stored the same content in the meantime, the unique index on sha256 rejects the row;
+    the file just uploaded is removed then and the other one is used instead. When that row is deleted
+    again before it is acquired, the insert is tried once more.
+
+    :param sha256: str: The SHA-256 of the content
+    :param public_id: str: The public id of the uploaded file
+    :param origin_path: str: The URL of the uploaded file
+    :param db: AsyncSession: Get the database session
+    :return: The asset
+    :raises HTTPException: 503 when the same content keeps being added and deleted concurrently
+    :doc-author: Trelent
+    """
+    for _ in range(ASSET_ATTEMPTS):
+        asset = Asset(sha256=sha256, public_id=public_id, origin_path=origin_path, refs=1)
+        db.add(asset)
+        try:
+            await db.flush()
+            return asset
+        except IntegrityError:
+            # Nothing but the failed insert is in the transaction yet.
+            await db.rollback()
+        existing = await acquire_asset(sha256, db)
+        if existing is not None:
+            await remove_file(public_id)
+            return existing
+    await remove_file(public_id)
+    raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=messages.SERVER_BUSY,
+                        headers={"Retry-After": "1"})
+
+
+async def remove_file(public_id: str):
+    """
+    The remove_file function removes a file which no image uses any more. It is called once the database
+    no longer refers to the file, so a failure only leaves an unused file behind and is logged
+    instead of failing the request.
+
+    :param public_id: str: The public id of the file
+    :return: None
+    :doc-author: Trelent
+    """
+    try:
+        await CloudImage.remove_image(public_id)
+    except (CloudError, HTTPException, OSError) as error:
+        logger.warning("Unused file %s was not removed: %s", public_id, error)
+
+
+async def remove_user_files(username: str, public_ids: list[str]):
+    """
+    The remove_user_files function removes the files no image uses any more after the images of a user
+    were deleted, then the folder of the user with the avatar. Like remove_file, it only logs failures.
+
+    :param username: str: The name of the user
+    :param public_ids: list[str]: The public ids of the unused files
+    :return: None
+    :doc-author: Trelent
+    """
+    for public_id in public_ids:
+        await remove_file(public_id)
+    try:
+        await CloudImage.remove_folder(username)
+    except (CloudError, HTTPException, OSError) as error:
+        logger.warning("Folder of %s was not removed: %s", username, error)
+
+
+async def release_user_images(user_id: int, db: AsyncSession) -> list[str]:
+    """
+    The release_user_images function deletes all images of a user, e.g. of a removed or banned one.
+    Uploads are stored by their content and may be shared with other users, so only the files
+    which no other image refers to are returned for removal.
+
+    :param user_id: int: The id of the user
+    :param db: AsyncSession: Get the database session
+    :return: The public ids of the files to remove from the storage once the transaction is committed
+    :doc-author: Trelent
+    """
+    images = (await db.scalars(select(Image).filter(Image.user_id == user_id))).all()
+    for image in images:
+        await db.delete(image)
+    await db.flush()
+    orphans = [await release_asset(image, db) for image in images]
+    await db.execute(update(User).filter(User.id == user_id).values(images_count=0))
+    return [public_id for public_id in orphans if public_id]
+
+
+async def release_asset(image: Image, db: AsyncSession) -> str | None:
+    """
+    The release_asset function drops the reference of a deleted image to its stored file
+    and removes the asset when no image refers to it any more. Images uploaded before the files
+    were shared have no asset and own their file alone.
+
+    :param image: Image: The deleted image
+    :param db: AsyncSession: Get the database session
+    :return: The public id of the file to remove from the storage, or None while other images use it
+    :doc-author: Trelent
+    """
+    if image.asset_id is None:
+        return image.public_id
+    await db.execute(update(Asset).filter(Asset.id == image.asset_id).values(refs=Asset.refs - 1)
+                     .execution_options(synchronize_session=False))
+    result = await db.execute(delete(Asset).filter(Asset.id == image.asset_id, Asset.refs <= 0)
+                              .execution_options(synchronize_session=False))
+    if result.rowcount:
+        return image.public_id
+
+
+async def change_images_count(user_id: int, delta: int, db: AsyncSession):
+    await db.execute(update(User).filter(User.id == user_id).values(images_count=User.images_count + delta))
+
+
+async def reconcile_images_count(db: AsyncSession) -> int:
+    """
+    The reconcile_images_count function repairs the users.images_count counters which drifted
+    from the real number of images, e.g. after manual changes in the database.
+
+    :param db: AsyncSession: Get the database session
+    :return: The number of corrected users
+    :doc-author: Trelent
+    """
+    actual = select(func.count(Image.id)).filter(Image.user_id == User.id).scalar_subquery()
+    result = await db.execute(update(User).filter(User.images_count != actual).values(images_count=actual)
+                              .execution_options(synchronize_session=False))
+    await db.commit()
+    return result.rowcount
+
+
 async def form_answer(image: Type[Image] | Image):
     if image:
         res = ImageResponse.model_validate(image)
         res.rating = image.rating
         return res
+
+
+def form_answers(images: Sequence[Image], with_tags: bool = False) -> List[ImageResponse]:
+    """
+    The form_answers function builds the responses for a list of images in one validation pass.
+    The rating is read from the aggregate columns of every row, so no extra queries are made;
+    tags are included only when they were eagerly loaded together with the images.
+
+    :param images: Sequence[Image]: Images to convert
+    :param with_tags: bool: Include the tags of every image
+    :return: A list of image responses
+    :doc-author: Trelent
+    """
+    adapter = image_tags_list if with_tags else image_list
+    return adapter.validate_python(images, from_attributes=True)
+
+
+async def get_image_responses(stmt: Select, cursor: str | None, limit: int, db: AsyncSession,
+                              with_tags: bool = False, order: tuple = KEYSET,
+                              descending: bool = False) -> Page:
+    """
+    The get_image_responses function runs a select of images and turns one page of rows into responses.
+    It is the shared path for image lists: one query for the images and, with tags requested,
+    one more query which loads the tags of all of them at once.
+
+    :param stmt: Select: A select of Image rows with all filters applied
+    :param cursor: str | None: The next_cursor of the previous page
+    :param limit: int: The maximum number of images on the page
+    :param db: AsyncSession: Get the database session
+    :param with_tags: bool: Include the tags of every image
+    :param order: tuple: Attributes of Image or SQL expressions which make up the sort key
+    :param descending: bool: Return the largest keys first
+    :return: A page of image responses
+    :doc-author: Trelent
+    """
+    if with_tags:
+        stmt = stmt.options(selectinload(Image.tags))
+    page = await paginate(stmt, Image, cursor, limit, db, order, descending)
+    page.items = form_answers(page.items, with_tags)
+    return page
+
+
+async def get_images_by_ids(image_ids: list[int], db: AsyncSession) -> List[ImageResponse]:
+    """
+    The get_images_by_ids function loads the images with the given ids in one query
+    and returns their responses in the order of the ids. Ids of deleted images are skipped.
+
+    :param image_ids: list[int]: Ids of the images in the wanted order
+    :param db: AsyncSession: Get the database session
+    :return: A list of image responses
+    :doc-author: Trelent
+    """
+    if not image_ids:
+        return []
+    images = {image.id: image for image in (await db.scalars(select(Image).filter(Image.id.in_(image_ids)))).all()}
+    return form_answers([images[image_id] for image_id in image_ids if image_id in images])
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Select, func, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf import messages
+from src.schemes.pagination import Page
+
+
+KEYSET = ("created_at", "id")
+SQLITE_TIME_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    """
+    The decode_cursor function turns an opaque cursor back into the values of the sort columns.
+    Any cursor which was not produced by encode_cursor for the same columns is rejected.
+
+    :param cursor: str: The cursor received from the client
+    :param columns: list: The sort columns of the query
+    :return: A list with a value for every sort column
+    :doc-author: Trelent
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+                for value, column in zip(values, columns)]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_CURSOR)
+
+
+def comparable(expression, dialect: str):
+    # SQLite keeps datetimes as text, and rows stamped by CURRENT_TIMESTAMP have no
+    # fractional part, so both sides are brought to the same format before comparing.
+    if dialect == "sqlite" and isinstance(expression.type, DateTime):
+        return func.strftime(SQLITE_TIME_FORMAT, expression)
+    return expression
+
+
+async def paginate(stmt: Select, model, cursor: str | None, limit: int, db: AsyncSession,
+                   order: tuple = KEYSET, descending: bool = False) -> Page:
+    """
+    The paginate function applies keyset pagination to a select statement.
+    Rows are ordered by the order keys, and the cursor holds the values of the last row of the
+    previous page, so every page is a single index range scan regardless of its depth.
+    The key values are selected along with the rows, and one extra row is fetched to find out
+    whether a next page exists.
+
+    :param stmt: Select: A select of model rows with all filters applied
+    :param model: The mapped class the rows belong to
+    :param cursor: str | None: The next_cursor of the previous page, None for the first page
+    :param limit: int: The maximum number of rows on the page
+    :param db: AsyncSession: Get the database session
+    :param order: tuple: Attribute names of the model or SQL expressions which make up a unique sort key,
+        the last one should be the id
+    :param descending: bool: Return the largest keys first
+    :return: A page with the rows and the cursor of the next page
+    :doc-author: Trelent
+    """
+    dialect = db.get_bind().dialect.name
+    columns = [getattr(model, key) if isinstance(key, str) else key for key in order]
+    keys = [comparable(column, dialect) for column in columns]
+    if cursor:
+        values = [comparable(literal(value, column.type), dialect)
+                  for value, column in zip(decode_cursor(cursor, columns), columns)]
+        stmt = stmt.filter(tuple_(*keys) < tuple_(*values) if descending else tuple_(*keys) > tuple_(*values))
+    stmt = stmt.add_columns(*columns).order_by(*[key.desc() if descending else key.asc() for key in keys])
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    next_cursor = encode_cursor(list(rows[limit - 1][1:])) if len(rows) > limit else None
+    return Page(items=[row[0] for row in rows[:limit]], next_cursor=next_cursor)
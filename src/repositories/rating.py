@@ -1,41 +1,56 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User, Rating, Image
+from src.repositories.pagination import paginate
+from src.schemes.pagination import Page
 from src.schemes.rating import RatingModel
+from src.services import search_cache as cache
+from src.services.search_cache import search_cache
 
 
-async def get_image_rates(limit: int, offset: int, image_id: int, db: Session):
-    result = db.query(Rating).filter_by(image_id=image_id).limit(limit).offset(offset).all()
-    return result
+async def get_image_rates(cursor: str | None, limit: int, image_id: int, db: AsyncSession) -> Page:
+    return await paginate(select(Rating).filter_by(image_id=image_id), Rating, cursor, limit, db)
 
 
-async def rate_image(body: RatingModel, user: User, db: Session):
+async def rate_image(body: RatingModel, user: User, db: AsyncSession):
     rate = Rating(**body.model_dump(), user_id=user.id)
     db.add(rate)
-    db.commit()
-    db.refresh(rate)
+    await change_image_rating(body.image_id, body.rate, 1, db)
+    await db.commit()
+    await search_cache.touch(cache.RATED)
+    await db.refresh(rate)
     return rate
 
 
-async def check_image(image_id: int, user: User, db: Session):
-    user_image = db.query(Image).filter(Image.id == image_id, Image.user_id == int(user.id)).first()
+async def check_image(image_id: int, user: User, db: AsyncSession):
+    user_image = await db.scalar(select(Image).filter(Image.id == image_id, Image.user_id == int(user.id)))
     return user_image
 
 
-async def check_repeating_rate(image_id: int, user: User, db: Session):
-    user_rate = db.query(Rating).filter(Rating.image_id == image_id, Rating.user_id == int(user.id)).first()
+async def check_repeating_rate(image_id: int, user: User, db: AsyncSession):
+    user_rate = await db.scalar(select(Rating).filter(Rating.image_id == image_id, Rating.user_id == int(user.id)))
     return user_rate
 
 
-async def remove_rate(image_id: int, user_id: int, db: Session):
-    user_rate = db.query(Rating).filter(Rating.image_id == image_id, Rating.user_id == user_id).first()
+async def remove_rate(image_id: int, user_id: int, db: AsyncSession):
+    user_rate = await db.scalar(select(Rating).filter(Rating.image_id == image_id, Rating.user_id == user_id))
     if user_rate:
-        db.delete(user_rate)
-        db.commit()
+        await db.delete(user_rate)
+        await change_image_rating(image_id, -user_rate.rate, -1, db)
+        await db.commit()
+        await search_cache.touch(cache.RATED)
     return user_rate
 
 
-"""async def calculate_rating(image_id: int, db: Session):
+async def change_image_rating(image_id: int, rate_delta: int, count_delta: int, db: AsyncSession):
+    # Relative update, so concurrent rates of the same image are never lost;
+    # it is committed in the same transaction as the rating row itself.
+    await db.execute(update(Image).filter(Image.id == image_id).values(rating_sum=Image.rating_sum + rate_delta,
+                                                                       rating_count=Image.rating_count + count_delta))
+
+
+"""async def calculate_rating(image_id: int, db: AsyncSession):
     query = db.query(
         func.sum(Rating.rate).label('total_rate'),
         func.count(Rating.user_id).label('user_count')
@@ -46,10 +61,10 @@ async def remove_rate(image_id: int, user_id: int, db: Session):
         return rating
 
 
-async def update_rating(image_id: int, db: Session):
+async def update_rating(image_id: int, db: AsyncSession):
     rating = await calculate_rating(image_id, db)
     image = db.query(Image).filter(Image.id == image_id).first()
     image.rating = rating
-    db.commit()
+    await db.commit()
     db.refresh(image)
     return image"""
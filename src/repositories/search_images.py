@@ -1,55 +1,170 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+import logging
+from datetime import timedelta
 
-from src.database.models import Image, TagToImage, Tag
-from src.schemes.search import SearchModel, SortModel
+from sqlalchemy import select, Select, func, cast, Double, literal_column, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import settings
+from src.database.connection import SessionLocal, replica_router
+from src.database.models import Image, Tag, TagToImage, User, images_fts
+from src.repositories.images import get_image_responses, get_images_by_ids
+from src.repositories.pagination import KEYSET
+from src.repositories.tags import match_tags
+from src.schemes.search import SearchModel, SortModel, SearchPage
+from src.services.search_cache import search_cache
 
-async def search_result(body_search: SearchModel, body_sort: SortModel, db: Session):
-    search_data = {key: value for key, value in body_search.model_dump().items() if value}
-    sort_data = {key: value for key, value in body_sort.model_dump().items() if value}
-    rd, rt = None, None
-    for parameter, value in body_search.model_dump().items():
-        if parameter in func.keys() and value:
-            res = await func[parameter](value, db)
-            return await sorting_by(body_sort, res) if res else None
-        '''if parameter == "description" and value:
-            rd = await search_by_description(value, db)
-        if parameter == "tags" and value:
-            rt = await search_by_tag(value, db)
-    return await sorting_by(body_sort, rd) if rd else await sorting_by(body_sort, rt) if rt else None'''
 
+TEXT_SEARCH_CONFIG = "simple"
 
-async def search_by_description(keyword: str, db: Session):
-    result_by_description = db.query(Image).filter(Image.description.ilike("%" + keyword + "%")).all()
-    return result_by_description
+logger = logging.getLogger(__name__)
 
 
-async def get_tags(keyword: str, db: Session) -> list[int]:
-    tag_ids: list = db.query(Tag.id).filter(Tag.tag.ilike("%" + keyword + "%")).all()
-    return [tag[0] for tag in tag_ids]
+class SearchPlan:
+    def __init__(self):
+        """
+        The __init__ function starts a plan which selects all images.
+        Every criterion narrows the same statement and records how the database can serve it.
 
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Trelent
+        """
+        self.stmt = select(Image)
+        self.rank = None
+        self.steps = []
 
-async def get_image_ids(tag_ids: list[int], db: Session) -> list[int]:
-    image_ids_by_tag = db.query(TagToImage.image_id).filter(TagToImage.tag_id.in_(tag_ids)).all()
-    return [image_id[0] for image_id in image_ids_by_tag]
+    def where(self, condition, step: str):
+        self.stmt = self.stmt.filter(condition)
+        self.steps.append(step)
 
 
-async def search_by_tag(keyword: str, db: Session):
-    tag_ids = await get_tags(keyword, db)
-    image_ids_by_tag = await get_image_ids(tag_ids, db)
-    result_by_tags = db.query(Image).filter(Image.id.in_(image_ids_by_tag)).all()
-    return result_by_tags
+async def plan_search(body: SearchModel, db: AsyncSession) -> SearchPlan | None:
+    """
+    The plan_search function combines all given criteria into one select of images.
+    The predicates are written so that the indexes can serve them: the owner is resolved through
+    the unique username, dates become a half-open range on created_at, the minimum rating is compared
+    on the aggregate columns instead of the computed average, and every tag is an EXISTS probe into
+    tag_images. Substring search in the description can not use an index and is always added last.
 
+    :param body: SearchModel: The search criteria
+    :param db: AsyncSession: Get the database session
+    :return: The plan or None when no criteria are given
+    :doc-author: Trelent
+    """
+    plan = SearchPlan()
+    dialect = db.get_bind().dialect.name
+    if body.owner:
+        owner_id = select(User.id).filter(User.username == body.owner).scalar_subquery()
+        plan.where(Image.user_id == owner_id, "owner: users.username unique index, then images.user_id")
+    if body.created_from:
+        plan.where(Image.created_at >= body.created_from, "created_from: range on images.created_at")
+    if body.created_to:
+        plan.where(Image.created_at < body.created_to + timedelta(days=1), "created_to: range on images.created_at")
+    if body.min_rating is not None:
+        plan.where(Image.rating_sum >= body.min_rating * Image.rating_count,
+                   "min_rating: rating_sum >= min_rating * rating_count")
+        plan.where(Image.rating_count > 0, "min_rating: rated images only")
+    keywords = [keyword.strip() for keyword in (body.tags or "").split(",") if keyword.strip()]
+    if keywords:
+        conditions = [await match_tags(keyword, db) for keyword in keywords]
+        if body.tags_match == "all":
+            for keyword, condition in zip(keywords, conditions):
+                plan.where(tagged_with(condition), f"tag '{keyword}': EXISTS on tag_images(image_id, tag_id)")
+        else:
+            plan.where(tagged_with(or_(*conditions)),
+                       f"any tag of {keywords}: EXISTS on tag_images(image_id, tag_id)")
+    if body.text:
+        plan.stmt, plan.rank = full_text_search(plan.stmt, body.text, dialect)
+        plan.steps.append("text: " + ("FTS5 index images_fts" if dialect == "sqlite" else "GIN index on tsvector"))
+    if body.description:
+        plan.where(Image.description.ilike("%" + body.description + "%"), "description: substring scan")
+    return plan if plan.steps else None
 
-async def sorting_by(body: SortModel, query):
-    for par, val in body.model_dump().items():
-        if getattr(body, par) and val:
-            res = sorted(query, key=lambda image: getattr(image, par), reverse=True)
-            # select(query).order_by(filters.get(par))
-            return res
-    return query
 
+async def search_result(body_search: SearchModel, body_sort: SortModel, cursor: str | None, limit: int,
+                        db: AsyncSession) -> SearchPage | None:
+    """
+    The search_result function returns one page of images which match the search criteria.
+    Pages are cached as lists of image ids, so a repeated search costs one query by primary key;
+    the cache is skipped when the search plan is requested.
+    The version counters in the key are bumped right after commits on the primary, so a page which
+    is going to be cached is searched on the primary: a lagging replica would cache old rows under the new key.
 
-func = {"description": search_by_description,
-        "tags": search_by_tag, }
+    :param body_search: SearchModel: The search criteria
+    :param body_sort: SortModel: The sort flags
+    :param cursor: str | None: The next_cursor of the previous page
+    :param limit: int: The maximum number of images on the page
+    :param db: AsyncSession: Get the database session
+    :return: A page of images or None when nothing is found
+    :doc-author: Trelent
+    """
+    key = None if settings.search_debug else await search_cache.key(body_search, body_sort, cursor, limit)
+    cached = await search_cache.get(key)
+    if cached is not None:
+        items = await get_images_by_ids(cached["ids"], db)
+        return SearchPage(items=items, next_cursor=cached["next_cursor"]) if items else None
+    if key is not None and replica_router.serves(db):
+        async with SessionLocal() as primary:
+            return await search_page(body_search, body_sort, cursor, limit, key, primary)
+    return await search_page(body_search, body_sort, cursor, limit, key, db)
+
+
+async def search_page(body_search: SearchModel, body_sort: SortModel, cursor: str | None, limit: int,
+                      key: str | None, db: AsyncSession) -> SearchPage | None:
+    plan = await plan_search(body_search, db)
+    if plan is None:
+        return None
+    if plan.rank is not None and not (body_sort.created_at or body_sort.rating):
+        order, descending = (plan.rank, "id"), True
+    else:
+        order, descending = sorting_by(body_sort)
+    plan.steps.append("order: " + ", ".join(column if isinstance(column, str) else "rank" for column in order)
+                      + (" desc" if descending else " asc") + ", keyset cursor")
+    logger.debug("Search plan: %s", "; ".join(plan.steps))
+    page = await get_image_responses(plan.stmt, cursor, limit, db, order=order, descending=descending)
+    await search_cache.set(key, [image.id for image in page.items], page.next_cursor)
+    if page.items:
+        return SearchPage(items=page.items, next_cursor=page.next_cursor,
+                          plan=plan.steps if settings.search_debug else None)
+
+
+def tagged_with(condition):
+    return select(TagToImage.id).join(Tag, Tag.id == TagToImage.tag_id)\
+        .filter(TagToImage.image_id == Image.id, condition).exists()
+
+
+def full_text_search(stmt: Select, keyword: str, dialect: str) -> tuple[Select, object]:
+    """
+    The full_text_search function narrows a select of images to a full-text match of the description.
+    On Postgres it matches the words against the GIN-indexed tsvector of the description;
+    on SQLite it queries the FTS5 index. All words of the keyword have to be present.
+
+    :param stmt: Select: A select of images
+    :param keyword: str: Words to look for
+    :param dialect: str: Name of the database dialect
+    :return: The narrowed select and the relevance expression, higher is better
+    :doc-author: Trelent
+    """
+    if dialect == "sqlite":
+        query = " ".join('"' + word.replace('"', '""') + '"' for word in keyword.split())
+        stmt = stmt.join(images_fts, images_fts.c.rowid == Image.id)\
+            .filter(images_fts.c.description.op("MATCH")(query))
+        return stmt, -images_fts.c.rank
+    # The configuration is inlined, so the expression matches the one of the GIN index.
+    document = func.to_tsvector(literal_column(f"'{TEXT_SEARCH_CONFIG}'"), Image.description)
+    query = func.plainto_tsquery(literal_column(f"'{TEXT_SEARCH_CONFIG}'"), keyword)
+    return stmt.filter(document.op("@@")(query)), cast(func.ts_rank(document, query), Double)
+
+
+def sorting_by(body: SortModel) -> tuple[tuple[str, ...], bool]:
+    """
+    The sorting_by function turns the sort flags into the keyset of the search query.
+    The database sorts and limits the rows, and every keyset ends with the id,
+    so the order is stable in both directions and can be continued with a cursor.
+
+    :param body: SortModel: The sort flags from the request
+    :return: The sort attributes of Image and whether the largest values come first
+    :doc-author: Trelent
+    """
+    order = ("rating",) + KEYSET if body.rating else KEYSET
+    return order, body.descending is not False
@@ -1,85 +1,151 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.exceptions import ValidationException
 
 from src.database.models import Tag, TagToImage
+from src.services import search_cache as cache
+from src.services.search_cache import search_cache
+from src.services.trigrams import tag_index
+from src.repositories.pagination import paginate
+from src.schemes.pagination import Page
 
 
-async def make_record(tag: str, image_id: int, db: Session):
+async def make_record(tag: str, image_id: int, db: AsyncSession):
     res = await check_image_tags(tag, image_id, db)
     if res:
         record = TagToImage(tag_id=res.id, image_id=image_id)
         db.add(record)
-        db.commit()
-        db.refresh(record)
+        await db.commit()
+        await search_cache.touch(cache.TAGGED)
+        await db.refresh(record)
         return record
 
 
-async def get_image_tags(image_id: int, db: Session):
+async def get_image_tags(image_id: int, db: AsyncSession):
     try:
-        tags = db.query(TagToImage.tag_id).filter_by(image_id=image_id).all()
+        tags = (await db.execute(select(TagToImage.tag_id).filter_by(image_id=image_id))).all()
     except ValidationException:
         return None
     return tags
 
 
-async def get_tag_by_name(tag: str, db: Session):
+async def get_tag_by_name(tag: str, db: AsyncSession):
     try:
-        tag = db.query(Tag).filter_by(tag=tag).first()
+        tag = await db.scalar(select(Tag).filter_by(tag=tag))
     except ValidationException:
         return None
     return tag
 
 
-async def create_tag(tag: str, db: Session) -> Tag | None:
+async def create_tag(tag: str, db: AsyncSession) -> Tag | None:
     tag = tag.strip('')
     new_tag = Tag(tag=tag)
     db.add(new_tag)
-    db.commit()
-    db.refresh(new_tag)
+    await db.commit()
+    await db.refresh(new_tag)
     return new_tag
 
 
-async def check_image_tags(tag: str, image_id: int, db: Session):
+async def check_image_tags(tag: str, image_id: int, db: AsyncSession):
     tag_ = await get_tag_by_name(tag, db)
     tags = await get_image_tags(image_id, db)
     if not tags:
         return tag_
-    if tag and tag_.id not in tags and len(tags) < 5:
+    if tag and tag_.id not in [row.tag_id for row in tags] and len(tags) < 5:
         return tag_
 
 
-async def get_tag_by_id(tag_id: int, db: Session):
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+async def indexed_tag_ids(keyword: str, db: AsyncSession, limit: int | None = None) -> list[int] | None:
+    """
+    The indexed_tag_ids function resolves the tags which contain the keyword or are similar to it
+    with the in-memory trigram index, the most similar first. Postgres does not need the index:
+    its pg_trgm GIN index on tags.tag serves the same checks in SQL, so None is returned there.
+
+    :param keyword: str: Text to look for
+    :param db: AsyncSession: Get the database session
+    :param limit: int | None: The maximum number of tags to return
+    :return: Ids of the matching tags, or None on Postgres
+    :doc-author: Trelent
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return None
+    await tag_index.refresh(db)
+    return tag_index.search(keyword, limit)
+
+
+def trigram_match(keyword: str):
+    return or_(Tag.tag.ilike("%" + keyword + "%"), Tag.tag.op("%")(keyword))
+
+
+async def match_tags(keyword: str, db: AsyncSession):
+    """
+    The match_tags function builds the condition for the tags which contain the keyword or are similar to it.
+
+    :param keyword: str: Text to look for
+    :param db: AsyncSession: Get the database session
+    :return: A condition on the Tag columns
+    :doc-author: Trelent
+    """
+    tag_ids = await indexed_tag_ids(keyword, db)
+    return trigram_match(keyword) if tag_ids is None else Tag.id.in_(tag_ids)
+
+
+async def find_tag_ids(keyword: str, db: AsyncSession, limit: int | None = None) -> list[int]:
+    """
+    The find_tag_ids function looks up the tags which contain the keyword or are similar to it, the most similar first.
+
+    :param keyword: str: Text to look for
+    :param db: AsyncSession: Get the database session
+    :param limit: int | None: The maximum number of tags to return
+    :return: Ids of the matching tags
+    :doc-author: Trelent
+    """
+    tag_ids = await indexed_tag_ids(keyword, db, limit)
+    if tag_ids is not None:
+        return tag_ids
+    stmt = select(Tag.id).filter(trigram_match(keyword))\
+        .order_by(func.similarity(Tag.tag, keyword).desc(), Tag.id).limit(limit)
+    return list((await db.scalars(stmt)).all())
+
+
+async def get_tag_by_id(tag_id: int, db: AsyncSession):
+    tag = await db.scalar(select(Tag).filter(Tag.id == tag_id))
     return tag
 
 
 class TagServices:
     @staticmethod
-    async def add_tag_to_image(image_id: int, tag: str, db: Session):
+    async def add_tag_to_image(image_id: int, tag: str, db: AsyncSession):
         res = await get_tag_by_name(tag, db)
         if not res:
             res = await create_tag(tag, db)
         return res if await make_record(res.tag, image_id, db) else None
 
     @staticmethod
-    async def update_tag(tag_id: int, new_tag: str, db: Session) -> Tag | None:
+    async def update_tag(tag_id: int, new_tag: str, db: AsyncSession) -> Tag | None:
         tag = await get_tag_by_id(tag_id, db)
         if tag:
             tag.name = new_tag
-            db.commit()
-            db.refresh(tag)
+            await db.commit()
+            await search_cache.touch(cache.TAGGED)
+            await db.refresh(tag)
         return tag
 
     @staticmethod
-    async def get_tags(limit: int, offset: int, db: Session):
-        tags = db.query(Tag).limit(limit).offset(offset).all()
-        print(tags)
-        return tags
+    async def get_tags(cursor: str | None, limit: int, db: AsyncSession) -> Page:
+        return await paginate(select(Tag), Tag, cursor, limit, db)
+
+    @staticmethod
+    async def search_tags(keyword: str, limit: int, db: AsyncSession) -> list[Tag]:
+        tag_ids = await find_tag_ids(keyword, db, limit)
+        tags = {tag.id: tag for tag in (await db.scalars(select(Tag).filter(Tag.id.in_(tag_ids)))).all()}
+        return [tags[tag_id] for tag_id in tag_ids if tag_id in tags]
 
     @staticmethod
-    async def remove_tag(tag_id: int, db: Session) -> Tag | None:
+    async def remove_tag(tag_id: int, db: AsyncSession) -> Tag | None:
         tag = await get_tag_by_id(tag_id, db)
         if tag:
-            db.delete(tag)
-            db.commit()
+            await db.delete(tag)
+            await db.commit()
+            await search_cache.touch(cache.TAGGED)
         return tag
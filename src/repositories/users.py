@@ -1,52 +1,58 @@
 from typing import Type
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.exceptions import ValidationException, HTTPException
 from libgravatar import Gravatar
 
 from src.database.models import User, Account, BanList
 from src.schemes.users import UserModel
 from src.schemes.account import AccountModel, AccountResponse
-from src.services.cloud_image import CloudImage
+from src.repositories.images import release_user_images, remove_user_files
 from src.services.ban_list_redis import auth_ban_list
+from src.services import search_cache as cache
+from src.services.search_cache import search_cache
+from src.services.principals import principal_cache
+from src.repositories.pagination import paginate
+from src.schemes.pagination import Page
 
 
 class AccountServices:
     @staticmethod
-    async def create_user_account(body: AccountModel, username: str, db: Session):
+    async def create_user_account(body: AccountModel, username: str, db: AsyncSession):
         gr = Gravatar(body.email)
         avatar = gr.get_image()
         try:
             new_account = Account(**body.model_dump(), username=username, avatar=avatar)
             db.add(new_account)
-            db.commit()
-            db.refresh(new_account)
+            await db.commit()
+            await db.refresh(new_account)
         except HTTPException:
             return
         res = await form_response(new_account)
         return res
 
     @staticmethod
-    async def update_user_account(username: str, body: AccountModel, db: Session):
+    async def update_user_account(username: str, body: AccountModel, db: AsyncSession):
         account_data = {key: value for key, value in body.model_dump().items() if value}
         if account_data:
-            db.query(Account).filter(Account.username == username).update(account_data)
-            db.commit()
+            await db.execute(update(Account).filter(Account.username == username).values(**account_data))
+            await db.commit()
             account = await get_account(username, db)
             res = await form_response(account)
             return res
 
     @staticmethod
-    async def remove_account(username: str, db: Session):
-        account = db.query(Account).filter_by(username=username).first()
+    async def remove_account(username: str, db: AsyncSession):
+        account = await db.scalar(select(Account).filter_by(username=username))
         if account:
-            db.delete(account)
-            db.commit()
+            await db.delete(account)
+            await db.commit()
             # res = await form_response(account)
             return account
 
     @staticmethod
-    async def get_account_by_username(username: str, db: Session):
+    async def get_account_by_username(username: str, db: AsyncSession):
         try:
             account = await get_account(username, db)
             res = await form_response(account)
@@ -55,12 +61,12 @@ class AccountServices:
             return
 
     @staticmethod
-    async def update_avatar(user: User, url: str, db: Session):
+    async def update_avatar(user: User, url: str, db: AsyncSession):
         user_account = await get_account(user.username, db)
         if user_account:
             user_account.avatar = url
-            db.commit()
-            db.refresh(user_account)
+            await db.commit()
+            await db.refresh(user_account)
             res = await form_response(user_account)
             return res
 
@@ -72,95 +78,97 @@ async def form_response(account: Type[Account] | Account):
         return res
 
 
-async def get_account(username: str, db: Session):
-    return db.query(Account).filter_by(username=username).first()
+async def get_account(username: str, db: AsyncSession):
+    return await db.scalar(select(Account).filter_by(username=username))
 
 
 class UserServices:
     @staticmethod
-    async def get_all_users(limit: int, offset: int, db: Session):
-        return db.query(User).limit(limit).offset(offset).all()
+    async def get_all_users(cursor: str | None, limit: int, db: AsyncSession) -> Page:
+        return await paginate(select(User), User, cursor, limit, db)
 
     @staticmethod
-    async def get_user_by_id(user_id: int, db: Session):
-        return db.query(User).filter_by(id=user_id).first()
+    async def get_user_by_id(user_id: int, db: AsyncSession):
+        return await db.scalar(select(User).filter_by(id=user_id))
 
     @staticmethod
-    async def create_user(body: UserModel, db: Session):
+    async def create_user(body: UserModel, db: AsyncSession):
         new_user = User(**body.model_dump())
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         return new_user
 
     @staticmethod
-    async def remove_user(user_id: int, db: Session):
-        user = db.query(User).filter_by(id=user_id).first()
+    async def remove_user(user_id: int, db: AsyncSession):
+        user = await db.scalar(select(User).filter_by(id=user_id))
         if user:
-            db.delete(user)
-            db.commit()
-            CloudImage.remove_folder(user.username)
+            orphans = await release_user_images(user.id, db)
+            await db.delete(user)
+            await db.commit()
+            await search_cache.touch(cache.DELETED)
+            await principal_cache.invalidate(user.email)
+            await remove_user_files(user.username, orphans)
         return user
 
     @staticmethod
-    async def add_to_ban_list(user_id: int, reason: str, db: Session):
-        user = db.query(User).filter_by(id=user_id).first()
-        if reason != "logout":
-            CloudImage.remove_folder(user.username)
+    async def add_to_ban_list(user_id: int, reason: str, db: AsyncSession):
+        user = await db.scalar(select(User).filter_by(id=user_id))
+        orphans = await release_user_images(user.id, db) if reason != "logout" else None
         new_record = BanList(access_token=user.access_token, reason=reason)
         db.add(new_record)
         # user.confirmed = False
-        db.commit()
-        ban_list = await get_ban_list(db)
-        await auth_ban_list.set_ban_list(ban_list)
+        await db.commit()
+        await principal_cache.invalidate(user.email)
+        if orphans is not None:
+            await search_cache.touch(cache.DELETED)
+            await remove_user_files(user.username, orphans)
+        if user.access_token:
+            await auth_ban_list.add(user.access_token, reason)
         # db.refresh(user)
         return user
 
     @staticmethod
-    async def search(filter_by: str, db: Session):
-        result = db.query(Account).all()
-        res = [await form_response(rec) for rec in result]
-        res = [rec.username for rec in res if rec.images_quantity > 0]
-        users = db.query(User).filter(User.username.in_(res)).order_by(getattr(User, filter_by)).all()
+    async def search(filter_by: str, db: AsyncSession):
+        # A user may have several accounts, so a join would return the user once for each of them.
+        stmt = (select(User).filter(User.username.in_(select(Account.username)), User.images_count > 0)
+                .order_by(getattr(User, filter_by)))
+        users = (await db.scalars(stmt)).all()
         return users
 
 
-async def get_ban_list(db: Session):
-    ban_list = db.query(BanList).all()
-    return ban_list
-
-
 class AuthServices:
     @staticmethod
-    async def check_ban_list(user_id: int, db: Session):
-        user = db.query(User).filter_by(id=user_id).first()
-        ban_list = await auth_ban_list.get_ban_list()
-        if user.access_token in [b.access_token for b in ban_list]:
+    async def check_ban_list(user_id: int, db: AsyncSession):
+        access_token = await db.scalar(select(User.access_token).filter_by(id=user_id))
+        if await auth_ban_list.is_banned(access_token, db):
             return True
         # db.query(BanList).filter_by(access_token=user.access_token).first()
 
     @staticmethod
-    async def get_user_by_email(email: str, db: Session) -> User | None:
-        return db.query(User).filter_by(email=email).first()
+    async def get_user_by_email(email: str, db: AsyncSession) -> User | None:
+        return await db.scalar(select(User).filter_by(email=email))
 
     @staticmethod
     async def update_token(user: User, access_token: str | None,
-                           refresh_token: str | None, db: Session):
+                           refresh_token: str | None, db: AsyncSession):
         user.refresh_token = refresh_token
         user.access_token = access_token
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await principal_cache.invalidate(user.email)
+        await db.refresh(user)
 
     @staticmethod
-    async def confirm_email(email: str, db: Session):
-        user = db.query(User).filter_by(email=email).first()
+    async def confirm_email(email: str, db: AsyncSession):
+        user = await db.scalar(select(User).filter_by(email=email))
         user.confirmed = True
-        db.commit()
+        await db.commit()
+        await principal_cache.invalidate(email)
 
     @staticmethod
-    async def reset_password(user: User, new_password: str, db: Session):
+    async def reset_password(user: User, new_password: str, db: AsyncSession):
         user.password = new_password
-        db.commit()
+        await db.commit()
 
 
 
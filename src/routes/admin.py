@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, status
+
+from src.database.connection import engine
+from src.database.metrics import pool_metrics
+from src.schemes.admin import PoolStatusResponse, SearchCacheStatus, ExecutorStatus
+from src.services.auth import auth_password
+from src.services.search_cache import search_cache
+from src.conf.allowed_roles import admin
+from src.conf import messages
+
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/db/pool", response_model=PoolStatusResponse, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(admin)],
+            description=messages.FOR_ADMIN)
+async def pool_status():
+    """
+    The pool_status function reports the state of the database connection pool:
+    checked out and idle connections, overflow, checkout wait times and timeouts.
+
+    :return: The pool metrics
+    :doc-author: Trelent
+    """
+    return pool_metrics.snapshot(engine.pool)
+
+
+@router.get("/cache/search", response_model=SearchCacheStatus, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(admin)],
+            description=messages.FOR_ADMIN)
+async def search_cache_status():
+    """
+    The search_cache_status function reports how many searches were served from the result cache.
+
+    :return: The hit and miss counters of the search cache
+    :doc-author: Trelent
+    """
+    return await search_cache.stats()
+
+
+@router.get("/password-hashing", response_model=ExecutorStatus, status_code=status.HTTP_200_OK,
+            dependencies=[Depends(admin)],
+            description=messages.FOR_ADMIN)
+async def password_hashing_status():
+    """
+    The password_hashing_status function reports the load of the password hashing pool:
+    busy threads, queued checks, rejected requests and how long checks waited for a thread.
+
+    :return: The metrics of the pool
+    :doc-author: Trelent
+    """
+    return auth_password.executor.snapshot()
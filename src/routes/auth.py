@@ -4,15 +4,15 @@ from fastapi.security import (
     HTTPBearer,
     OAuth2PasswordRequestForm,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 # from fastapi_limiter.depends import RateLimiter
 
 from src.database.connection import get_db
 from src.schemes.users import UserModel, UserResponse, TokenModel
 from src.schemes.email import RequestEmail, PasswordResetModel
+from src.services.principals import Principal
 from src.services.auth import auth_token, auth_password, auth_user
 from src.services.email import send_email
-from src.database.models import User
 from src.repositories.users import AuthServices, UserServices
 from src.conf import messages
 
@@ -26,7 +26,7 @@ security = HTTPBearer()
              status_code=status.HTTP_201_CREATED,
              description=messages.FOR_ALL)
 async def signup(body: UserModel, background_task: BackgroundTasks, request: Request,
-                 db: Session = Depends(get_db)):
+                 db: AsyncSession = Depends(get_db)):
     """
     The signup function creates a new user in the database.
         It takes in a UserModel object, which is validated by pydantic.
@@ -35,28 +35,28 @@ async def signup(body: UserModel, background_task: BackgroundTasks, request: Req
     :param body: UserModel: Get the request body
     :param background_task: BackgroundTasks: Add a task to the background queue
     :param request: Request: Get the base_url of the server
-    :param db: Session: Get the database session
+    :param db: AsyncSession: Get the database session
     :return: A user object, which is then serialized and returned as a response
     :doc-author: Trelent
     """
     exist_user = await AuthServices.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=messages.ACCOUNT_EXISTS)
-    body.password = auth_password.get_password_hash(body.password)
+    body.password = await auth_password.get_password_hash(body.password)
     new_user = await UserServices.create_user(body, db)
     background_task.add_task(send_email, new_user.email, new_user.username, str(request.base_url))
     return new_user
 
 
 @router.post("/login", status_code=status.HTTP_201_CREATED, response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
     The login function is used to authenticate a user.
         It takes the email and password of the user, verifies them against
         those stored in the database, and returns an access token if they match.
 
     :param body: OAuth2PasswordRequestForm: Get the username and password from the request body
-    :param db: Session: Get a database session
+    :param db: AsyncSession: Get a database session
     :return: An access token and a refresh token
     :doc-author: Trelent
     """
@@ -65,8 +65,11 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_EMAIL)
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.EMAIL_NOT_CONFIRMED)
-    if not auth_password.verify_password(body.password, user.password):
+    valid, new_hash = await auth_password.verify_and_update(body.password, user.password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_PASSWORD)
+    if new_hash:
+        await AuthServices.reset_password(user, new_hash, db)
     baned_access = await AuthServices.check_ban_list(user.id, db)
     if baned_access:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=messages.BAN)
@@ -81,7 +84,7 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
 
 @router.get("/refresh_token", status_code=status.HTTP_200_OK, response_model=TokenModel)
 async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security),
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_db)):
     """
     The refresh_token function is used to refresh the access token.
         The function will check if the user has a valid refresh token and then create
@@ -90,7 +93,7 @@ async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(sec
 
     :param credentials: HTTPAuthorizationCredentials: Get the credentials from the
     request header
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :return: A new access token and refresh token
     :doc-author: Trelent
     """
@@ -112,7 +115,7 @@ async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(sec
 
 
 @router.get('/confirmed_email/{token}', status_code=status.HTTP_200_OK, )
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
     """
     The confirmed_email function is used to confirm a user's email address.
     It takes the token from the URL and uses it to get the user's email address.
@@ -123,7 +126,7 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
     repository_users' confirm_email function with that email address as its argument.
 
     :param token: str: Get the email from the token
-    :param db: Session: Get the database session
+    :param db: AsyncSession: Get the database session
     :return: A dictionary with a message
     :doc-author: Trelent"""
     
@@ -140,7 +143,7 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
 @router.post('/request_email', status_code=status.HTTP_201_CREATED, )
 async def request_email(body: RequestEmail, background_tasks: BackgroundTasks,
                         request: Request,  # !!!
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_db)):
     """
     The request_email function is used to send an email the user with a link
     that will confirm their email address. The function takes in a RequestEmail
@@ -152,7 +155,7 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks,
     :param body: RequestEmail: Receive the email from the user
     :param background_tasks: BackgroundTasks: Add a task to the background tasks queue
     :param request: Request: Get the base url of the request
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A dictionary with a message
     :doc-author: Trelent"""
     
@@ -166,7 +169,7 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks,
 
 
 @router.post('/reset_password')
-async def reset_password(body: PasswordResetModel, db: Session = Depends(get_db)):
+async def reset_password(body: PasswordResetModel, db: AsyncSession = Depends(get_db)):
     """
     The reset_password function is used to reset a user's password.
         It takes in the email of the user and their new password, which must be
@@ -174,7 +177,7 @@ async def reset_password(body: PasswordResetModel, db: Session = Depends(get_db)
         passwords do not match, an error will be thrown.
 
     :param body: PasswordResetModel: Get the data from the request body
-    :param db: Session: Get the database session
+    :param db: AsyncSession: Get the database session
     :return: A dictionary with the message &quot;password reset complete!&quot;
     :doc-author: Trelent"""
     
@@ -184,23 +187,23 @@ async def reset_password(body: PasswordResetModel, db: Session = Depends(get_db)
     if body.new_password != body.confirm_password:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail=messages.PASSWORDS_NOT_EQUAL)
-    new_password = auth_password.get_password_hash(body.new_password)
+    new_password = await auth_password.get_password_hash(body.new_password)
     await AuthServices.reset_password(user, new_password, db)
     return {"message": messages.RESET_COMPLETE}
 
 
 @router.post("/logout", status_code=status.HTTP_201_CREATED)
 async def logout(
-        current_user: User = Depends(auth_user.get_current_user), db: Session = Depends(get_db)
+        current_user: Principal = Depends(auth_user.get_current_user), db: AsyncSession = Depends(get_db)
 ):
     """
     The logout function is used to logout a user.
         It takes in the current_user and db as parameters, which are both optional.
         The current_user parameter is obtained from the auth_user module's get_current_user function,
-            which returns an object of type User if there exists a valid token in the request header.
+            which returns the Principal of the user if there exists a valid token in the request header.
 
-    :param current_user: User: Get the current user's information
-    :param db: Session: Get the database session
+    :param current_user: Principal: Get the current user's information
+    :param db: AsyncSession: Get the database session
     :return: A message
     :doc-author: Trelent
     """
@@ -0,0 +1,40 @@
+import asyncio
+import os
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException, status
+from starlette.responses import FileResponse
+
+from src.services.storage import storage, LocalStorage
+from src.services.upload import media_type
+from src.conf import messages
+
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+
+def read_head(path: Path) -> tuple[os.stat_result, bytes]:
+    stat_result = os.stat(path)
+    with open(path, "rb") as file:
+        return stat_result, file.read(12)
+
+
+@router.get("/{public_id:path}", response_class=FileResponse, description="Files of the local storage")
+async def get_file(public_id: str):
+    """
+    The get_file function serves a file of the local storage by its public id.
+    With Cloudinary as the storage the files are served by Cloudinary, so nothing is found here.
+
+    :param public_id: str: The public id of the file
+    :return: The file
+    :doc-author: Trelent
+    """
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
+    try:
+        path = storage.path(public_id)
+        stat_result, head = await asyncio.to_thread(read_head, path)
+    except (ValueError, FileNotFoundError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
+    return FileResponse(path, stat_result=stat_result, media_type=media_type(head),
+                        headers={"Cache-Control": "public, max-age=31536000, immutable"})
@@ -1,14 +1,14 @@
-from typing import List
+from fastapi import Depends, HTTPException, Query, APIRouter, status, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi import Depends, HTTPException, APIRouter, status, UploadFile
-from sqlalchemy.orm import Session
-
-from src.database.connection import get_db
+from src.database.connection import get_db, get_read_db
 from src.repositories.images import ImageServices
 from src.repositories.users import AuthServices
-from src.database.models import User, UserRole
+from src.database.models import UserRole
+from src.services.principals import Principal
 from src.services.auth import auth_user
-from src.schemes.images import ImageResponse
+from src.schemes.images import ImageResponse, ImageTagsResponse
+from src.schemes.pagination import Page
 from src.schemes.images import ImageUploadModel
 from src.services.cloud_services import TransformImage
 from src.conf import allowed_roles
@@ -22,8 +22,8 @@ router = APIRouter(prefix="/images", tags=["images"])
              response_model=ImageResponse, dependencies=[Depends(allowed_roles.all_users)],
              description=messages.FOR_ALL)
 async def upload_file(file: UploadFile, description: str,
-                      current_user: User = Depends(auth_user.get_current_user),
-                      db: Session = Depends(get_db)):
+                      current_user: Principal = Depends(auth_user.get_current_user),
+                      db: AsyncSession = Depends(get_db)):
 
     image = await ImageServices.upload_file(file, description, current_user, db)
     if image is None:
@@ -35,8 +35,8 @@ async def upload_file(file: UploadFile, description: str,
             status_code=status.HTTP_200_OK, dependencies=[Depends(allowed_roles.all_users)],
             description=messages.FOR_ALL)
 async def get_image(image_id: int,
-                    current_user: User = Depends(auth_user.get_current_user),
-                    db: Session = Depends(get_db)):
+                    current_user: Principal = Depends(auth_user.get_current_user),
+                    db: AsyncSession = Depends(get_read_db)):
     baned_access = await AuthServices.check_ban_list(current_user.id, db)
     if baned_access:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=messages.BAN)
@@ -46,14 +46,18 @@ async def get_image(image_id: int,
     return result
 
 
-@router.get('/', response_model=List[ImageResponse],
+@router.get('/', response_model=Page[ImageTagsResponse],
             status_code=status.HTTP_200_OK, dependencies=[Depends(allowed_roles.all_users)],
             description=messages.FOR_ALL)
-async def get_images(current_user: User = Depends(auth_user.get_current_user), db: Session = Depends(get_db)):
+async def get_images(limit: int = Query(10, le=100),
+                     cursor: str | None = None,
+                     with_tags: bool = False,
+                     current_user: Principal = Depends(auth_user.get_current_user),
+                     db: AsyncSession = Depends(get_read_db)):
     baned_access = await AuthServices.check_ban_list(current_user.id, db)
     if baned_access:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=messages.BAN)
-    images = await ImageServices.get_all_images(current_user.id, db)
+    images = await ImageServices.get_all_images(current_user.id, cursor, limit, db, with_tags)
     if not images:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
     return images
@@ -63,8 +67,8 @@ async def get_images(current_user: User = Depends(auth_user.get_current_user), d
               status_code=status.HTTP_200_OK, dependencies=[Depends(allowed_roles.all_users)],
               description=messages.FOR_ALL)
 async def update_description(image_id: int, description: str,
-                             current_user: User = Depends(auth_user.get_current_user),
-                             db: Session = Depends(get_db)):
+                             current_user: Principal = Depends(auth_user.get_current_user),
+                             db: AsyncSession = Depends(get_db)):
     user_image = await ImageServices.check_image_owner(image_id, current_user, db)
     print(current_user.roles)
     if not user_image and current_user.roles == UserRole.admin:
@@ -78,22 +82,22 @@ async def update_description(image_id: int, description: str,
 @router.delete('/{image_id}',
                status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(allowed_roles.all_users)],
                description=messages.FOR_ALL)
-async def delete_image(image_id: int, current_user: User = Depends(auth_user.get_current_user),
-                       db: Session = Depends(get_db)):
+async def delete_image(image_id: int, current_user: Principal = Depends(auth_user.get_current_user),
+                       db: AsyncSession = Depends(get_db)):
     user_image = await ImageServices.check_image_owner(image_id, current_user, db)
     if not user_image and current_user.roles == UserRole.admin:
-        result = await ImageServices.delete_image(image_id, current_user.username, db)
+        result = await ImageServices.delete_image(image_id, db)
         return result
     if not user_image and current_user.roles != UserRole.admin:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=messages.NOT_YOUR_IMAGE)
-    result = await ImageServices.delete_image(image_id, current_user.username, db)
+    result = await ImageServices.delete_image(image_id, db)
     return result
 
 
 @router.post("/{image_id}/transform/", status_code=status.HTTP_200_OK,
              dependencies=[Depends(allowed_roles.all_users)], description=messages.FOR_ALL)
 async def transform_image(body: ImageUploadModel,
-                          db: Session = Depends(get_db)):
+                          db: AsyncSession = Depends(get_db)):
     file = await ImageServices.get_image_from_cloud(body.image_id, db)
     if not file:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
@@ -113,7 +117,7 @@ async def transform_image(body: ImageUploadModel,
              dependencies=[Depends(allowed_roles.all_users)],
              description=messages.FOR_ALL)
 async def qr_base64(image_id: int,
-                    db: Session = Depends(get_db)):
+                    db: AsyncSession = Depends(get_db)):
     image = await ImageServices.get_image(image_id, db)
     if not image.transformed_path:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
@@ -1,13 +1,10 @@
-from typing import List
-
-from fastapi import Depends, HTTPException, APIRouter, status
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, Query, APIRouter, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi_filter import FilterDepends
 
-from src.database.connection import get_db
+from src.database.connection import get_read_db
 from src.repositories import search_images as search
-from src.schemes.images import ImageResponse
-from src.schemes.search import SearchModel, SortModel
+from src.schemes.search import SearchModel, SortModel, SearchPage
 from src.conf import allowed_roles
 from src.conf import messages
 
@@ -16,13 +13,15 @@ router = APIRouter(prefix="/images", tags=["images"])
 
 
 @router.get("/search/", status_code=status.HTTP_200_OK,
-            response_model=List[ImageResponse],
+            response_model=SearchPage,
             dependencies=[Depends(allowed_roles.all_users)],
             description=messages.FOR_ALL)
 async def search_images(body_search: SearchModel = FilterDepends(SearchModel),
                         body_sort: SortModel = FilterDepends(SortModel),
-                        db: Session = Depends(get_db)):
-    images = await search.search_result(body_search, body_sort, db)
+                        limit: int = Query(10, le=100),
+                        cursor: str | None = None,
+                        db: AsyncSession = Depends(get_read_db)):
+    images = await search.search_result(body_search, body_sort, cursor, limit, db)
     if not images:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
     return images
@@ -1,11 +1,12 @@
 from typing import List
 
 from fastapi import Depends, HTTPException, Query, APIRouter, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.connection import get_db
+from src.database.connection import get_db, get_read_db
 from src.repositories.tags import TagServices
 from src.schemes.tags import TagResponse
+from src.schemes.pagination import Page
 from src.conf import allowed_roles
 from src.conf import messages
 
@@ -13,11 +14,21 @@ from src.conf import messages
 router = APIRouter(prefix="/images", tags=["images"])
 
 
-@router.get("/tags/", response_model=List[TagResponse], dependencies=[Depends(allowed_roles.all_users)],
+@router.get("/tags/", response_model=Page[TagResponse], dependencies=[Depends(allowed_roles.all_users)],
             status_code=status.HTTP_200_OK, description=messages.FOR_ALL)
 async def get_tags(limit: int = Query(10, le=50),
-                   offset: int = 0, db: Session = Depends(get_db)):
-    tags = await TagServices.get_tags(limit, offset, db)
+                   cursor: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    tags = await TagServices.get_tags(cursor, limit, db)
+    if not tags.items:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
+    return tags
+
+
+@router.get("/tags/search/", response_model=List[TagResponse], dependencies=[Depends(allowed_roles.all_users)],
+            status_code=status.HTTP_200_OK, description=messages.FOR_ALL)
+async def search_tags(keyword: str = Query(min_length=1, max_length=50), limit: int = Query(10, le=50),
+                      db: AsyncSession = Depends(get_read_db)):
+    tags = await TagServices.search_tags(keyword, limit, db)
     if not tags:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
     return tags
@@ -25,7 +36,7 @@ async def get_tags(limit: int = Query(10, le=50),
 
 @router.put('/tags/{tag_id}/', response_model=TagResponse, dependencies=[Depends(allowed_roles.moderators_admin)],
             status_code=status.HTTP_200_OK, description=messages.FOR_MODERATORS_ADMIN)
-async def update_tag(tag_id: int, new_tag: str, db: Session = Depends(get_db)):
+async def update_tag(tag_id: int, new_tag: str, db: AsyncSession = Depends(get_db)):
     tag = await TagServices.update_tag(tag_id, new_tag, db)
     if tag is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
@@ -34,7 +45,7 @@ async def update_tag(tag_id: int, new_tag: str, db: Session = Depends(get_db)):
 
 @router.delete('/tags/{tag_id}/', dependencies=[Depends(allowed_roles.admin)],
                status_code=status.HTTP_204_NO_CONTENT, description=messages.FOR_ADMIN)
-async def delete_tag(tag_id: int, db: Session = Depends(get_db)):
+async def delete_tag(tag_id: int, db: AsyncSession = Depends(get_db)):
     tag = await TagServices.remove_tag(tag_id, db)
     if tag is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
@@ -43,7 +54,7 @@ async def delete_tag(tag_id: int, db: Session = Depends(get_db)):
 
 @router.post('/{image_id}/tags', response_model=TagResponse, status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(allowed_roles.all_users)], description=messages.FOR_ALL)
-async def add_tag_to_image(image_id: int, tag: str, db: Session = Depends(get_db)):
+async def add_tag_to_image(image_id: int, tag: str, db: AsyncSession = Depends(get_db)):
     result = await TagServices.add_tag_to_image(image_id, tag, db)
     if result is None:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=messages.LIMIT_EXCEEDED)
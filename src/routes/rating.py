@@ -1,14 +1,13 @@
-from typing import List
-
 from fastapi import Depends, HTTPException, Path, Query, APIRouter, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.connection import get_db
+from src.database.connection import get_db, get_read_db
 from src.repositories import rating as repository_rating
 from src.repositories.images import ImageServices
 
 from src.schemes.rating import RatingModel, RatingResponse
-from src.database.models import User
+from src.schemes.pagination import Page
+from src.services.principals import Principal
 from src.services.auth import auth_user
 from src.conf import allowed_roles
 from src.conf import messages
@@ -17,17 +16,17 @@ from src.conf import messages
 router = APIRouter(prefix="/images", tags=["images"])
 
 
-@router.get("/{image_id}/rating/", status_code=status.HTTP_200_OK, response_model=List[RatingResponse],
+@router.get("/{image_id}/rating/", status_code=status.HTTP_200_OK, response_model=Page[RatingResponse],
             dependencies=[Depends(allowed_roles.moderators_admin)],
             description=messages.FOR_MODERATORS_ADMIN
             )
 async def get_rates(
         limit: int = Query(10, le=100),
-        offset: int = 0,
+        cursor: str | None = None,
         image_id: int = Path(ge=1),
-        db: Session = Depends(get_db)):
-    image_rates = await repository_rating.get_image_rates(limit, offset, image_id, db)
-    if not image_rates:
+        db: AsyncSession = Depends(get_read_db)):
+    image_rates = await repository_rating.get_image_rates(cursor, limit, image_id, db)
+    if not image_rates.items:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
     return image_rates
 
@@ -38,8 +37,8 @@ async def get_rates(
              description=messages.FOR_ALL
              )
 async def make_rate(body: RatingModel,
-                    current_user: User = Depends(auth_user.get_current_user),
-                    db: Session = Depends(get_db)):
+                    current_user: Principal = Depends(auth_user.get_current_user),
+                    db: AsyncSession = Depends(get_db)):
 
     user_image = await ImageServices.check_image_owner(body.image_id, current_user, db)
     if user_image:
@@ -57,7 +56,7 @@ async def make_rate(body: RatingModel,
                )
 async def delete_rate(image_id: int,
                       user_id: int,
-                      db: Session = Depends(get_db)):
+                      db: AsyncSession = Depends(get_db)):
 
     rate = await repository_rating.remove_rate(image_id, user_id, db)
     if not rate:
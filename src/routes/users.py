@@ -3,11 +3,12 @@ from typing import List
 from fastapi import APIRouter, Depends, Path, status, Query
 from fastapi.exceptions import HTTPException
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.connection import get_db
 from src.repositories.users import UserServices
 from src.schemes.users import UserResponse
+from src.schemes.pagination import Page
 from src.conf.allowed_roles import *
 from src.conf import messages
 
@@ -16,38 +17,38 @@ router = APIRouter(prefix="/users", tags=["users"])
 security = HTTPBearer()
 
 
-@router.get("/", response_model=List[UserResponse], status_code=status.HTTP_200_OK,
+@router.get("/", response_model=Page[UserResponse], status_code=status.HTTP_200_OK,
             dependencies=[Depends(moderators_admin)],
             description=messages.FOR_MODERATORS_ADMIN)
 async def get_users(limit: int = Query(10, le=100),
-                    offset: int = 0,
-                    db: Session = Depends(get_db)):
+                    cursor: str | None = None,
+                    db: AsyncSession = Depends(get_db)):
     """
-    The get_users function returns a list of users.
+    The get_users function returns a page of users.
 
     :param limit: int: Limit the number of users returned; le: Limit the maximum
     number of users that can be returned
-    :param offset: int: Skip a number of records
-    :param db: Session: Pass the database session to the function
-    :return: A list of users
+    :param cursor: str | None: The next_cursor of the previous page
+    :param db: AsyncSession: Pass the database session to the function
+    :return: A page of users with the cursor of the next page
     :doc-author: Trelent
     """
-    return await UserServices.get_all_users(limit, offset, db)
+    return await UserServices.get_all_users(cursor, limit, db)
 
 
 @router.get("/{user_id}", response_model=UserResponse, status_code=status.HTTP_200_OK,
             dependencies=[Depends(moderators_admin)],
             description=messages.FOR_MODERATORS_ADMIN)
-async def get_user(user_id: int = Path(ge=1), db: Session = Depends(get_db)):
+async def get_user(user_id: int = Path(ge=1), db: AsyncSession = Depends(get_db)):
 
     """
     The get_user function returns a user by id.
         Args:
             user_id (int): The id of the user to return.
-            db (Session, optional): SQLAlchemy Session. Defaults to Depends(get_db).
+            db (AsyncSession, optional): SQLAlchemy AsyncSession. Defaults to Depends(get_db).
 
     :param user_id: int: Specify the type of data that is expected to be passed in
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :return: A user object
     :doc-author: Trelent
     """
@@ -58,13 +59,13 @@ async def get_user(user_id: int = Path(ge=1), db: Session = Depends(get_db)):
                dependencies=[Depends(admin)],
                description=messages.FOR_ADMIN)
 async def remove_user(user_id: int = Path(ge=1),
-                      db: Session = Depends(get_db)):
+                      db: AsyncSession = Depends(get_db)):
 
     """
     The remove_user function removes a user from the database.
 
     :param user_id: int: Specify the user id of the user to be deleted
-    :param db: Session: Pass the database session to the repository function
+    :param db: AsyncSession: Pass the database session to the repository function
     :return: The user that was removed
     :doc-author: Trelent
     """
@@ -76,7 +77,7 @@ async def remove_user(user_id: int = Path(ge=1),
 
 @router.post("/{user_id}", status_code=status.HTTP_201_CREATED,
              dependencies=[Depends(admin)], description=messages.FOR_ADMIN)
-async def ban(user_id: int, reason: str, db: Session = Depends(get_db)):
+async def ban(user_id: int, reason: str, db: AsyncSession = Depends(get_db)):
 
     user = await UserServices.add_to_ban_list(user_id, reason, db)
     if not user:
@@ -87,7 +88,7 @@ async def ban(user_id: int, reason: str, db: Session = Depends(get_db)):
 @router.get("/search/", dependencies=[Depends(moderators_admin)], status_code=status.HTTP_200_OK,
             response_model=List[UserResponse],
             description=messages.FOR_MODERATORS_ADMIN)
-async def search_users(filter_by: str, db: Session = Depends(get_db)):
+async def search_users(filter_by: str, db: AsyncSession = Depends(get_db)):
     users = await UserServices.search(filter_by, db)
     if not users:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NOT_FOUND)
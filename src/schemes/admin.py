@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+
+
+class PoolStatusResponse(BaseModel):
+    pool: str
+    size: int | None = None
+    checked_out: int | None = None
+    idle: int | None = None
+    overflow: int | None = None
+    max_overflow: int | None = None
+    checkouts: int
+    timeouts: int
+    wait_avg_ms: float
+    wait_max_ms: float
+    slow_queries: int
+
+
+class SearchCacheStatus(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class ExecutorStatus(BaseModel):
+    workers: int
+    max_queue: int
+    running: int
+    queued: int
+    completed: int
+    rejected: int
+    wait_avg_ms: float
+    wait_max_ms: float
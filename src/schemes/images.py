@@ -1,7 +1,10 @@
 from datetime import datetime
+from typing import List
 
 from pydantic import BaseModel, Field, ConfigDict
 
+from src.schemes.tags import TagResponse
+
 
 class ImageResponse(BaseModel):
     id: int
@@ -17,6 +20,10 @@ class ImageResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ImageTagsResponse(ImageResponse):
+    tags: List[TagResponse] | None = None
+
+
 class ImageUploadModel(BaseModel):
     image_id: int
     folder: str = None
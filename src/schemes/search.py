@@ -1,11 +1,22 @@
+from datetime import date
+from typing import Optional, Literal
+
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
 from fastapi_filter.contrib.sqlalchemy import Filter
 
+from src.schemes.images import ImageResponse
+from src.schemes.pagination import Page
+
 
 class SearchModel(Filter):
     tags: Optional[str] | None = None
+    tags_match: Literal["any", "all"] = "any"
     description: Optional[str] | None = None
+    text: Optional[str] | None = None
+    owner: Optional[str] | None = None
+    created_from: Optional[date] = None
+    created_to: Optional[date] = None
+    min_rating: Optional[float] = None
 
 
 class SortModel(Filter):
@@ -13,6 +24,11 @@ class SortModel(Filter):
     # date_desc: Optional[bool] | None = False
     rating: Optional[bool] | None = False
     # rate_desc: Optional[float] | None = None
+    descending: Optional[bool] = True
+
+
+class SearchPage(Page[ImageResponse]):
+    plan: list[str] | None = None
 
 
 class SearchResponse(BaseModel):
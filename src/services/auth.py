@@ -1,16 +1,17 @@
-import pickle
 from datetime import datetime, timedelta
 from typing import Optional
 
-import redis
 from fastapi import Depends, HTTPException, status
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 
 from src.database.connection import get_db
 from src.repositories.users import AuthServices
+from src.services.principals import Principal, principal_cache
+from src.services.token_cache import verified_tokens
+from src.services.executor import BoundedExecutor
 from src.conf.config import settings
 from src.conf import messages
 
@@ -85,9 +86,7 @@ class Token:
         :doc-author: Trelent
         """
         try:
-            payload = jwt.decode(
-                refresh_token, self.SECRET_KEY_R, algorithms=[self.ALGORITHM]
-            )
+            payload = verified_tokens.decode(refresh_token, self.SECRET_KEY_R, self.ALGORITHM)
             if payload["scope"] == "refresh_token":
                 email = payload["sub"]
                 return email
@@ -150,14 +149,37 @@ class Token:
             )
 
 
+def password_context(time_cost: int, memory_cost: int, parallelism: int) -> CryptContext:
+    """
+    The password_context function builds the context which hashes new passwords with argon2id.
+    bcrypt hashes of existing users are still verified, but are marked for a rehash,
+    as are argon2 hashes made with other costs.
+
+    :param time_cost: int: Number of passes over the memory
+    :param memory_cost: int: Memory used by one hash, in KiB
+    :param parallelism: int: Number of lanes computed in parallel
+    :return: The context
+    :doc-author: Trelent
+    """
+    return CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto",
+                        argon2__type="ID",
+                        argon2__time_cost=time_cost,
+                        argon2__memory_cost=memory_cost,
+                        argon2__parallelism=parallelism)
+
+
 class Hash:
-    password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    password_context = password_context(settings.argon2_time_cost, settings.argon2_memory_cost,
+                                        settings.argon2_parallelism)
+    # Hashing takes a few hundred milliseconds on purpose, so it never runs on the event loop.
+    executor = BoundedExecutor(settings.password_hash_workers, settings.password_hash_queue, "password-hash")
 
-    def verify_password(self, plain_password, hashed_password):
+    async def verify_password(self, plain_password, hashed_password):
         """
         The verify_password function takes a plain-text password and hashed
         password as arguments. It then uses the verify method of the PasswordContext
         object to check if they match. If they do, it returns True; otherwise, it returns False.
+        The check runs in the password hashing pool, which answers 503 when it is overloaded.
 
         :param self: Represent the instance of the class
         :param plain_password: Pass in the password that is being verified
@@ -165,43 +187,54 @@ class Hash:
         :return: True or false
         :doc-author: Trelent
         """
-        return self.password_context.verify(plain_password, hashed_password)
+        return await self.executor.run(self.password_context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password, hashed_password) -> tuple[bool, str | None]:
+        """
+        The verify_and_update function checks a password like verify_password and, when the stored hash
+        uses bcrypt or outdated argon2 costs, also returns a new hash of the password to store instead.
+
+        :param self: Represent the instance of the class
+        :param plain_password: Pass in the password that is being verified
+        :param hashed_password: The stored hash
+        :return: Whether the password is correct and the new hash or None
+        :doc-author: Trelent
+        """
+        return await self.executor.run(self.password_context.verify_and_update, plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
+    async def get_password_hash(self, password: str):
         """
         The get_password_hash function is a helper function that uses the passlib library to hash
-        the password. The hashing algorithm used by this function is PBKDF2 with HMAC-SHA256, which
-        is considered secure and recommended for most applications.
+        the password. The hashing algorithm used by this function is argon2id, with the costs
+        from the settings.
+        The hash is computed in the password hashing pool, which answers 503 when it is overloaded.
 
         :param self: Represent the instance of the class
         :param password: str: Pass in the password that is to be hashed
         :return: A hash of the password
         :doc-author: Trelent
         """
-        return self.password_context.hash(password)
+        return await self.executor.run(self.password_context.hash, password)
 
 
 class CurrentUser:
     SECRET_KEY_A = settings.secret_key_a
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    red = redis.Redis(host=settings.redis_host,
-                      port=settings.redis_port,
-                      password=settings.redis_password,
-                      db=0)
 
     async def get_current_user(
-        self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-    ):
+        self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+    ) -> Principal:
         """
         The get_current_user function is a dependency that will be used in the
             get_current_active_user endpoint. It takes a token as an argument and
-            returns the user object if it exists, or raises an exception otherwise.
+            returns the principal of the user if it exists, or raises an exception otherwise.
+            Principals are cached in the process and in Redis, so most requests make no queries.
 
         :param self: Refer to the current object
         :param token: str: Get the token from the request header
-        :param db: Session: Get the database session
-        :return: A user object
+        :param db: AsyncSession: Get the database session
+        :return: The principal of the user
         :doc-author: Trelent
         """
         credentials_exception = HTTPException(
@@ -210,7 +243,7 @@ class CurrentUser:
             headers={"WWW-Authenticate": "Bearer"},
         )
         try:
-            payload = jwt.decode(token, self.SECRET_KEY_A, algorithms=[self.ALGORITHM])
+            payload = verified_tokens.decode(token, self.SECRET_KEY_A, self.ALGORITHM)
             if payload["scope"] == "access_token":
                 email = payload["sub"]
                 if not email:
@@ -220,16 +253,14 @@ class CurrentUser:
         except JWTError:
             raise credentials_exception
 
-        user = self.red.get(f"user:{email}")
-        if user is None:
+        principal = await principal_cache.get(email)
+        if principal is None:
             user = await AuthServices.get_user_by_email(email, db)
             if user is None:
                 raise credentials_exception
-            self.red.set(f"user:{email}", pickle.dumps(user))
-            self.red.expire(f"user:{email}", 900)
-        else:
-            user = pickle.loads(user)
-        return user
+            principal = Principal.from_user(user)
+            await principal_cache.set(principal)
+        return principal
 
 
 auth_token = Token()
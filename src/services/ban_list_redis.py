@@ -1,37 +1,178 @@
-import pickle
-
-import redis
-from sqlalchemy.orm import Session
-# from fastapi import Depends
+import asyncio
+from jose import JWTError, jwt
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import settings
 from src.database.connection import SessionLocal
 from src.database.models import BanList
-from src.conf.config import settings
+from src.database.redis_pool import redis_pool, subscribe
+from src.services.bloom import BloomFilter
+from src.services.token_cache import token_digest, verified_tokens
 
 
 class CurrentBanList:
     '''SECRET_KEY_A = settings.secret_key_a
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")'''
-    red = redis.Redis(host=settings.redis_host,
-                      port=settings.redis_port,
-                      password=settings.redis_password,
-                      db=0)
-    db: Session = SessionLocal()  # = Depends(get_db)
-
-    async def get_ban_list(self):
-        ban_list = self.red.get(f"ban_list")
-        if not ban_list:
-            ban_list = self.db.query(BanList).all()
-            self.red.set("ban_list", pickle.dumps(ban_list))
-            self.red.expire("ban_list", 1500)
+    LOADED = "ban:loaded"
+    CHANNEL = "ban:revoked"
+
+    def __init__(self):
+        """
+        The __init__ function creates the ban list without a local filter. Until the filter is built
+        and the worker listens for new revocations, every check goes to Redis.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Trelent
+        """
+        self.filter: BloomFilter | None = None
+        self.pending: set[str] | None = None
+        self.listener = None
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return token_digest(token)
+
+    def key(self, token: str) -> str:
+        return "ban:" + self.digest(token)
+
+    @staticmethod
+    def expires_at(token: str) -> int | None:
+        try:
+            return jwt.get_unverified_claims(token).get("exp")
+        except JWTError:
+            return None
+
+    async def add(self, token: str, reason: str, pipe=None):
+        """
+        The add function revokes one token. Every token is a separate key named by its hash,
+        so the check is a single lookup and the writes never touch other tokens.
+        Tokens revoked on logout expire together with the JWT; banned ones stay revoked.
+        The hash is published, so all workers add it to their filters.
+
+        :param self: Represent the instance of the class
+        :param token: str: The access token to revoke
+        :param reason: str: Why the token is revoked, the same as in the ban_lists table
+        :param pipe: A Redis pipeline to queue the commands on, instead of sending them at once
+        :return: None
+        :doc-author: Trelent
+        """
+        red = pipe if pipe is not None else redis_pool.get().pipeline(transaction=False)
+        exp = self.expires_at(token) if reason == "logout" else None
+        digest = self.digest(token)
+        if exp is None:
+            await red.set("ban:" + digest, reason)
         else:
-            ban_list = pickle.loads(ban_list)
-        return ban_list
+            await red.set("ban:" + digest, reason, exat=exp)
+        if pipe is None:
+            await red.publish(self.CHANNEL, digest)
+            await red.execute()
+        verified_tokens.discard(digest)
+        if self.filter is not None:
+            self.filter.add(digest)
+
+    async def load(self, db: AsyncSession):
+        """
+        The load function copies the ban_lists table into Redis, e.g. after Redis lost its data.
+
+        :param self: Represent the instance of the class
+        :param db: AsyncSession: Get the database session
+        :return: None
+        :doc-author: Trelent
+        """
+        pipe = redis_pool.get().pipeline(transaction=False)
+        for record in (await db.execute(select(BanList.access_token, BanList.reason))).all():
+            if record.access_token:
+                await self.add(record.access_token, record.reason, pipe)
+        pipe.set(self.LOADED, 1)
+        await pipe.execute()
+
+    @staticmethod
+    async def build_filter(db: AsyncSession) -> BloomFilter:
+        """
+        The build_filter function builds a Bloom filter of all revoked tokens from the ban_lists table.
+        It is sized for twice the current number of rows, so it keeps its error rate while the table grows.
+
+        :param db: AsyncSession: Get the database session
+        :return: The filter
+        :doc-author: Trelent
+        """
+        rows = await db.scalar(select(func.count(BanList.id)))
+        bloom = BloomFilter(max(settings.ban_filter_capacity, 2 * rows), settings.ban_filter_error_rate)
+        for access_token in await db.scalars(select(BanList.access_token)):
+            if access_token:
+                bloom.add(CurrentBanList.digest(access_token))
+        return bloom
+
+    async def is_banned(self, token: str | None, db: AsyncSession) -> bool:
+        """
+        The is_banned function checks whether a token is revoked. Tokens which are not in the local filter
+        are not revoked, so most checks make no round trip at all; the rest are confirmed in Redis.
+        The table is loaded into Redis first when it is not there yet.
+
+        :param self: Represent the instance of the class
+        :param token: str | None: The access token
+        :param db: AsyncSession: Get the database session
+        :return: True when the token is revoked
+        :doc-author: Trelent
+        """
+        if not token:
+            return False
+        digest = self.digest(token)
+        if self.filter is not None and digest not in self.filter:
+            return False
+        banned, loaded = await redis_pool.get().mget(["ban:" + digest, self.LOADED])
+        if loaded is None:
+            await self.load(db)
+            banned = await redis_pool.get().exists("ban:" + digest)
+        return bool(banned)
+
+    async def rebuild(self):
+        """
+        The rebuild function replaces the local filter with a new one built from the database.
+        Revocations which arrive while the table is read are kept aside and added at the end.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Trelent
+        """
+        self.pending = set()
+        try:
+            async with SessionLocal() as db:
+                bloom = await self.build_filter(db)
+            for digest in self.pending:
+                bloom.add(digest)
+            self.filter = bloom
+        finally:
+            self.pending = None
+
+    def on_revoked(self, digest: bytes):
+        digest = digest.decode()
+        verified_tokens.discard(digest)
+        if self.filter is not None:
+            self.filter.add(digest)
+        elif self.pending is not None:
+            self.pending.add(digest)
+
+    def on_disconnect(self):
+        # Revocations published meanwhile are lost, so the filter can not be trusted until it is rebuilt.
+        self.filter = None
+
+    def start(self):
+        self.listener = asyncio.create_task(subscribe(self.CHANNEL, self.on_revoked, self.rebuild,
+                                                      self.on_disconnect))
 
-    async def set_ban_list(self, ban_list: BanList):
-        self.red.set("ban_list", pickle.dumps(ban_list))
-        self.red.expire("ban_list", 1500)
+    async def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+            self.listener = None
+            self.filter = None
 
 
 auth_ban_list = CurrentBanList()
@@ -0,0 +1,34 @@
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        The __init__ function sizes an empty Bloom filter for the expected number of items,
+        so that the share of false positives stays near error_rate while it holds at most that many.
+
+        :param self: Represent the instance of the class
+        :param capacity: int: Expected number of items
+        :param error_rate: float: Wanted probability of a false positive
+        :return: None
+        :doc-author: Trelent
+        """
+        self.capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, digest: str):
+        # The items are hex SHA-256 digests, which are uniform already:
+        # two slices of them give all positions by double hashing.
+        first, second = int(digest[:16], 16), int(digest[16:32], 16) | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, digest: str):
+        for position in self.positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(digest))
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import random
+import secrets
+from typing import Any, AsyncIterator
+
+import httpx
+from cloudinary import utils
+from fastapi import HTTPException, status
+
+from src.conf.config import settings
+from src.conf import messages
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CloudError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class CloudClient:
+    API = "https://api.cloudinary.com/v1_1/"
+
+    def __init__(self, cloud_name: str, api_key: str, api_secret: str, transport: httpx.AsyncBaseTransport = None):
+        """
+        The __init__ function creates an empty holder for the HTTP client of the Cloudinary API.
+        The client is created on first use and keeps its connections open between requests.
+
+        :param self: Represent the instance of the class
+        :param cloud_name: str: The name of the Cloudinary account
+        :param api_key: str: The API key of the account
+        :param api_secret: str: The API secret, used to sign uploads and for basic auth of the admin API
+        :param transport: httpx.AsyncBaseTransport: Replaces the network, e.g. in tests
+        :return: None
+        :doc-author: Trelent
+        """
+        self.base_url = self.API + cloud_name
+        self.api_key = str(api_key)
+        self.api_secret = api_secret
+        self.transport = transport
+        self.client: httpx.AsyncClient | None = None
+        self.loop = None
+
+    def get(self) -> httpx.AsyncClient:
+        """
+        The get function returns the shared client, bound to the running event loop in the same way as the Redis pool.
+        At most cloudinary_max_connections requests run at once; the others wait for a free connection
+        up to cloudinary_pool_timeout seconds.
+
+        :param self: Represent the instance of the class
+        :return: The client
+        :doc-author: Trelent
+        """
+        if self.client is None or self.loop is not asyncio.get_running_loop():
+            limits = httpx.Limits(max_connections=settings.cloudinary_max_connections,
+                                  max_keepalive_connections=settings.cloudinary_max_connections)
+            timeout = httpx.Timeout(settings.cloudinary_timeout, connect=settings.cloudinary_connect_timeout,
+                                    pool=settings.cloudinary_pool_timeout)
+            self.client = httpx.AsyncClient(limits=limits, timeout=timeout, transport=self.transport)
+            self.loop = asyncio.get_running_loop()
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            self.loop = None
+
+    async def request(self, method: str, url: str, file=None, **kwargs) -> httpx.Response:
+        """
+        The request function sends one request and retries it on network errors and on the statuses
+        which mean the service is overloaded. The pause before each retry is random up to an exponentially
+        growing limit, so workers which failed together do not come back together.
+        When no connection gets free in time the caller gets 503 at once, without retries.
+
+        :param self: Represent the instance of the class
+        :param method: str: The HTTP method
+        :param url: str: The URL
+        :param file: A file to upload, sent from the start on every attempt
+        :param kwargs: Passed to httpx.AsyncClient.request
+        :return: The response
+        :doc-author: Trelent
+        """
+        attempt = 0
+        while True:
+            arguments = kwargs if file is None else self.attach(file, kwargs)
+            try:
+                response = await self.get().request(method, url, **arguments)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                error = CloudError(response.status_code, response.text)
+            except httpx.PoolTimeout:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=messages.SERVER_BUSY,
+                                    headers={"Retry-After": "1"})
+            except httpx.TransportError as transport_error:
+                error = CloudError(status.HTTP_504_GATEWAY_TIMEOUT, repr(transport_error))
+            if attempt >= settings.cloudinary_retries:
+                raise error
+            attempt += 1
+            delay = random.uniform(0, settings.cloudinary_retry_backoff * 2 ** attempt)
+            logger.warning("%s %s failed (%s), retry %d in %.2f s", method, url, error, attempt, delay)
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    async def multipart(fields: dict, file, boundary: str) -> AsyncIterator[bytes]:
+        for name, value in fields.items():
+            yield f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        yield (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="file"\r\n'
+               f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        async for chunk in file:
+            yield chunk
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    def attach(self, file, kwargs: dict) -> dict:
+        """
+        The attach function adds the file to the arguments of one attempt. Streams which can be iterated
+        asynchronously, such as an UploadStream, are sent chunk by chunk as a multipart body;
+        bytes and ordinary files are encoded by httpx.
+
+        :param self: Represent the instance of the class
+        :param file: The file to send
+        :param kwargs: dict: The arguments of the request, with the form fields in data
+        :return: The arguments with the file
+        :doc-author: Trelent
+        """
+        if hasattr(file, "__aiter__"):
+            boundary = secrets.token_hex(16)
+            fields = kwargs.get("data", {})
+            kwargs = {key: value for key, value in kwargs.items() if key != "data"}
+            return dict(kwargs, content=self.multipart(fields, file, boundary),
+                        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        if hasattr(file, "seek"):
+            file.seek(0)
+        return dict(kwargs, files={"file": ("file", file)})
+
+    async def call(self, method: str, path: str, file=None, **kwargs) -> dict[str, Any]:
+        response = await self.request(method, self.base_url + path, file, **kwargs)
+        try:
+            result = response.json()
+        except ValueError:
+            raise CloudError(response.status_code, response.text)
+        if response.is_error:
+            raise CloudError(response.status_code, result.get("error", {}).get("message", response.text))
+        return result
+
+    def signed(self, params: dict) -> dict:
+        params = dict(params, timestamp=utils.now())
+        return utils.sign_request(params, {"api_key": self.api_key, "api_secret": self.api_secret})
+
+    async def upload(self, file, **options) -> dict[str, Any]:
+        """
+        The upload function uploads an image with the same options as cloudinary.uploader.upload.
+
+        :param self: Represent the instance of the class
+        :param file: A file object or the bytes of the image
+        :param options: Upload options, e.g. public_id, overwrite, folder or effects
+        :return: The uploaded resource, with the version and the URLs
+        :doc-author: Trelent
+        """
+        params = self.signed(utils.build_upload_params(**options))
+        return await self.call("POST", "/image/upload", file, data=params)
+
+    async def destroy(self, public_id: str, invalidate: bool = True) -> dict[str, Any]:
+        params = self.signed({"public_id": public_id, "invalidate": invalidate})
+        return await self.call("POST", "/image/destroy", data=params)
+
+    async def delete_prefix(self, prefix: str):
+        # One call removes up to 1000 files and returns next_cursor while more are left.
+        while "next_cursor" in await self.call("DELETE", "/resources/image/upload", params={"prefix": prefix},
+                                               auth=(self.api_key, self.api_secret)):
+            pass
+
+    async def delete_folder(self, path: str) -> dict[str, Any]:
+        return await self.call("DELETE", f"/folders/{path}", auth=(self.api_key, self.api_secret))
+
+    async def resource(self, public_id: str) -> dict[str, Any]:
+        return await self.call("GET", f"/resources/image/upload/{public_id}", auth=(self.api_key, self.api_secret))
+
+    async def download(self, url: str) -> bytes | None:
+        response = await self.request("GET", url)
+        if response.status_code == 200:
+            return response.content
+
+
+cloud_client = CloudClient(settings.cloudinary_name, settings.cloudinary_api_key, settings.cloudinary_api_secret)
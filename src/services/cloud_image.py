@@ -1,77 +1,69 @@
 import hashlib
+import secrets
 from datetime import datetime
-import requests
 
-from fastapi.exceptions import HTTPException
-from fastapi import status
-import cloudinary
-import cloudinary.api
-import cloudinary.uploader
-
-from src.conf.config import settings
-from src.conf import messages
+from src.services.storage import storage
 
 
 class CloudImage:
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True
-    )
+    @staticmethod
+    def user_folder(username: str):
+        return f"share_photo/{username}"
 
     @staticmethod
     def generate_file_name(username: str):
         created_at = datetime.now().strftime("%Y%m%d%H%M%S")
         name = hashlib.sha256(username.encode("utf-8")).hexdigest()[:12]
-        return f"share_photo/{username}/{name}_{created_at}"
+        return f"{CloudImage.user_folder(username)}/{name}_{created_at}"
+
+    @staticmethod
+    def generate_asset_name(sha256: str):
+        """
+        The generate_asset_name function names a file which may be shared by the images of many users.
+        Such a file is kept outside the share_photo folders of the users, which are removed together with them.
+        The random suffix keeps two concurrent uploads of the same content from writing to one file.
+
+        :param sha256: str: The SHA-256 of the content
+        :return: The public id of the file
+        :doc-author: Trelent
+        """
+        return f"assets/{sha256[:2]}/{sha256}_{secrets.token_hex(4)}"
 
     @staticmethod
-    def upload(file, public_id: str):
+    async def upload(file, public_id: str):
         """
         The upload function takes a file and public_id as arguments.
-        The function then uploads the file to Cloudinary using the public_id provided.
-        If no public_id is provided, one will be generated automatically.
+        The function then uploads the file to the storage chosen in the settings using the public_id provided.
+        The transfer does not block the worker, so other requests go on meanwhile.
 
-        :param file: Specify the file to be uploaded
+        :param file: Specify the file to be uploaded, an UploadStream is sent chunk by chunk
         :param public_id: str: Set the public id of the image
-        :return: A dict with the following keys:
+        :return: A dict with the version and the url of the file
         :doc-author: Trelent
         """
-        r = cloudinary.uploader.upload(file, public_id=public_id, overwrite=True)
-        return r
+        return await storage.upload(file, public_id)
 
     @staticmethod
     def get_url_for_avatar(public_id, r):
         """
-        The get_url_for_avatar function takes in a public_id and an r (which is the result of
-        a cloudinary.api.resource call)
+        The get_url_for_avatar function takes in a public_id and an r (which is the result of the upload)
         and returns the URL for that avatar image, which will be used to display it on the page.
 
-        :param public_id: Identify the image in cloudinary
+        :param public_id: Identify the image in the storage
         :param r: Get the version of the image
         :return: The url for the avatar image
         :doc-author: Trelent
         """
-        src_url = cloudinary.CloudinaryImage(public_id).build_url(width=250, height=250,
-                                                                  crop="fill", version=r.get("version"))
-        return src_url
+        return storage.url(public_id, r, width=250, height=250, crop="fill")
 
     @staticmethod
-    def remove_image(username: str, public_id: str):
-        cloudinary.uploader.destroy(f"photo_share/{username}/{public_id}", invalidate=True)
+    async def remove_image(public_id: str):
+        await storage.remove(public_id)
 
     @staticmethod
-    def remove_folder(username):
-        try:
-            cloudinary.api.delete_folder(username)
-        except BaseException:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=messages.NO_FOLDER)
+    async def remove_folder(username):
+        await storage.remove_folder(CloudImage.user_folder(username))
 
     @staticmethod
-    def get_file_by_url(public_id: str):
-        resource = cloudinary.api.resource(public_id)
-        file_url = resource['secure_url']
-        response = requests.get(file_url)
-        if response.status_code == 200:
-            return response.content
+    async def get_file_by_url(public_id: str):
+        return await storage.download(public_id)
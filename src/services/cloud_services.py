@@ -1,22 +1,13 @@
-import cloudinary
-import cloudinary.uploader
 import base64
 import io
 import qrcode
 
 from fastapi import UploadFile
 
-from src.conf.config import settings
+from src.services.storage import storage
 
 
 class TransformImage:
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True
-    )
-
     @staticmethod
     async def upload_image(
         file: UploadFile,
@@ -30,16 +21,16 @@ class TransformImage:
 
         :param: Image name
         :param: Folder name to save the image
-        :param: Overlaying effects on a image provided by the cloudinary service
+        :param: Overlaying effects on a image provided by the cloudinary service, the local storage keeps the original
         :param: Creating a frame around a image
         :param: Transformation of a image into an ellipse or circle
         :return: URL of the image with superimposed effects
         :doc-author: Trelent
         """
         # with file.file as input_file:
-        transform_image_url = cloudinary.uploader.upload(file, folder=folder,
-                                                         effect=effect, border=border,
-                                                         radius=radius)
+        transform_image_url = await storage.transform(file, folder=folder,
+                                                      effect=effect, border=border,
+                                                      radius=radius)
         return transform_image_url
 
     @staticmethod
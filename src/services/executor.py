@@ -0,0 +1,80 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+
+from src.conf import messages
+
+
+class BoundedExecutor:
+    def __init__(self, workers: int, max_queue: int, name: str):
+        """
+        The __init__ function creates a pool of threads for CPU-heavy calls, so they never run
+        on the event loop. At most workers calls run at once and at most max_queue wait for a thread;
+        callers beyond that are turned away at once instead of slowing down every other request.
+
+        :param self: Represent the instance of the class
+        :param workers: int: Number of threads
+        :param max_queue: int: Number of calls allowed to wait for a free thread
+        :param name: str: Prefix of the thread names
+        :return: None
+        :doc-author: Trelent
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def queued(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        The run function calls func in a thread of the pool and waits for the result without blocking the loop.
+
+        :param self: Represent the instance of the class
+        :param func: Callable: The function to call
+        :param args: Arguments of the function
+        :return: The result of the function
+        :doc-author: Trelent
+        """
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=messages.SERVER_BUSY,
+                                headers={"Retry-After": "1"})
+        self.in_flight += 1
+        submitted = time.perf_counter()
+
+        def timed():
+            return time.perf_counter() - submitted, func(*args)
+
+        loop = asyncio.get_running_loop()
+        job = self.pool.submit(timed)
+        # A cancelled caller, e.g. a client which went away, does not stop a running thread,
+        # so the call keeps its place until the job itself ends.
+        job.add_done_callback(lambda _: loop.call_soon_threadsafe(self.release))
+        wait, result = await asyncio.wrap_future(job)
+        self.completed += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        return result
+
+    def release(self):
+        self.in_flight -= 1
+
+    def snapshot(self) -> dict:
+        return {"workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": min(self.in_flight, self.workers),
+                "queued": self.queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_avg_ms": self.wait_total / self.completed * 1000 if self.completed else 0.0,
+                "wait_max_ms": self.wait_max * 1000}
@@ -0,0 +1,44 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class LocalCache:
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        The __init__ function creates a bounded in-process cache. The least recently used entry
+        is dropped when it is full, and entries older than ttl seconds are never returned.
+
+        :param self: Represent the instance of the class
+        :param maxsize: int: The maximum number of entries
+        :param ttl: float: Seconds an entry stays valid, unless it is set with its own ttl
+        :return: None
+        :doc-author: Trelent
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float | None = None):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def pop(self, key: str):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,66 @@
+"""
+Picks the argon2id costs which make one password hash take the target time on this machine.
+
+    python -m src.services.password_calibration --target-ms 250 --memory-mib 64
+
+The result is printed as lines for the .env file.
+"""
+import argparse
+import statistics
+import time
+
+from src.services.auth import password_context
+
+
+# OWASP minimum for argon2id: 19 MiB of memory with two passes.
+MIN_MEMORY_KIB = 19 * 1024
+
+
+def measure(time_cost: int, memory_cost: int, parallelism: int, rounds: int) -> float:
+    context = password_context(time_cost, memory_cost, parallelism)
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        context.hash("calibration password")
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def calibrate(target_ms: float, memory_cost: int, parallelism: int, rounds: int = 5) -> tuple[int, int, float]:
+    """
+    The calibrate function finds the argon2id costs closest to the target latency without exceeding it.
+    Memory is the main cost, since it is what makes attacks on GPUs expensive: it is kept as given
+    and passes are added while the hash stays within the target. When even one pass is too slow,
+    the memory is halved down to the OWASP minimum.
+
+    :param target_ms: float: Wanted duration of one hash in milliseconds
+    :param memory_cost: int: Memory of one hash to start with, in KiB
+    :param parallelism: int: Number of lanes
+    :param rounds: int: Hashes measured for every candidate, the median is used
+    :return: The time cost, the memory cost and the measured duration in milliseconds
+    :doc-author: Trelent
+    """
+    time_cost = 1
+    duration = measure(time_cost, memory_cost, parallelism, rounds)
+    while duration > target_ms and memory_cost > MIN_MEMORY_KIB:
+        memory_cost = max(memory_cost // 2, MIN_MEMORY_KIB)
+        duration = measure(time_cost, memory_cost, parallelism, rounds)
+    while True:
+        slower = measure(time_cost + 1, memory_cost, parallelism, rounds)
+        if slower > target_ms:
+            break
+        time_cost, duration = time_cost + 1, slower
+    return time_cost, memory_cost, duration
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate the argon2id costs of password hashing.")
+    parser.add_argument("--target-ms", type=float, default=250, help="wanted duration of one hash")
+    parser.add_argument("--memory-mib", type=int, default=64, help="memory of one hash to start with")
+    parser.add_argument("--parallelism", type=int, default=1, help="lanes of one hash")
+    args = parser.parse_args()
+    time_cost, memory_cost, duration = calibrate(args.target_ms, args.memory_mib * 1024, args.parallelism)
+    print(f"# one hash takes {duration:.0f} ms")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={memory_cost}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+
+import redis
+
+from src.conf.config import settings
+from src.database.models import User, UserRole
+from src.database.redis_pool import redis_pool, subscribe
+from src.services.local_cache import LocalCache
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    The authenticated user as seen by the routes: only the fields needed to authorize a request.
+    """
+    id: int
+    email: str
+    username: str
+    roles: UserRole
+    confirmed: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.email, user.username, UserRole(user.roles), bool(user.confirmed))
+
+    def dumps(self) -> bytes:
+        return json.dumps([self.id, self.email, self.username, self.roles.value, self.confirmed],
+                          separators=(",", ":")).encode()
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "Principal":
+        user_id, email, username, roles, confirmed = json.loads(raw)
+        return cls(user_id, email, username, UserRole(roles), confirmed)
+
+
+class PrincipalCache:
+    CHANNEL = "principal:invalidate"
+
+    def __init__(self, maxsize: int, local_ttl: float, ttl: int):
+        """
+        The __init__ function creates the two tiers of the principal cache: a small in-process cache
+        which serves most requests without any I/O, and Redis which is shared by all workers.
+
+        :param self: Represent the instance of the class
+        :param maxsize: int: The maximum number of principals kept in the process
+        :param local_ttl: float: Seconds a principal is kept in the process
+        :param ttl: int: Seconds a principal is kept in Redis
+        :return: None
+        :doc-author: Trelent
+        """
+        self.local = LocalCache(maxsize, local_ttl)
+        self.ttl = ttl
+        self.listener = None
+
+    async def get(self, email: str) -> Principal | None:
+        principal = self.local.get(email)
+        if principal is not None:
+            return principal
+        try:
+            raw = await redis_pool.get().get(f"principal:{email}")
+        except redis.RedisError as error:
+            logger.warning("Principal cache is unavailable: %s", error)
+            return None
+        if raw is None:
+            return None
+        principal = Principal.loads(raw)
+        self.local.set(email, principal)
+        return principal
+
+    async def set(self, principal: Principal):
+        self.local.set(principal.email, principal)
+        try:
+            await redis_pool.get().set(f"principal:{principal.email}", principal.dumps(), ex=self.ttl)
+        except redis.RedisError as error:
+            logger.warning("Principal cache is unavailable: %s", error)
+
+    async def invalidate(self, email: str):
+        """
+        The invalidate function drops a principal from both tiers and tells the other workers
+        to drop it from their in-process caches too. It is called after the role, the ban state
+        or the tokens of a user have changed.
+
+        :param self: Represent the instance of the class
+        :param email: str: The email of the user
+        :return: None
+        :doc-author: Trelent
+        """
+        self.local.pop(email)
+        red = redis_pool.get()
+        try:
+            await red.delete(f"principal:{email}")
+            await red.publish(self.CHANNEL, email)
+        except redis.RedisError as error:
+            logger.warning("Principal cache is unavailable: %s", error)
+
+    async def listen(self):
+        """
+        The listen function drops the principals invalidated by other workers from the in-process cache.
+        It runs as a background task for the lifetime of the application.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Trelent
+        """
+        await subscribe(self.CHANNEL, lambda email: self.local.pop(email.decode()),
+                        on_disconnect=self.local.clear)
+
+    def start(self):
+        self.listener = asyncio.create_task(self.listen())
+
+    async def stop(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+            self.listener = None
+
+
+principal_cache = PrincipalCache(settings.principal_cache_size, settings.principal_cache_local_ttl,
+                                 settings.principal_cache_ttl)
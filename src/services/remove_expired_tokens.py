@@ -2,22 +2,23 @@ from datetime import datetime
 
 from fastapi.exceptions import HTTPException
 from fastapi import status
-from jose import jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import BanList
 from src.conf.config import settings
+from src.services.token_cache import verified_tokens
 
 
 async def get_token_data(token: str):
     try:
-        token_data = jwt.decode(token, settings.secret_key_a, algorithms=settings.algorithm)
+        token_data = verified_tokens.decode(token, settings.secret_key_a, settings.algorithm)
         return token_data
     except HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="") as exc:
         raise exc
 
 
-async def check_token(db: Session):
+async def check_token(db: AsyncSession):
     tokens = await get_all_tokens(db)
     result = []
     if tokens:
@@ -29,17 +30,17 @@ async def check_token(db: Session):
     return result
 
 
-async def remove_token(token: str, db: Session):
+async def remove_token(token: str, db: AsyncSession):
     token_from = await get_token(token, db)
     if token_from:
-        db.delete(token_from)
-        db.commit()
+        await db.delete(token_from)
+        await db.commit()
     return token_from
 
 
-async def get_token(token: str, db: Session):
-    return db.query(BanList).filter_by(access_token=token)
+async def get_token(token: str, db: AsyncSession):
+    return await db.scalar(select(BanList).filter_by(access_token=token))
 
 
-async def get_all_tokens(db: Session):
-    return db.query(BanList).all()
+async def get_all_tokens(db: AsyncSession):
+    return (await db.scalars(select(BanList))).all()
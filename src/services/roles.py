@@ -2,7 +2,8 @@ from typing import List
 
 from fastapi import Depends, HTTPException, Request, status
 
-from src.database.models import User, UserRole
+from src.database.models import UserRole
+from src.services.principals import Principal
 from src.services.auth import auth_user
 
 
@@ -20,7 +21,7 @@ class RoleAccess:
         """
         self.allowed_roles = allowed_roles
 
-    async def __call__(self, request: Request, current_user: User = Depends(auth_user.get_current_user)):
+    async def __call__(self, request: Request, current_user: Principal = Depends(auth_user.get_current_user)):
         """
         The __call__ function is the function that will be called when a user tries to access this endpoint.
         It takes in two parameters: request and current_user. The request parameter is an object containing
@@ -29,7 +30,7 @@ class RoleAccess:
 
         :param self: Access the class attributes
         :param request: Request: Get the request object
-        :param current_user: User: Get the current user
+        :param current_user: Principal: Get the current user
         :return: A function that is decorated with the @router
         :doc-author: Trelent
         """
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+
+import redis
+from fastapi import HTTPException, status
+
+from src.conf.config import settings
+from src.conf import messages
+from src.database.redis_pool import redis_pool
+from src.schemes.search import SearchModel, SortModel
+
+
+logger = logging.getLogger(__name__)
+
+# Kinds of changes a cached search result can depend on. Each one has a version counter;
+# a change bumps its counter, so every key built with the old value is never read again.
+UPLOADED = "uploaded"
+DELETED = "deleted"
+DESCRIBED = "described"
+TAGGED = "tagged"
+RATED = "rated"
+ALL = "all"
+
+
+def dependencies(search: dict, sort: dict) -> list[str]:
+    """
+    The dependencies function lists the kinds of changes which can alter the result of a search.
+    A new upload has neither tags nor rates, so it can not appear in tag or rating searches;
+    deleting an image can change any result.
+
+    :param search: dict: Normalized search criteria
+    :param sort: dict: Normalized sort flags
+    :return: Names of the version counters the result depends on
+    :doc-author: Trelent
+    """
+    kinds = [ALL, DELETED]
+    if not search["tags"] and search["min_rating"] is None:
+        kinds.append(UPLOADED)
+    if search["description"] or search["text"]:
+        kinds.append(DESCRIBED)
+    if search["tags"]:
+        kinds.append(TAGGED)
+    if search["min_rating"] is not None or sort["rating"]:
+        kinds.append(RATED)
+    return kinds
+
+
+class SearchCache:
+    ttl = settings.search_cache_ttl
+
+    @staticmethod
+    def normalize(body_search: SearchModel, body_sort: SortModel) -> tuple[dict, dict]:
+        search = body_search.model_dump()
+        tags = {keyword.strip().lower() for keyword in (search["tags"] or "").split(",") if keyword.strip()}
+        search["tags"] = sorted(tags) or None
+        sort = body_sort.model_dump()
+        sort["descending"] = sort["descending"] is not False
+        return search, sort
+
+    async def key(self, body_search: SearchModel, body_sort: SortModel, cursor: str | None, limit: int) -> str | None:
+        """
+        The key function builds the cache key of one page of search results.
+        Equal searches written differently, e.g. with tags in another order, get the same key.
+        The current values of all version counters the result depends on are part of the key.
+
+        :param self: Represent the instance of the class
+        :param body_search: SearchModel: The search criteria
+        :param body_sort: SortModel: The sort flags
+        :param cursor: str | None: The cursor of the page
+        :param limit: int: The size of the page
+        :return: The key, or None when caching is disabled or Redis is unavailable
+        :doc-author: Trelent
+        """
+        if self.ttl <= 0:
+            return None
+        search, sort = self.normalize(body_search, body_sort)
+        raw = json.dumps({"search": search, "sort": sort, "cursor": cursor, "limit": limit},
+                         sort_keys=True, default=str)
+        digest = hashlib.sha256(raw.encode()).hexdigest()[:32]
+        kinds = dependencies(search, sort)
+        try:
+            versions = await redis_pool.get().mget([f"search:version:{kind}" for kind in kinds])
+        except redis.RedisError as error:
+            logger.warning("Search cache is unavailable: %s", error)
+            return None
+        return f"search:page:{digest}:" + ".".join(version.decode() if version else "0" for version in versions)
+
+    async def get(self, key: str | None) -> dict | None:
+        if key is None:
+            return None
+        red = redis_pool.get()
+        try:
+            value = await red.get(key)
+            await red.incr("search:hits" if value else "search:misses")
+        except redis.RedisError as error:
+            logger.warning("Search cache is unavailable: %s", error)
+            return None
+        return json.loads(value) if value else None
+
+    async def set(self, key: str | None, ids: list[int], next_cursor: str | None):
+        if key is None:
+            return
+        try:
+            await redis_pool.get().set(key, json.dumps({"ids": ids, "next_cursor": next_cursor}, separators=(",", ":")), ex=self.ttl)
+        except redis.RedisError as error:
+            logger.warning("Search cache is unavailable: %s", error)
+
+    async def touch(self, *kinds: str):
+        """
+        The touch function invalidates the cached results which depend on the given kinds of changes.
+
+        :param self: Represent the instance of the class
+        :param kinds: str: Kinds of the changes which were made
+        :return: None
+        :doc-author: Trelent
+        """
+        if self.ttl <= 0:
+            return
+        try:
+            pipe = redis_pool.get().pipeline(transaction=False)
+            for kind in kinds:
+                pipe.incr(f"search:version:{kind}")
+            await pipe.execute()
+        except redis.RedisError as error:
+            logger.warning("Search cache is unavailable: %s", error)
+
+    async def stats(self) -> dict:
+        try:
+            hits, misses = await redis_pool.get().mget(["search:hits", "search:misses"])
+        except redis.RedisError as error:
+            logger.warning("Search cache is unavailable: %s", error)
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=messages.CACHE_UNAVAILABLE)
+        hits, misses = int(hits or 0), int(misses or 0)
+        return {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+
+
+search_cache = SearchCache()
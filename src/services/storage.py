@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import os
+import secrets
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+import cloudinary
+from fastapi import HTTPException, status
+
+from src.conf.config import settings
+from src.conf import messages
+from src.services.cloud_client import cloud_client, CloudError
+
+
+class Storage(ABC):
+    """
+    Where the image files live. Every file is addressed by its public id; uploads return a dict
+    with at least the version and the url of the file, as Cloudinary does.
+    """
+
+    @abstractmethod
+    async def upload(self, file, public_id: str) -> dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def url(self, public_id: str, result: dict, **transformation) -> str:
+        ...
+
+    @abstractmethod
+    async def remove(self, public_id: str):
+        ...
+
+    @abstractmethod
+    async def remove_folder(self, path: str):
+        ...
+
+    @abstractmethod
+    async def download(self, public_id: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    async def transform(self, file, folder: str = None, **effects) -> dict[str, Any]:
+        ...
+
+    async def close(self):
+        pass
+
+
+class CloudinaryStorage(Storage):
+    def __init__(self):
+        cloudinary.config(
+            cloud_name=settings.cloudinary_name,
+            api_key=settings.cloudinary_api_key,
+            api_secret=settings.cloudinary_api_secret,
+            secure=True
+        )
+
+    async def upload(self, file, public_id: str) -> dict[str, Any]:
+        try:
+            return await cloud_client.upload(file, public_id=public_id, overwrite=True)
+        except CloudError:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=messages.CLOUD_UNAVAILABLE)
+
+    def url(self, public_id: str, result: dict, **transformation) -> str:
+        return cloudinary.CloudinaryImage(public_id).build_url(version=result.get("version"), **transformation)
+
+    async def remove(self, public_id: str):
+        await cloud_client.destroy(public_id, invalidate=True)
+
+    async def remove_folder(self, path: str):
+        try:
+            # Cloudinary only removes empty folders.
+            await cloud_client.delete_prefix(path + "/")
+            await cloud_client.delete_folder(path)
+        except CloudError as error:
+            # A folder which was never created, e.g. of a user without an avatar, is as good as removed.
+            if error.status_code != status.HTTP_404_NOT_FOUND:
+                raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=messages.CLOUD_UNAVAILABLE)
+
+    async def download(self, public_id: str) -> bytes | None:
+        try:
+            resource = await cloud_client.resource(public_id)
+        except CloudError:
+            return None
+        return await cloud_client.download(resource['secure_url'])
+
+    async def transform(self, file, folder: str = None, **effects) -> dict[str, Any]:
+        return await cloud_client.upload(file, folder=folder, **effects)
+
+    async def close(self):
+        await cloud_client.close()
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str, base_url: str):
+        """
+        The __init__ function sets up storage of the files on the local disk, e.g. to run the application
+        without Cloudinary or to measure it without a remote service in the loop.
+        Every file is kept in the folder of its public id, e.g. the folder of its user, spread over
+        two levels of directories named by the hash of the public id, so no directory grows too large.
+
+        :param self: Represent the instance of the class
+        :param root: str: The directory of the files
+        :param base_url: str: The URL the files are served from
+        :return: None
+        :doc-author: Trelent
+        """
+        self.root = Path(os.path.normpath(root))
+        self.base_url = base_url.rstrip("/")
+
+    def folder(self, path: str) -> Path:
+        """
+        The folder function maps a folder of public ids to its directory.
+        Public ids come from requests, so a folder which leads out of the root, e.g. with "..", is refused.
+
+        :param self: Represent the instance of the class
+        :param path: str: The folder, e.g. share_photo/username
+        :return: The directory
+        :raises ValueError: When the folder is outside of the root
+        :doc-author: Trelent
+        """
+        folder = Path(os.path.normpath(self.root / path))
+        if not folder.is_relative_to(self.root):
+            raise ValueError(f"{path} is outside of the storage")
+        return folder
+
+    def path(self, public_id: str) -> Path:
+        key = hashlib.sha256(public_id.encode()).hexdigest()
+        return self.folder(public_id.rpartition("/")[0]) / key[:2] / key[2:4] / key
+
+    @staticmethod
+    def open_temporary(path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=path.parent, prefix=".upload-", delete=False)
+
+    @staticmethod
+    def commit(out, path: Path):
+        out.flush()
+        os.fsync(out.fileno())
+        out.close()
+        os.replace(out.name, path)
+
+    async def upload(self, file, public_id: str) -> dict[str, Any]:
+        """
+        The upload function writes the file to a temporary file next to its place and renames it when complete,
+        so readers see either the old file or the whole new one. Disk writes run in threads, a chunk at a time.
+
+        :param self: Represent the instance of the class
+        :param file: An UploadStream, bytes or a file object
+        :param public_id: str: The public id of the file
+        :return: The version and the url of the file
+        :doc-author: Trelent
+        """
+        path = self.path(public_id)
+        out = await asyncio.to_thread(self.open_temporary, path)
+        try:
+            if hasattr(file, "__aiter__"):
+                async for chunk in file:
+                    await asyncio.to_thread(out.write, chunk)
+            else:
+                await asyncio.to_thread(out.write, file if isinstance(file, bytes) else file.read())
+            await asyncio.to_thread(self.commit, out, path)
+        except BaseException:
+            out.close()
+            Path(out.name).unlink(missing_ok=True)
+            raise
+        version = path.stat().st_mtime_ns
+        url = self.url(public_id, {"version": version})
+        return {"public_id": public_id, "version": version, "url": url, "secure_url": url}
+
+    def url(self, public_id: str, result: dict, **transformation) -> str:
+        # Transformations are not applied to local files, the original is served.
+        return f"{self.base_url}/{public_id}?v={result.get('version')}"
+
+    async def remove(self, public_id: str):
+        await asyncio.to_thread(self.path(public_id).unlink, missing_ok=True)
+
+    async def remove_folder(self, path: str):
+        """
+        The remove_folder function removes all files of a folder, e.g. of a removed user.
+        The directory is renamed first, so its files stop being served at once, and then deleted.
+
+        :param self: Represent the instance of the class
+        :param path: str: The folder
+        :return: None
+        :doc-author: Trelent
+        """
+        folder = self.folder(path)
+        if folder == self.root:
+            raise ValueError("The root of the storage can not be removed")
+        removed = self.root / f".removed-{secrets.token_hex(8)}"
+        try:
+            await asyncio.to_thread(os.replace, folder, removed)
+        except FileNotFoundError:
+            return
+        await asyncio.to_thread(shutil.rmtree, removed)
+
+    async def download(self, public_id: str) -> bytes | None:
+        path = self.path(public_id)
+        if path.is_file():
+            return await asyncio.to_thread(path.read_bytes)
+
+    async def transform(self, file, folder: str = None, **effects) -> dict[str, Any]:
+        # There is no image processing here: the copy is stored as is under a new random id, as Cloudinary names it.
+        public_id = "/".join(part for part in (folder, secrets.token_hex(10)) if part)
+        return await self.upload(file, public_id)
+
+
+def create_storage(backend: str) -> Storage:
+    if backend == "cloudinary":
+        return CloudinaryStorage()
+    if backend == "local":
+        return LocalStorage(settings.storage_local_root, settings.storage_local_url)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+storage = create_storage(settings.storage_backend)
@@ -1,8 +1,12 @@
+import asyncio
+
 from celery import Celery
 from celery.schedules import crontab
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.conf.config import settings
+from src.database.connection import build_engine, url
+from src.repositories.images import reconcile_images_count
 from src.services.remove_expired_tokens import check_token
 
 
@@ -10,14 +14,40 @@ celery = Celery('tasks', broker=settings.broker_url, backend=settings.backend_ur
 
 
 @celery.task(name='Remove expired tokens of logouted users')
-async def remove_tokens(db: Session):
+async def remove_tokens(db: AsyncSession):
     result = await check_token(db)
     return result
 
 
+async def reconcile(db_url: str) -> int:
+    """
+    The reconcile function repairs the images counters in an event loop of its own.
+    The engine is created and disposed here, as the pool of the application belongs to another loop.
+
+    :param db_url: str: The URL of the primary database
+    :return: The number of corrected users
+    :doc-author: Trelent
+    """
+    engine = build_engine(db_url)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            return await reconcile_images_count(db)
+    finally:
+        await engine.dispose()
+
+
+@celery.task(name='Reconcile images count of users')
+def reconcile_images():
+    return asyncio.run(reconcile(url))
+
+
 celery.conf.beat_schedule = {
     'remove-tokens': {
         'task': 'src.services.tasks.remove_tokens',
         'schedule': crontab(minute="0", hour='*/6'),
     },
+    'reconcile-images': {
+        'task': 'src.services.tasks.reconcile_images',
+        'schedule': crontab(minute="30", hour='3'),
+    },
 }
@@ -0,0 +1,55 @@
+import hashlib
+import time
+
+from jose import jwt
+
+from src.conf.config import settings
+from src.services.local_cache import LocalCache
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class VerifiedTokens:
+    def __init__(self, maxsize: int):
+        """
+        The __init__ function creates a bounded cache of the payloads of tokens whose signature
+        has already been verified. Entries are keyed by the SHA-256 digest of the token, the same
+        digest as in the ban list, so revoked tokens are dropped by their hash.
+
+        :param self: Represent the instance of the class
+        :param maxsize: int: The maximum number of tokens kept, 0 disables the cache
+        :return: None
+        :doc-author: Trelent
+        """
+        self.local = LocalCache(maxsize, 0)
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict:
+        """
+        The decode function works as jwt.decode, but verifies every token only once.
+        The payload is kept until the exp of the token, so an expired token is verified again
+        and rejected by jwt.decode as before. Tokens without exp are never cached.
+
+        :param self: Represent the instance of the class
+        :param token: str: The encoded token
+        :param key: str: The secret key the token has to be signed with
+        :param algorithm: str: The signing algorithm
+        :return: The payload of the token
+        :doc-author: Trelent
+        """
+        digest = token_digest(token)
+        entry = self.local.get(digest)
+        if entry is not None and entry[0] == key and entry[1] == algorithm:
+            return entry[2]
+        payload = jwt.decode(token, key, algorithms=[algorithm])
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            self.local.set(digest, (key, algorithm, payload), ttl=exp - time.time())
+        return payload
+
+    def discard(self, digest: str):
+        self.local.pop(digest)
+
+
+verified_tokens = VerifiedTokens(settings.jwt_cache_size)
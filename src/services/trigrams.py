@@ -0,0 +1,101 @@
+import re
+from collections import defaultdict
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Tag
+
+
+# Same default as pg_trgm.similarity_threshold, so both paths return the same tags.
+SIMILARITY_THRESHOLD = 0.3
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    The trigrams function splits a text into trigrams the way pg_trgm does:
+    every word is lowercased and padded with two spaces in front and one behind.
+
+    :param text: str: Text to split
+    :return: The set of trigrams of all words
+    :doc-author: Trelent
+    """
+    result = set()
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(first: set[str], second: set[str]) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class TrigramIndex:
+    def __init__(self):
+        """
+        The __init__ function creates an empty in-memory index of tag trigrams.
+        It stands in for the pg_trgm GIN index on databases without the extension.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Trelent
+        """
+        self.tags: dict[int, tuple[str, set[str]]] = {}
+        self.postings: dict[str, set[int]] = defaultdict(set)
+        self.version = None
+
+    def build(self, tags: list[tuple[int, str]], version):
+        self.tags.clear()
+        self.postings.clear()
+        for tag_id, tag in tags:
+            grams = trigrams(tag)
+            self.tags[tag_id] = (tag.lower(), grams)
+            for gram in grams:
+                self.postings[gram].add(tag_id)
+        self.version = version
+
+    async def refresh(self, db: AsyncSession):
+        """
+        The refresh function rebuilds the index when the tags table has changed since the last build.
+        The check is one aggregate query, the rebuild reads every tag once.
+
+        :param self: Represent the instance of the class
+        :param db: AsyncSession: Get the database session
+        :return: None
+        :doc-author: Trelent
+        """
+        version = tuple((await db.execute(select(func.count(Tag.id), func.max(Tag.id),
+                                                 func.max(Tag.updated_at)))).one())
+        if version != self.version:
+            self.build((await db.execute(select(Tag.id, Tag.tag))).all(), version)
+
+    def search(self, keyword: str, limit: int | None = None) -> list[int]:
+        """
+        The search function finds the tags which contain the keyword or are similar to it.
+        Candidates come from the posting lists of the keyword trigrams, so only tags sharing
+        at least one trigram with it are compared. Keywords shorter than a trigram or with
+        punctuation are matched as substrings by a scan, the same as a short LIKE pattern would be.
+
+        :param self: Represent the instance of the class
+        :param keyword: str: Text to look for
+        :param limit: int | None: The maximum number of tags to return
+        :return: Ids of the matching tags, the most similar first
+        :doc-author: Trelent
+        """
+        needle, grams = keyword.lower(), trigrams(keyword)
+        candidates = set().union(*(self.postings.get(gram, ()) for gram in grams)) if grams else set()
+        if len(needle) < 3 or not re.fullmatch(r"\w+", needle):
+            candidates.update(tag_id for tag_id, (tag, _) in self.tags.items() if needle in tag)
+        ranked = []
+        for tag_id in candidates:
+            tag, tag_grams = self.tags[tag_id]
+            score = similarity(grams, tag_grams)
+            if needle in tag or score >= SIMILARITY_THRESHOLD:
+                ranked.append((-score, tag_id))
+        return [tag_id for _, tag_id in sorted(ranked)[:limit]]
+
+
+tag_index = TrigramIndex()
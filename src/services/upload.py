@@ -0,0 +1,160 @@
+import hashlib
+import struct
+from typing import AsyncIterator
+
+from fastapi import HTTPException, UploadFile, status
+
+from src.conf.config import settings
+from src.conf import messages
+
+
+# JPEG keeps its size in the SOF segment, after EXIF and other metadata which may take up to 64 KiB each.
+HEADER_LIMIT = 256 * 1024
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_size(head: bytes) -> tuple[int, int] | None:
+    """
+    The image_size function reads the width and the height of a PNG, JPEG, GIF or WebP image
+    from its first bytes, without decoding the image.
+
+    :param head: bytes: The beginning of the file
+    :return: The width and the height, or None when more bytes are needed
+    :raises ValueError: When the file is not an image of a supported format
+    :doc-author: Trelent
+    """
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return struct.unpack(">II", head[16:24]) if len(head) >= 24 else None
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", head[6:10]) if len(head) >= 10 else None
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        if len(head) < 30:
+            return None
+        chunk = head[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(head[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+        raise ValueError("unknown WebP chunk")
+    if head[:2] == b"\xff\xd8":
+        pos = 2
+        while pos + 4 <= len(head):
+            if head[pos] != 0xFF:
+                raise ValueError("broken JPEG segment")
+            marker = head[pos + 1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            if marker in JPEG_SOF:
+                if pos + 9 > len(head):
+                    return None
+                height, width = struct.unpack(">HH", head[pos + 5:pos + 9])
+                return width, height
+            pos += 2 + struct.unpack(">H", head[pos + 2:pos + 4])[0]
+        return None
+    if len(head) < 12:
+        return None
+    raise ValueError("not a supported image")
+
+
+def media_type(head: bytes) -> str:
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head[:2] == b"\xff\xd8":
+        return "image/jpeg"
+    if head[:3] == b"GIF":
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class UploadStream:
+    def __init__(self, file: UploadFile, max_bytes: int = settings.upload_max_bytes,
+                 max_pixels: int = settings.upload_max_pixels, chunk_size: int = settings.upload_chunk_size):
+        """
+        The __init__ function wraps an uploaded file, so it is sent to the storage chunk by chunk
+        and hashed on the way, instead of being read into memory as a whole.
+
+        :param self: Represent the instance of the class
+        :param file: UploadFile: The file from the request
+        :param max_bytes: int: The largest file accepted
+        :param max_pixels: int: The largest width times height accepted
+        :param chunk_size: int: The number of bytes read and sent at once
+        :return: None
+        :doc-author: Trelent
+        """
+        self.file = file
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.chunk_size = chunk_size
+        self.width: int | None = None
+        self.height: int | None = None
+        self.size: int | None = None
+        self.sha256: str | None = None
+
+    def too_large(self) -> HTTPException:
+        return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=messages.FILE_TOO_LARGE)
+
+    async def check(self):
+        """
+        The check function rejects the file before any of it goes to the storage: by the size the request
+        declared, then by the format and the dimensions written in the header of the image.
+
+        :param self: Represent the instance of the class
+        :return: None
+        :doc-author: Trelent
+        """
+        if self.file.size is not None and self.file.size > self.max_bytes:
+            raise self.too_large()
+        await self.file.seek(0)
+        head = b""
+        try:
+            while (size := image_size(head)) is None:
+                chunk = await self.file.read(self.chunk_size)
+                if not chunk or len(head) >= HEADER_LIMIT:
+                    raise ValueError("no image header")
+                head += chunk
+                if len(head) > self.max_bytes:
+                    raise self.too_large()
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=messages.NOT_AN_IMAGE)
+        self.width, self.height = size
+        if self.width * self.height > self.max_pixels:
+            raise self.too_large()
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        """
+        The __aiter__ function yields the file from the start in chunks, so a failed transfer can be sent again.
+        The SHA-256 and the size are ready once the last chunk is sent.
+
+        :param self: Represent the instance of the class
+        :return: The chunks of the file
+        :doc-author: Trelent
+        """
+        digest, size = hashlib.sha256(), 0
+        await self.file.seek(0)
+        while chunk := await self.file.read(self.chunk_size):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise self.too_large()
+            digest.update(chunk)
+            yield chunk
+        self.size, self.sha256 = size, digest.hexdigest()
+
+    async def digest(self) -> str:
+        """
+        The digest function reads the file once without sending it anywhere, so the storage can be asked
+        whether it already has the same content before the upload starts.
+
+        :param self: Represent the instance of the class
+        :return: The SHA-256 of the file as a hex string
+        :doc-author: Trelent
+        """
+        async for _ in self:
+            pass
+        return self.sha256
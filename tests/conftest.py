@@ -1,12 +1,16 @@
+import asyncio
 import os
 import sys
 from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from ipaddress import ip_address
 from io import BytesIO
 
@@ -15,7 +19,9 @@ sys.path.append(os.path.dirname(SCRIPT_DIR))
 
 from main import app
 from src.database.models import Base, User, Image
-from src.database.connection import get_db
+from src.database.connection import get_db, get_read_db
+from src.services import search_cache as cache
+from src.services.search_cache import search_cache
 
 
 def mocked_ip_address(ip_str):
@@ -29,6 +35,14 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The application talks to the same file through the async driver, while tests
+# keep a sync session for arranging and inspecting data.
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autocommit=False,
+                                              autoflush=False, expire_on_commit=False)
+
 
 # pytest --cov=. --cov-report html tests
 class MockCloudImage:
@@ -50,6 +64,13 @@ def mock_cloud_image():
     return MockCloudImage
 
 
+@pytest.fixture
+def image_file():
+    # The smallest valid PNG: one transparent pixel.
+    return (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4"
+            b"\x89\x00\x00\x00\rIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82")
+
+
 @pytest.fixture
 def in_memory_file():
     image_content = b'some binary image data'
@@ -60,8 +81,18 @@ def in_memory_file():
 def session():
     # Create the database
     Base.metadata.create_all(bind=engine)
+    # Ids are reused by every module, so search results cached by another one are stale.
+    asyncio.run(search_cache.touch(cache.ALL))
     #
     db = TestingSessionLocal()
+
+    # Rows are changed by the application through another connection,
+    # so always reload them instead of returning stale identity map state.
+    @event.listens_for(db, "do_orm_execute")
+    def _populate_existing(orm_execute_state):
+        if orm_execute_state.is_select:
+            orm_execute_state.update_execution_options(populate_existing=True)
+
     try:
         yield db
     finally:
@@ -69,15 +100,20 @@ def session():
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest_asyncio.fixture
+async def async_session(session):
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 @pytest.fixture(scope="module")
 def client(session):
     # Dependency override
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     yield TestClient(app)
 
 
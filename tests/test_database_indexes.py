@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from src.repositories.comments import CommentServices
+from src.repositories.images import ImageServices
+from src.repositories.rating import check_repeating_rate
+from src.repositories.search_images import search_result
+from src.repositories.tags import get_image_tags
+from src.repositories.users import get_account
+from src.services.remove_expired_tokens import get_token
+from src.schemes.search import SearchModel, SortModel
+
+
+async def query_plans(session, async_session, query) -> str:
+    """
+    Runs a repository query, then asks the database how it executed every statement of it.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(async_session.bind.sync_engine, "before_cursor_execute", capture)
+    try:
+        await query
+    finally:
+        event.remove(async_session.bind.sync_engine, "before_cursor_execute", capture)
+    connection = session.connection()
+    return "\n".join(str(row) for statement, parameters in statements
+                     for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query, index", [
+    (lambda db: check_repeating_rate(1, SimpleNamespace(id=1), db), "ix_ratings_image_id_user_id"),
+    (lambda db: get_image_tags(1, db), "ix_tag_images_image_id_tag_id"),
+    (lambda db: search_result(SearchModel(tags="tag"), SortModel(), None, 10, db), "ix_tag_images_image_id_tag_id"),
+    (lambda db: CommentServices.get_comments(1, None, 10, db), "ix_comment_images_image_id"),
+    (lambda db: ImageServices.get_all_images(1, None, 10, db), "ix_images_user_id_created_at"),
+    (lambda db: get_token("access_token", db), "ix_ban_lists_access_token"),
+    (lambda db: get_account("username", db), "ix_accounts_username"),
+])
+async def test_lookup_uses_index(query, index, session, async_session):
+    plan = await query_plans(session, async_session, query(async_session))
+    assert index in plan, plan
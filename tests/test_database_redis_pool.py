@@ -0,0 +1,18 @@
+import pytest
+
+from src.conf.config import settings
+from src.database.redis_pool import RedisPool
+
+
+@pytest.mark.asyncio
+async def test_redis_pool_shared_client():
+    pool = RedisPool()
+    client = pool.connect()
+    try:
+        assert pool.get() is client
+        assert client.connection_pool.max_connections == settings.redis_max_connections
+        assert client.connection_pool.connection_kwargs["socket_timeout"] == settings.redis_socket_timeout
+        assert await client.ping()
+    finally:
+        await pool.close()
+    assert pool.client is None
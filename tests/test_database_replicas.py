@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from src.database.connection import ReplicaRouter
+
+
+def fake_engine(checked_out: int):
+    return SimpleNamespace(pool=SimpleNamespace(checkedout=lambda: checked_out))
+
+
+def test_choose_without_replicas():
+    assert ReplicaRouter([], []).choose() is None
+
+
+def test_choose_least_loaded():
+    busy, idle = fake_engine(5), fake_engine(1)
+    router = ReplicaRouter([busy, idle], [])
+    assert all(router.choose() is idle for _ in range(4))
+
+
+def test_choose_respects_weights():
+    small, big = fake_engine(2), fake_engine(4)
+    router = ReplicaRouter([small, big], [1, 4])
+    assert router.choose() is big
+
+
+def test_choose_rotates_between_idle_replicas():
+    first, second = fake_engine(0), fake_engine(0)
+    router = ReplicaRouter([first, second], [])
+    chosen = [router.choose(), router.choose()]
+    assert any(engine is first for engine in chosen) and any(engine is second for engine in chosen)
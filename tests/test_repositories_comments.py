@@ -1,7 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
+from unittest.mock import AsyncMock
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.models import User, Image, Comment
 
 from src.repositories.comments import CommentServices
@@ -9,7 +9,7 @@ from src.repositories.comments import CommentServices
 
 @pytest.fixture
 def session():
-    return MagicMock(spec=Session)
+    return AsyncMock(spec=AsyncSession)
 
 
 @pytest.fixture
@@ -31,7 +31,7 @@ def client():
 @pytest.mark.asyncio
 async def test_get_comment(session):
     expected_comment = Comment(id=1, comment="Test content")
-    session.query().filter().first.return_value = expected_comment
+    session.scalar.return_value = expected_comment
     result = await CommentServices.get_comment(comment_id=1, db=session)
     assert result == expected_comment
 
@@ -39,8 +39,8 @@ async def test_get_comment(session):
 @pytest.mark.asyncio
 async def test_delete_comment(session):
     existing_comment = Comment(id=1, comment="Old content")
-    session.query().filter().first.return_value = existing_comment
+    session.scalar.return_value = existing_comment
     deleted_comment = await CommentServices.delete_comment(1, session)
     assert deleted_comment == existing_comment
-    session.delete.assert_called_once_with(existing_comment)
-    session.commit.assert_called_once()
+    session.delete.assert_awaited_once_with(existing_comment)
+    session.commit.assert_awaited_once()
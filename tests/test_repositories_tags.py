@@ -2,8 +2,11 @@ import pytest
 
 from datetime import datetime
 
-from src.repositories.tags import get_image_tags, get_tag_by_name, create_tag, get_tag_by_id
+from sqlalchemy.dialects import postgresql
+
+from src.repositories.tags import get_image_tags, get_tag_by_name, create_tag, get_tag_by_id, find_tag_ids
 from src.database.models import Tag
+from src.services.trigrams import TrigramIndex, trigrams, similarity
 
 
 class TestTags:
@@ -16,27 +19,27 @@ class TestTags:
         )
 
     @pytest.mark.asyncio
-    async def test_get_image_tags_with_no_records(self, session):
+    async def test_get_image_tags_with_no_records(self, async_session):
         # Викликаємо функцію get_image_tags для image_id без записів
-        tags = await get_image_tags(2, session)
+        tags = await get_image_tags(2, async_session)
 
         # Перевіряємо, що результат є пустим (None)
         assert tags == []
 
     @pytest.mark.asyncio
-    async def test_get_tag_by_name_not_found(self, session):
+    async def test_get_tag_by_name_not_found(self, async_session):
 
         # Викликаємо функцію get_tag_by_name для тегу, який не існує
-        result_tag = await get_tag_by_name('non_existent_tag', session)
+        result_tag = await get_tag_by_name('non_existent_tag', async_session)
 
         # Перевіряємо, що результат є None, оскільки тег не був знайдений
         assert result_tag is None
 
     @pytest.mark.asyncio
-    async def test_create_tag(self, session):
+    async def test_create_tag(self, session, async_session):
         # Викликаємо функцію create_tag для створення нового тегу
         new_tag_name = 'new_tag'
-        created_tag = await create_tag(new_tag_name, session)
+        created_tag = await create_tag(new_tag_name, async_session)
 
         # Перевіряємо, що результат не є пустим і містить очікуваний тег
         assert created_tag is not None
@@ -48,10 +51,56 @@ class TestTags:
         assert retrieved_tag.tag == new_tag_name
 
     @pytest.mark.asyncio
-    async def test_get_tag_by_id(self, tags_model, session):
+    async def test_get_tag_by_id(self, tags_model, async_session):
         # Отримуємо тестовий тег за ідентифікатором, який має бути 1
-        tag = await get_tag_by_id(1, session)
+        tag = await get_tag_by_id(1, async_session)
 
         # Перевіряємо, що тег не є пустим і має правильний ідентифікатор
         assert tag is not None
         assert tag.id == tags_model.id
+
+    @pytest.mark.asyncio
+    async def test_find_tag_ids(self, session, async_session):
+        session.add_all([Tag(tag=name) for name in ["sunset", "sunsets", "sunrise", "mountain"]])
+        session.commit()
+        ids = {tag.tag: tag.id for tag in session.query(Tag).all()}
+
+        assert await find_tag_ids("sunset", async_session) == [ids["sunset"], ids["sunsets"]]
+        assert await find_tag_ids("sunsett", async_session) == [ids["sunset"], ids["sunsets"]]
+        assert await find_tag_ids("unt", async_session) == [ids["mountain"]]
+
+        session.add(Tag(tag="sunset_glow"))
+        session.commit()
+        assert len(await find_tag_ids("sunset", async_session)) == 3
+
+
+def test_trigrams_like_pg_trgm():
+    assert trigrams("Cat") == {"  c", " ca", "cat", "at "}
+    assert round(similarity(trigrams("cat"), trigrams("car")), 2) == 0.33
+
+
+def test_trigram_index_short_keyword():
+    index = TrigramIndex()
+    index.build([(1, "ox"), (2, "fox"), (3, "cat")], version=1)
+    assert sorted(index.search("ox")) == [1, 2]
+    assert index.search("fox", limit=1) == [2]
+
+
+@pytest.mark.asyncio
+async def test_find_tag_ids_postgres_query():
+    # Postgres is matched by the pg_trgm operators, which the GIN index on tags.tag serves
+    statements = []
+
+    class Session:
+        @staticmethod
+        def get_bind():
+            return type("Bind", (), {"dialect": postgresql.dialect()})
+
+        @staticmethod
+        async def scalars(stmt):
+            statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+            return type("Result", (), {"all": lambda self: [3, 1]})()
+
+    assert await find_tag_ids("sun", Session(), 5) == [3, 1]
+    assert "tags.tag ILIKE" in statements[0] and "tags.tag %" in statements[0]
+    assert "ORDER BY similarity(tags.tag" in statements[0]
@@ -1,9 +1,17 @@
 import pytest
+from sqlalchemy import event
 
+from io import BytesIO
 from unittest.mock import MagicMock, AsyncMock
 
+from fastapi import UploadFile
+
+from src.database.models import User, Image, Tag, Asset
+from src.services.cloud_client import CloudError
 from src.services.cloud_image import CloudImage
-from src.repositories.images import ImageServices, get_image_by_id
+from src.services.upload import UploadStream
+from src.repositories import images as images_repository
+from src.repositories.images import ImageServices, get_image_by_id, reconcile_images_count
 
 
 class TestImageServices:
@@ -26,21 +34,21 @@ class TestImageServices:
 
     @pytest.mark.asyncio
     async def test_get_all_images(
-        self, image, mock_form_answer, user_, session, monkeypatch
+        self, image, user_, async_session, monkeypatch
     ):
-        query_mock = MagicMock()
-        query_mock.filter().all.return_value = [image]
-        monkeypatch.setattr(session, "query", query_mock)
-
-        async_form_answer = AsyncMock(return_value=[mock_form_answer])
-        monkeypatch.setattr("src.repositories.images.form_answer", async_form_answer)
+        execute_mock = AsyncMock()
+        execute_mock.return_value.all = MagicMock(return_value=[(image, image.created_at, image.id)])
+        monkeypatch.setattr(async_session, "execute", execute_mock)
 
-        result = await ImageServices.get_all_images(user_.id, session)
-        assert result == []
+        result = await ImageServices.get_all_images(user_.id, None, 10, async_session)
+        assert [res.id for res in result.items] == [image.id]
+        assert result.items[0].description == image.description
+        assert result.next_cursor is None
+        execute_mock.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_update_description_image_not_found(
-        self, image, user_, session, monkeypatch
+        self, image, user_, async_session, monkeypatch
     ):
         image_id = 12345
         new_description = "Updated description"
@@ -51,26 +59,166 @@ class TestImageServices:
         )
 
         result = await ImageServices.update_description(
-            image_id, new_description, session
+            image_id, new_description, async_session
         )
         assert result is None
 
     @pytest.mark.asyncio
-    async def test_delete_image_image_not_found(self, user_, session, monkeypatch):
-        monkeypatch.setattr(CloudImage, "remove_image", MagicMock())
+    async def test_delete_image_image_not_found(self, user_, async_session, monkeypatch):
+        monkeypatch.setattr(CloudImage, "remove_image", AsyncMock())
         image_id = 123
-        username = user_.username
 
-        result = await ImageServices.delete_image(image_id, username, session)
+        result = await ImageServices.delete_image(image_id, async_session)
 
         assert result is None
 
     @pytest.mark.asyncio
-    async def test_get_image_by_id(self, image, session):
+    async def test_get_image_by_id(self, image, session, async_session):
         session.add(image)
         session.commit()
 
-        result = await get_image_by_id(image.id, session)
+        result = await get_image_by_id(image.id, async_session)
 
         assert result is not None
         assert result.id == image.id
+
+    @pytest.mark.asyncio
+    async def test_reconcile_images_count(self, session, async_session):
+        user = User(username="counter", email="counter@example.com", password="counter_password", images_count=5)
+        session.add(user)
+        session.commit()
+
+        corrected = await reconcile_images_count(async_session)
+
+        assert corrected == 1
+        expected = session.query(Image).filter(Image.user_id == user.id).count()
+        assert session.query(User).filter(User.id == user.id).first().images_count == expected
+
+    @pytest.mark.asyncio
+    async def test_get_all_images_with_tags(self, session, async_session):
+        owner = User(username="tagged", email="tagged@example.com", password="tagged_password",
+                     images_count=2)
+        session.add(owner)
+        session.commit()
+        tag = Tag(tag="batched")
+        images = [Image(user_id=owner.id, description=f"tagged {i}", public_id=f"tagged_{i}",
+                        origin_path=f"tagged_path_{i}", tags=[tag]) for i in range(2)]
+        session.add_all(images)
+        session.commit()
+        queries = []
+
+        def count_query(conn, cursor, statement, *args):
+            queries.append(statement)
+
+        event.listen(async_session.bind.sync_engine, "before_cursor_execute", count_query)
+        try:
+            result = await ImageServices.get_all_images(owner.id, None, 10, async_session, with_tags=True)
+        finally:
+            event.remove(async_session.bind.sync_engine, "before_cursor_execute", count_query)
+        assert len(result.items) == 2
+        assert all([t.tag for t in res.tags] == ["batched"] for res in result.items)
+        assert len(queries) == 2
+
+    @pytest.mark.asyncio
+    async def test_duplicate_upload_shares_the_asset(self, session, async_session, monkeypatch, image_file):
+        owner = User(username="twins", email="twins@example.com", password="twins_password")
+        session.add(owner)
+        session.commit()
+        upload, remove = AsyncMock(return_value={"version": 1}), AsyncMock()
+        monkeypatch.setattr(CloudImage, "upload", upload)
+        monkeypatch.setattr(CloudImage, "remove_image", remove)
+        monkeypatch.setattr(CloudImage, "get_url_for_avatar", MagicMock(return_value="twins_url"))
+
+        first, second = [await ImageServices.upload_file(UploadFile(BytesIO(image_file), size=len(image_file)),
+                                                         f"twin {i}", owner, async_session) for i in range(2)]
+
+        assert upload.await_count == 1
+        assert first.public_id == second.public_id
+        assert first.public_id.startswith("assets/") and "twins" not in first.public_id
+        asset = session.query(Asset).filter(Asset.public_id == first.public_id).one()
+        assert asset.refs == 2
+
+        await ImageServices.delete_image(first.id, async_session)
+        remove.assert_not_called()
+        assert session.query(Asset).filter(Asset.id == asset.id).one().refs == 1
+
+        await ImageServices.delete_image(second.id, async_session)
+        remove.assert_awaited_once_with(first.public_id)
+        assert session.query(Asset).filter(Asset.id == asset.id).first() is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_upload_of_same_content(self, session, async_session, monkeypatch, image_file):
+        # Another request stores the same content between our lookup and our insert.
+        content = image_file + b"concurrent"
+        owner = User(username="racer", email="racer@example.com", password="racer_password")
+        session.add(owner)
+        session.commit()
+        upload_file = UploadFile(BytesIO(content), size=len(content))
+        existing = Asset(sha256=await UploadStream(upload_file).digest(),
+                         public_id="assets/existing", origin_path="existing_url", refs=1)
+        session.add(existing)
+        session.commit()
+        acquire = images_repository.acquire_asset
+        lookups = []
+
+        async def late_acquire(sha256, db):
+            lookups.append(sha256)
+            return None if len(lookups) == 1 else await acquire(sha256, db)
+
+        monkeypatch.setattr(images_repository, "acquire_asset", late_acquire)
+        monkeypatch.setattr(CloudImage, "upload", AsyncMock(return_value={"version": 1}))
+        monkeypatch.setattr(CloudImage, "get_url_for_avatar", MagicMock(return_value="racer_url"))
+        remove = AsyncMock(side_effect=CloudError(504, "ConnectError"))
+        monkeypatch.setattr(CloudImage, "remove_image", remove)
+
+        result = await ImageServices.upload_file(upload_file, "race", owner, async_session)
+
+        # The cleanup of the duplicate file failed, but the upload still succeeds on the existing asset.
+        remove.assert_awaited_once()
+        assert result.public_id == "assets/existing"
+        assert session.query(Asset).filter(Asset.id == existing.id).one().refs == 2
+
+    @pytest.mark.asyncio
+    async def test_upload_when_concurrent_asset_is_deleted(self, session, async_session, monkeypatch, image_file):
+        # Another request stores the same content and deletes it again before we can take a reference.
+        content = image_file + b"vanishing"
+        owner = User(username="vanisher", email="vanisher@example.com", password="vanisher_password")
+        session.add(owner)
+        session.commit()
+        upload_file = UploadFile(BytesIO(content), size=len(content))
+        sha256 = await UploadStream(upload_file).digest()
+        session.add(Asset(sha256=sha256, public_id="assets/vanishing", origin_path="vanishing_url", refs=1))
+        session.commit()
+        lookups = []
+
+        async def vanishing_acquire(sha256, db):
+            lookups.append(sha256)
+            if len(lookups) == 2:
+                session.query(Asset).filter(Asset.sha256 == sha256).delete()
+                session.commit()
+            return None
+
+        monkeypatch.setattr(images_repository, "acquire_asset", vanishing_acquire)
+        monkeypatch.setattr(CloudImage, "upload", AsyncMock(return_value={"version": 1}))
+        monkeypatch.setattr(CloudImage, "get_url_for_avatar", MagicMock(return_value="vanisher_url"))
+        remove = AsyncMock()
+        monkeypatch.setattr(CloudImage, "remove_image", remove)
+
+        result = await ImageServices.upload_file(upload_file, "vanish", owner, async_session)
+
+        # The file just uploaded becomes the asset, so it is kept.
+        remove.assert_not_awaited()
+        assert result.public_id.startswith("assets/")
+        assert session.query(Asset).filter(Asset.sha256 == sha256).one().public_id == result.public_id
+
+    @pytest.mark.asyncio
+    async def test_delete_image_when_file_removal_fails(self, session, async_session, monkeypatch):
+        image = Image(user_id=1, description="unremovable", public_id="unremovable", origin_path="unremovable")
+        session.add(image)
+        session.commit()
+        monkeypatch.setattr(CloudImage, "remove_image", AsyncMock(side_effect=CloudError(504, "ConnectError")))
+
+        result = await ImageServices.delete_image(image.id, async_session)
+
+        assert result.id == image.id
+        assert session.query(Image).filter(Image.id == image.id).first() is None
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from src.database.models import Tag, Image, User
+from src.repositories.pagination import paginate, encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2023, 10, 1, 12, 30, 15, 123456)
+    cursor = encode_cursor([created_at, 7])
+    assert decode_cursor(cursor, [Tag.created_at, Tag.id]) == [created_at, 7]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor([1, 2, 3]), encode_cursor(["yesterday", 1])])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, [Tag.created_at, Tag.id])
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_paginate_walks_all_rows(session, async_session):
+    # One commit stamps all rows with the same created_at, so only the id breaks the ties.
+    session.add_all([Tag(tag=f"page_tag_{i}") for i in range(5)])
+    session.commit()
+    expected = [tag.id for tag in session.query(Tag).order_by(Tag.created_at, Tag.id).all()]
+
+    seen, cursor = [], None
+    while True:
+        page = await paginate(select(Tag), Tag, cursor, 2, async_session)
+        seen.extend(tag.id for tag in page.items)
+        cursor = page.next_cursor
+        if not cursor:
+            break
+    assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_paginate_descending(session, async_session):
+    owner = User(username="pages", email="pages@example.com", password="pages_password", images_count=3)
+    session.add(owner)
+    session.commit()
+    session.add_all([Image(user_id=owner.id, description=f"page {i}", public_id=f"page_{i}",
+                           origin_path=f"page_path_{i}", created_at=datetime(2023, 1, i + 1)) for i in range(3)])
+    session.commit()
+    stmt = select(Image).filter(Image.user_id == owner.id)
+
+    first = await paginate(stmt, Image, None, 2, async_session, descending=True)
+    second = await paginate(stmt, Image, first.next_cursor, 2, async_session, descending=True)
+
+    assert [image.description for image in first.items] == ["page 2", "page 1"]
+    assert [image.description for image in second.items] == ["page 0"]
+    assert second.next_cursor is None
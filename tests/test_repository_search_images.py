@@ -0,0 +1,253 @@
+from datetime import datetime
+
+import pytest
+import redis
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.connection import replica_router
+from src.database.models import User, Image, Tag
+from src.repositories.rating import rate_image
+from src.repositories.search_images import search_result
+from src.schemes.rating import RatingModel
+from src.schemes.search import SearchModel, SortModel
+from src.services.search_cache import search_cache
+
+
+@pytest.fixture(scope="module")
+def searchable(session):
+    owner = User(username="searcher", email="searcher@example.com", password="searcher_password", images_count=3)
+    session.add(owner)
+    session.commit()
+    # rating 4, 2 and no rating at all
+    for i, (rating_sum, rating_count) in enumerate([(8, 2), (2, 1), (0, 0)]):
+        session.add(Image(user_id=owner.id, description=f"sunset {i}", public_id=f"sunset_{i}",
+                          origin_path=f"sunset_path_{i}", rating_sum=rating_sum, rating_count=rating_count,
+                          created_at=datetime(2023, 5, i + 1)))
+    session.commit()
+
+
+async def search(db, cursor=None, limit=10, **sort):
+    return await search_result(SearchModel(description="sunset"), SortModel(**sort), cursor, limit, db)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort, expected", [
+    (dict(created_at=True), ["sunset 2", "sunset 1", "sunset 0"]),
+    (dict(created_at=True, descending=False), ["sunset 0", "sunset 1", "sunset 2"]),
+    (dict(rating=True), ["sunset 0", "sunset 1", "sunset 2"]),
+    (dict(rating=True, descending=False), ["sunset 2", "sunset 1", "sunset 0"]),
+])
+async def test_search_sorting(searchable, async_session, sort, expected):
+    page = await search(async_session, **sort)
+    assert [image.description for image in page.items] == expected
+
+
+@pytest.mark.asyncio
+async def test_search_sorted_in_database(searchable, async_session):
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_session.bind.sync_engine, "before_cursor_execute", capture)
+    try:
+        first = await search(async_session, limit=2, rating=True)
+        second = await search(async_session, cursor=first.next_cursor, limit=2, rating=True)
+    finally:
+        event.remove(async_session.bind.sync_engine, "before_cursor_execute", capture)
+
+    assert [image.description for image in first.items + second.items] == ["sunset 0", "sunset 1", "sunset 2"]
+    assert second.next_cursor is None
+    assert all("ORDER BY" in statement and "LIMIT" in statement for statement in statements)
+
+
+@pytest.fixture(scope="module")
+def describable(session):
+    owner = User(username="writer", email="writer@example.com", password="writer_password", images_count=3)
+    session.add(owner)
+    session.commit()
+    for i, description in enumerate(["red fox in snow", "fox fox fox", "grey wolf"]):
+        session.add(Image(user_id=owner.id, description=description, public_id=f"fox_{i}",
+                          origin_path=f"fox_path_{i}"))
+    session.commit()
+
+
+async def search_text(db, text, cursor=None, limit=10, **sort):
+    return await search_result(SearchModel(text=text), SortModel(**sort), cursor, limit, db)
+
+
+@pytest.mark.asyncio
+async def test_full_text_search_ranked(describable, async_session):
+    page = await search_text(async_session, "fox")
+    assert [image.description for image in page.items] == ["fox fox fox", "red fox in snow"]
+
+
+@pytest.mark.asyncio
+async def test_full_text_search_all_words(describable, async_session):
+    page = await search_text(async_session, "fox snow")
+    assert [image.description for image in page.items] == ["red fox in snow"]
+    assert await search_text(async_session, 'wolf "fox') is None
+
+
+@pytest.mark.asyncio
+async def test_full_text_search_pages(describable, async_session):
+    first = await search_text(async_session, "fox", limit=1)
+    second = await search_text(async_session, "fox", cursor=first.next_cursor, limit=1)
+    assert [image.description for image in first.items + second.items] == ["fox fox fox", "red fox in snow"]
+    assert second.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_full_text_search_follows_updates(describable, session, async_session):
+    image = session.query(Image).filter(Image.description == "grey wolf").first()
+    image.description = "grey fox"
+    session.commit()
+    page = await search_text(async_session, "fox", created_at=True)
+    assert "grey fox" in [image.description for image in page.items]
+    assert await search_text(async_session, "wolf") is None
+
+
+@pytest.mark.asyncio
+async def test_tag_search_single_query(session, async_session):
+    owner = User(username="tagger", email="tagger@example.com", password="tagger_password", images_count=2)
+    session.add(owner)
+    session.commit()
+    beach, beaches = Tag(tag="beach"), Tag(tag="beaches")
+    session.add_all([Image(user_id=owner.id, description="both tags", public_id="beach_0",
+                           origin_path="beach_path_0", tags=[beach, beaches]),
+                     Image(user_id=owner.id, description="one tag", public_id="beach_1",
+                           origin_path="beach_path_1", tags=[beach])])
+    session.commit()
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_session.bind.sync_engine, "before_cursor_execute", capture)
+    try:
+        page = await search_result(SearchModel(tags="beach"), SortModel(descending=False), None, 10, async_session)
+    finally:
+        event.remove(async_session.bind.sync_engine, "before_cursor_execute", capture)
+
+    assert [image.description for image in page.items] == ["both tags", "one tag"]
+    image_queries = [statement for statement in statements if "FROM images" in statement]
+    assert len(image_queries) == 1
+    assert "EXISTS" in image_queries[0]
+
+
+@pytest.fixture(scope="module")
+def catalogue(session):
+    alice = User(username="alice", email="alice@example.com", password="alice_password", images_count=3)
+    bob = User(username="bob", email="bob@example.com", password="bob_password", images_count=1)
+    session.add_all([alice, bob])
+    session.commit()
+    sea, sky = Tag(tag="sea"), Tag(tag="sky")
+    session.add_all([
+        Image(user_id=alice.id, description="calm sea", public_id="cat_0", origin_path="cat_path_0",
+              tags=[sea, sky], rating_sum=10, rating_count=2, created_at=datetime(2023, 7, 1)),
+        Image(user_id=alice.id, description="stormy sea", public_id="cat_1", origin_path="cat_path_1",
+              tags=[sea], rating_sum=3, rating_count=1, created_at=datetime(2023, 7, 15)),
+        Image(user_id=alice.id, description="clear sky", public_id="cat_2", origin_path="cat_path_2",
+              tags=[sky], created_at=datetime(2023, 8, 1)),
+        Image(user_id=bob.id, description="sea and sky", public_id="cat_3", origin_path="cat_path_3",
+              tags=[sea, sky], rating_sum=4, rating_count=1, created_at=datetime(2023, 7, 20)),
+    ])
+    session.commit()
+
+
+async def plan(db, **criteria):
+    page = await search_result(SearchModel(**criteria), SortModel(descending=False), None, 10, db)
+    return [image.description for image in page.items] if page else []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("criteria, expected", [
+    (dict(tags="sea,sky", tags_match="all"), ["calm sea", "sea and sky"]),
+    (dict(tags="sea, sky"), ["calm sea", "stormy sea", "sea and sky", "clear sky"]),
+    (dict(tags="sky", owner="alice"), ["calm sea", "clear sky"]),
+    (dict(tags="sea", description="storm"), ["stormy sea"]),
+    (dict(owner="alice", created_from="2023-07-02", created_to="2023-08-01"), ["stormy sea", "clear sky"]),
+    (dict(tags="sea", min_rating=4), ["calm sea", "sea and sky"]),
+    (dict(owner="nobody", tags="sea"), []),
+])
+async def test_search_planner_combines_criteria(catalogue, async_session, criteria, expected):
+    assert await plan(async_session, **criteria) == expected
+
+
+@pytest.mark.asyncio
+async def test_search_plan_debug(catalogue, async_session, monkeypatch):
+    page = await search_result(SearchModel(tags="sea", owner="bob"), SortModel(), None, 10, async_session)
+    assert page.plan is None
+
+    monkeypatch.setattr("src.repositories.search_images.settings.search_debug", True)
+    page = await search_result(SearchModel(tags="sea", owner="bob"), SortModel(), None, 10, async_session)
+    assert [step.split(":")[0] for step in page.plan] == ["owner", "any tag of ['sea']", "order"]
+
+
+@pytest.mark.asyncio
+async def test_search_cache_hit(catalogue, async_session):
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    before = await search_cache.stats()
+    first = await search_result(SearchModel(tags="sky,sea", tags_match="all"), SortModel(), None, 10, async_session)
+    event.listen(async_session.bind.sync_engine, "before_cursor_execute", capture)
+    try:
+        second = await search_result(SearchModel(tags="SEA, sky", tags_match="all"), SortModel(), None, 10,
+                                     async_session)
+    finally:
+        event.remove(async_session.bind.sync_engine, "before_cursor_execute", capture)
+    after = await search_cache.stats()
+
+    assert second == first
+    assert len(statements) == 1
+    assert "EXISTS" not in statements[0]
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_search_cache_filled_from_primary(catalogue, async_session, monkeypatch):
+    primary_sessions = []
+
+    def primary():
+        session = AsyncSession(async_session.bind, expire_on_commit=False)
+        primary_sessions.append(session)
+        return session
+
+    # The session of the request is bound to a replica, which may lag behind the version counters.
+    monkeypatch.setattr(replica_router, "engines", [async_session.bind])
+    monkeypatch.setattr("src.repositories.search_images.SessionLocal", primary)
+
+    assert await plan(async_session, tags="sky", owner="bob") == ["sea and sky"]
+    assert len(primary_sessions) == 1
+
+    # Hits are read by id on the replica.
+    assert await plan(async_session, tags="sky", owner="bob") == ["sea and sky"]
+    assert len(primary_sessions) == 1
+
+
+@pytest.mark.asyncio
+async def test_search_cache_invalidated_by_rating(catalogue, session, async_session):
+    assert await plan(async_session, tags="sea", min_rating=4) == ["calm sea", "sea and sky"]
+
+    stormy = session.query(Image).filter_by(description="stormy sea").one()
+    bob = session.query(User).filter_by(username="bob").one()
+    await rate_image(RatingModel(image_id=stormy.id, rate=5), bob, async_session)
+
+    assert await plan(async_session, tags="sea", min_rating=4) == ["calm sea", "stormy sea", "sea and sky"]
+
+
+@pytest.mark.asyncio
+async def test_search_cache_stats_without_redis(monkeypatch):
+    class Down:
+        async def mget(self, keys):
+            raise redis.ConnectionError("Redis is down")
+
+    monkeypatch.setattr("src.services.search_cache.redis_pool.get", lambda: Down())
+    with pytest.raises(HTTPException) as error:
+        await search_cache.stats()
+    assert error.value.status_code == 503
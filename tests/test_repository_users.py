@@ -0,0 +1,57 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.database.models import User, Account, Image, Asset, BanList
+from src.services.cloud_client import CloudError
+from src.services.cloud_image import CloudImage
+from src.repositories.users import UserServices
+
+
+@pytest.mark.asyncio
+async def test_search_returns_user_once(session, async_session):
+    owner = User(username="twice", email="twice@example.com", password="twice_password", images_count=1)
+    idle = User(username="idle", email="idle@example.com", password="idle_password", images_count=0)
+    session.add_all([owner, idle])
+    session.commit()
+    session.add_all([Account(username="twice", first_name="One", last_name="Twice", email="one@example.com"),
+                     Account(username="twice", first_name="Two", last_name="Twice", email="two@example.com"),
+                     Account(username="idle", first_name="Idle", last_name="User", email="idle@example.com")])
+    session.commit()
+
+    users = await UserServices.search("id", async_session)
+
+    assert [user.id for user in users] == [owner.id]
+
+
+@pytest.mark.asyncio
+async def test_ban_releases_user_images(session, async_session, monkeypatch):
+    banned = User(username="banned", email="banned@example.com", password="banned_password",
+                  access_token="banned_token", images_count=2)
+    other = User(username="other", email="other@example.com", password="other_password", images_count=1)
+    shared = Asset(sha256="1" * 64, public_id="assets/shared", origin_path="shared_url", refs=2)
+    own = Asset(sha256="2" * 64, public_id="assets/own", origin_path="own_url", refs=1)
+    session.add_all([banned, other, shared, own])
+    session.commit()
+    session.add_all([Image(user_id=banned.id, asset_id=shared.id, description="shared", public_id="assets/shared",
+                           origin_path="shared_url"),
+                     Image(user_id=banned.id, asset_id=own.id, description="own", public_id="assets/own",
+                           origin_path="own_url"),
+                     Image(user_id=other.id, asset_id=shared.id, description="shared", public_id="assets/shared",
+                           origin_path="shared_url")])
+    session.commit()
+    own_id = own.id
+    remove_image = AsyncMock()
+    monkeypatch.setattr(CloudImage, "remove_image", remove_image)
+    # The user never uploaded an avatar, so the storage has no folder of them.
+    monkeypatch.setattr(CloudImage, "remove_folder", AsyncMock(side_effect=CloudError(404, "Can't find folder")))
+
+    await UserServices.add_to_ban_list(banned.id, "ban", async_session)
+
+    remove_image.assert_awaited_once_with("assets/own")
+    assert session.query(BanList).filter(BanList.access_token == "banned_token").count() == 1
+    assert session.query(Image).filter(Image.user_id == banned.id).count() == 0
+    assert session.query(Image).filter(Image.user_id == other.id).count() == 1
+    assert session.query(Asset).filter(Asset.id == shared.id).one().refs == 1
+    assert session.query(Asset).filter(Asset.id == own_id).first() is None
+    assert session.query(User).filter(User.id == banned.id).one().images_count == 0
@@ -0,0 +1,48 @@
+from sqlalchemy.pool import NullPool
+
+from src.database.metrics import PoolMetrics
+
+
+def test_pool_status(client, token, token_admin):
+    response = client.get("api/admin/db/pool",
+                          headers={"Authorization": f"Bearer {token_admin['access_token']}"})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["pool"] == "MeasuredQueuePool"
+    assert data["checked_out"] == 0
+    assert data["timeouts"] == 0
+
+
+def test_pool_status_forbidden(client, token):
+    response = client.get("api/admin/db/pool",
+                          headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert response.status_code == 403, response.text
+
+
+def test_pool_metrics_snapshot():
+    metrics = PoolMetrics()
+    metrics.observe_wait(0.002)
+    metrics.observe_wait(0.004)
+    data = metrics.snapshot(NullPool(creator=lambda: None))
+    assert data["pool"] == "NullPool"
+    assert data["checkouts"] == 2
+    assert round(data["wait_avg_ms"], 3) == 3.0
+    assert round(data["wait_max_ms"], 3) == 4.0
+
+
+def test_search_cache_status(client, token_admin):
+    response = client.get("api/admin/cache/search",
+                          headers={"Authorization": f"Bearer {token_admin['access_token']}"})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert set(data) == {"hits", "misses", "hit_ratio"}
+    assert 0 <= data["hit_ratio"] <= 1
+
+
+def test_password_hashing_status(client, token_admin):
+    response = client.get("api/admin/password-hashing",
+                          headers={"Authorization": f"Bearer {token_admin['access_token']}"})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["completed"] >= 2
+    assert data["queued"] == 0
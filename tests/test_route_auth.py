@@ -1,5 +1,7 @@
 from unittest.mock import MagicMock
 
+from passlib.context import CryptContext
+
 from src.database.models import User, BanList
 from src.conf import messages
 
@@ -37,6 +39,22 @@ def test_login(client, user, session):
     assert payload["token_type"] == messages.TOKEN_TYPE
 
 
+def test_login_rehashes_legacy_password(client, user, session):
+    current_user: User = (
+        session.query(User).filter(User.email == user.get("email")).first()
+    )
+    assert current_user.password.startswith("$argon2id$")
+    current_user.password = CryptContext(schemes=["bcrypt"]).hash(user.get("password"))
+    session.commit()
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get("email"), "password": user.get("password")},
+    )
+    assert response.status_code == 201, response.text
+    session.refresh(current_user)
+    assert current_user.password.startswith("$argon2id$")
+
+
 def test_login_user_not_confirmed(client, user, session):
     current_user: User = (
         session.query(User).filter(User.email == user.get("email")).first()
@@ -0,0 +1,19 @@
+import asyncio
+
+from src.services.storage import LocalStorage
+
+
+def test_get_local_file(client, monkeypatch, tmp_path, image_file):
+    local_storage = LocalStorage(str(tmp_path), "/api/files")
+    asyncio.run(local_storage.upload(image_file, "share_photo/user/image"))
+    monkeypatch.setattr("src.routes.files.storage", local_storage)
+
+    response = client.get("api/files/share_photo/user/image")
+    assert response.status_code == 200
+    assert response.content == image_file
+    assert response.headers["content-type"] == "image/png"
+    assert client.get("api/files/share_photo/user/missing").status_code == 404
+    assert client.get("api/files/../../etc/passwd").status_code == 404
+
+    asyncio.run(local_storage.remove_folder("share_photo/user"))
+    assert client.get("api/files/share_photo/user/image").status_code == 404
@@ -1,16 +1,16 @@
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from src.database.models import Image
+from src.database.models import Image, User
 from src.conf import messages
 
 
 @pytest.fixture
-def image_example(token_admin, session, client, monkeypatch):
+def image_example(token_admin, session, client, monkeypatch, image_file):
     mock_generate_name = MagicMock()
     mock_generate_name.return_value = "public_id"
-    mock_upload = MagicMock()
+    mock_upload = AsyncMock()
     mock_get_url = MagicMock()
     mock_get_url.return_value = "image_url"
     monkeypatch.setattr(
@@ -20,7 +20,7 @@ def image_example(token_admin, session, client, monkeypatch):
     monkeypatch.setattr(
         "src.services.cloud_image.CloudImage.get_url_for_avatar", mock_get_url
     )
-    file = "file".encode()
+    file = image_file
     response = client.post(
         f"api/images/?description=example",
         headers={"Authorization": f"Bearer {token_admin['access_token']}"},
@@ -39,10 +39,10 @@ def test_get_images_(client, image, token):
     assert response_data["detail"] == messages.NOT_FOUND
 
 
-def test_upload_file(image, token, client, monkeypatch):
+def test_upload_file(image, token, client, session, monkeypatch, image_file):
     mock_generate_name = MagicMock()
     mock_generate_name.return_value = "public_id"
-    mock_upload = MagicMock()
+    mock_upload = AsyncMock()
     mock_get_url = MagicMock()
     mock_get_url.return_value = "image_url"
     monkeypatch.setattr(
@@ -53,7 +53,7 @@ def test_upload_file(image, token, client, monkeypatch):
         "src.services.cloud_image.CloudImage.get_url_for_avatar", mock_get_url
     )
 
-    file = "file".encode()
+    file = image_file
     response = client.post(
         f"api/images/?description={image.description}",
         headers={"Authorization": f"Bearer {token['access_token']}"},
@@ -61,6 +61,22 @@ def test_upload_file(image, token, client, monkeypatch):
     )
     assert response.status_code == 201, response.text
     assert response.json()["origin_path"] == mock_get_url()
+    owner = session.query(User).filter(User.id == response.json()["user_id"]).first()
+    assert owner.images_count == 1
+
+
+def test_upload_file_not_an_image(image, token, client, monkeypatch):
+    mock_upload = AsyncMock()
+    monkeypatch.setattr("src.services.cloud_image.CloudImage.upload", mock_upload)
+
+    response = client.post(
+        f"api/images/?description={image.description}",
+        headers={"Authorization": f"Bearer {token['access_token']}"},
+        files={"file": ("test_image.jpg", "file".encode())},
+    )
+    assert response.status_code == 415, response.text
+    assert response.json()["detail"] == messages.NOT_AN_IMAGE
+    mock_upload.assert_not_called()
 
 
 def test_get_image(client, image, token):
@@ -87,7 +103,7 @@ def test_get_images(client, image, token):
 
     assert response.status_code == 200
     response_data = response.json()
-    assert response_data[0]["description"] == image.description
+    assert response_data["items"][0]["description"] == image.description
 
 
 def test_update_description(image, token, client, session):
@@ -1,4 +1,4 @@
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from fastapi import status
@@ -43,10 +43,10 @@ def token_admin(client, session, admin, monkeypatch):
 
 
 @pytest.fixture
-def image_example(token_admin, session, client, monkeypatch):
+def image_example(token_admin, session, client, monkeypatch, image_file):
     mock_generate_name = MagicMock()
     mock_generate_name.return_value = "public_id"
-    mock_upload = MagicMock()
+    mock_upload = AsyncMock()
     mock_get_url = MagicMock()
     mock_get_url.return_value = "image_url"
     monkeypatch.setattr(
@@ -56,7 +56,7 @@ def image_example(token_admin, session, client, monkeypatch):
     monkeypatch.setattr(
         "src.services.cloud_image.CloudImage.get_url_for_avatar", mock_get_url
     )
-    file = "file".encode()
+    file = image_file
     response = client.post(
         f"api/images/?description=example",
         headers={"Authorization": f"Bearer {token_admin['access_token']}"},
@@ -99,7 +99,7 @@ def test_show_comments(image_example, client, token, session):
                           headers={"Authorization": f"Bearer {token['access_token']}"})
     assert response.status_code == 200, response.text
     data = response.json()
-    assert data[0]["comment"] == "Test text for new comment"
+    assert data["items"][0]["comment"] == "Test text for new comment"
 
 
 def test_show_comments_(image_example, client, token, session):
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from src.database.models import User, Rating, Image
 from src.conf import messages
@@ -41,10 +41,10 @@ def token_admin(client, session, admin, monkeypatch):
 
 
 @pytest.fixture
-def take_image(token_admin, session, client, monkeypatch):
+def take_image(token_admin, session, client, monkeypatch, image_file):
     mock_generate_name = MagicMock()
     mock_generate_name.return_value = "public_id"
-    mock_upload = MagicMock()
+    mock_upload = AsyncMock()
     mock_get_url = MagicMock()
     mock_get_url.return_value = "image_url"
     monkeypatch.setattr(
@@ -54,7 +54,7 @@ def take_image(token_admin, session, client, monkeypatch):
     monkeypatch.setattr(
         "src.services.cloud_image.CloudImage.get_url_for_avatar", mock_get_url
     )
-    file = "file".encode()
+    file = image_file
     response = client.post(
         f"api/images/?description=example",
         headers={"Authorization": f"Bearer {token_admin['access_token']}"},
@@ -64,10 +64,10 @@ def take_image(token_admin, session, client, monkeypatch):
     return image_exp
 
 
-def test_upload_file(image, token, client, monkeypatch):
+def test_upload_file(image, token, client, monkeypatch, image_file):
     mock_generate_name = MagicMock()
     mock_generate_name.return_value = "public_id"
-    mock_upload = MagicMock()
+    mock_upload = AsyncMock()
     mock_get_url = MagicMock()
     mock_get_url.return_value = "image_url"
     monkeypatch.setattr(
@@ -78,7 +78,7 @@ def test_upload_file(image, token, client, monkeypatch):
         "src.services.cloud_image.CloudImage.get_url_for_avatar", mock_get_url
     )
     
-    file = "file".encode()
+    file = image_file
     response = client.post(
         f"api/images/?description={image.description}",
         headers={"Authorization": f"Bearer {token['access_token']}"},
@@ -129,6 +129,18 @@ def test_get_rates(token_admin, image, client, session):
     assert response.status_code == 200, response.text
 
 
+def test_image_rating_aggregate(token_admin, image, client, session):
+    image_ = session.query(Image).filter(Image.id == image.id).first()
+    assert image_.rating_sum == 4
+    assert image_.rating_count == 1
+    response = client.get(f"api/images/{image.id}",
+                          headers={"Authorization": f"Bearer {token_admin['access_token']}"})
+    assert response.status_code == 200, response.text
+    assert response.json()["rating"] == 4
+    best = session.query(Image).order_by(Image.rating.desc()).first()
+    assert best.id == image.id
+
+
 def test_delete_rate(token_admin, image, admin, client, session):
     cur_user = session.query(User).filter(User.username == admin["username"]).first()
     res = session.query(Rating).filter(Rating.image_id == image.id, Rating.user_id == cur_user.id).first()
@@ -138,6 +150,9 @@ def test_delete_rate(token_admin, image, admin, client, session):
         headers={"Authorization": f"Bearer {token_admin['access_token']}"},
     )
     assert response.status_code == 204, response.text
+    image_ = session.query(Image).filter(Image.id == image.id).first()
+    assert image_.rating_count == 0
+    assert image_.rating == 0
 
 
 def test_get_rates_(token_admin, image, client, session):
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+from src.database.models import User, Image, Tag
+from src.conf import messages
+
+
+@pytest.fixture(scope="module")
+def images_example(session):
+    owner = User(username="searchable", email="searchable@example.com", password="searchable_password",
+                 images_count=2)
+    session.add(owner)
+    session.commit()
+    lake, forest = Tag(tag="lake"), Tag(tag="forest")
+    session.add_all([Image(user_id=owner.id, description="lake in a forest", public_id="lake_0",
+                           origin_path="lake_path_0", tags=[lake, forest], created_at=datetime(2023, 9, 1)),
+                     Image(user_id=owner.id, description="mountain lake", public_id="lake_1",
+                           origin_path="lake_path_1", tags=[lake], created_at=datetime(2023, 9, 2))])
+    session.commit()
+
+
+def test_search_images(images_example, client, token):
+    response = client.get("api/images/search/?tags=lake,forest&tags_match=all&owner=searchable"
+                          "&created_from=2023-09-01",
+                          headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [image["description"] for image in data["items"]] == ["lake in a forest"]
+    assert data["next_cursor"] is None
+
+
+def test_search_images_pages(images_example, client, token):
+    response = client.get("api/images/search/?tags=lake&created_at=true&limit=1",
+                          headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert response.status_code == 200, response.text
+    first = response.json()
+    response = client.get(f"api/images/search/?tags=lake&created_at=true&limit=1&cursor={first['next_cursor']}",
+                          headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert [image["description"] for image in first["items"] + response.json()["items"]] == \
+        ["mountain lake", "lake in a forest"]
+
+
+def test_search_images_not_found(images_example, client, token):
+    response = client.get("api/images/search/?tags=lake&min_rating=5",
+                          headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert response.status_code == 404, response.text
+    assert response.json()["detail"] == messages.NOT_FOUND
+
+
+def test_search_images_invalid_match(client, token):
+    response = client.get("api/images/search/?tags=lake&tags_match=some",
+                          headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert response.status_code == 422, response.text
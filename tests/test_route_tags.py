@@ -1,4 +1,4 @@
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
@@ -7,10 +7,10 @@ from src.conf import messages
 
 
 @pytest.fixture
-def image_example(token_admin, session, client, monkeypatch):
+def image_example(token_admin, session, client, monkeypatch, image_file):
     mock_generate_name = MagicMock()
     mock_generate_name.return_value = "public_id"
-    mock_upload = MagicMock()
+    mock_upload = AsyncMock()
     mock_get_url = MagicMock()
     mock_get_url.return_value = "image_url"
     monkeypatch.setattr(
@@ -20,7 +20,7 @@ def image_example(token_admin, session, client, monkeypatch):
     monkeypatch.setattr(
         "src.services.cloud_image.CloudImage.get_url_for_avatar", mock_get_url
     )
-    file = "file".encode()
+    file = image_file
     response = client.post(
         f"api/images/?description=example",
         headers={"Authorization": f"Bearer {token_admin['access_token']}"},
@@ -89,7 +89,20 @@ def test_get_tags_(client, token):
                           headers={"Authorization": f"Bearer {token['access_token']}"})
     assert response.status_code == 200, response.text
     data = response.json()
-    assert data[0]["tag"] == "new_tag"
+    assert data["items"][0]["tag"] == "new_tag"
+
+
+def test_search_tags(client, token):
+    response = client.get("api/images/tags/search/?keyword=tag3",
+                          headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert response.status_code == 200, response.text
+    assert [tag["tag"] for tag in response.json()][:2] == ["tag3", "tag"]
+
+
+def test_search_tags_not_found(client, token):
+    response = client.get("api/images/tags/search/?keyword=zzz",
+                          headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert response.status_code == 404, response.text
 
 
 def test_update_tag(token_admin, client, session):
@@ -107,3 +120,10 @@ def test_delete_tag(token_admin, client, session):
                              headers={"Authorization": f"Bearer {token_admin['access_token']}"})
     assert response.status_code == 204, response.text
 
+
+
+def test_get_tags_invalid_cursor(client, token):
+    response = client.get("api/images/tags/?cursor=broken",
+                          headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == messages.INVALID_CURSOR
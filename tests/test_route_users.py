@@ -1,8 +1,8 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from src.database.models import User
-from src.services.auth import auth_user
+from src.database.redis_pool import redis_pool
 from src.conf import messages
 from src.schemes.account import AccountResponse
 
@@ -52,7 +52,7 @@ def token_admin(client, session, admin, monkeypatch):
 
 
 def test_read_without_account(token, user, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     response = client.get(f"api/users/accounts/{user.get('username')}/",
                           headers={"Authorization": f"Bearer {token['access_token']}"}, )
@@ -62,7 +62,7 @@ def test_read_without_account(token, user, client, session):
 
 
 def test_create_account(token, account, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     response = client.post(f"api/users/accounts/",
                            json=INFO,
@@ -76,7 +76,7 @@ def test_create_account(token, account, client, session):
 
 
 def test_create_wrong_account(token, account, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     response = client.post(f"api/users/accounts/",
                            json={},
@@ -85,7 +85,7 @@ def test_create_wrong_account(token, account, client, session):
 
 
 def test_read_account(token, user, account, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     response = client.get(f"api/users/accounts/{user.get('username')}/",
                           headers={"Authorization": f"Bearer {token['access_token']}"}, )
@@ -99,14 +99,14 @@ def test_read_account(token, user, account, client, session):
 
 
 def test_update_account(user, token, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     account_data = {
         "first_name": "John",
         "last_name": "Doer",
         "email": "johndoe@example.com",
     }
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     response = client.put(f"api/users/accounts/{user.get('username')}/",
                           json=account_data,
@@ -121,14 +121,14 @@ def test_update_account(user, token, client, session):
 
 
 def test_update_account_(user, token, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     account_data = {
         "first_name": "John",
         "last_name": "Doer",
         "email": "johndoe@example.com",
     }
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     response = client.put(f"api/users/accounts/{user['email']}/",
                           json=account_data,
@@ -136,16 +136,16 @@ def test_update_account_(user, token, client, session):
     assert response.status_code == 404
 
 
-def test_update_account_avatar(token, client, monkeypatch):
+def test_update_account_avatar(token, client, monkeypatch, image_file):
     mock_generate_name = MagicMock()
-    mock_upload = MagicMock()
+    mock_upload = AsyncMock()
     mock_get_url = MagicMock()
     mock_get_url.return_value = "new_url"
     monkeypatch.setattr("src.services.cloud_image.CloudImage.generate_file_name", mock_generate_name)
     monkeypatch.setattr("src.services.cloud_image.CloudImage.upload", mock_upload)
     monkeypatch.setattr("src.services.cloud_image.CloudImage.get_url_for_avatar", mock_get_url)
 
-    file = "file".encode()
+    file = image_file
     response = client.patch("api/users/accounts/",
                             headers={"Authorization": f"Bearer {token['access_token']}"},
                             files={"file": ("test_image.jpg", file)})
@@ -154,7 +154,7 @@ def test_update_account_avatar(token, client, monkeypatch):
 
 
 def test_remove_account(token, user, account, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     response = client.delete(f"api/users/accounts/",
                              headers={"Authorization": f"Bearer {token['access_token']}"}, )
@@ -162,7 +162,7 @@ def test_remove_account(token, user, account, client, session):
 
 
 def test_remove_account_(token, user, account, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     response = client.delete(f"api/users/accounts/",
                              headers={"Authorization": f"Bearer {token['access_token']}"}, )
@@ -171,18 +171,18 @@ def test_remove_account_(token, user, account, client, session):
     assert data["detail"] == messages.ACCOUNT_NOT_FOUND
 
 
-def test_update_account_avatar_(token, client, monkeypatch):
-    with patch.object(auth_user, "red") as redis_mock:
+def test_update_account_avatar_(token, client, monkeypatch, image_file):
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     mock_generate_name = MagicMock()
-    mock_upload = MagicMock()
+    mock_upload = AsyncMock()
     mock_get_url = MagicMock()
     mock_get_url.return_value = "new_url"
     monkeypatch.setattr("src.services.cloud_image.CloudImage.generate_file_name", mock_generate_name)
     monkeypatch.setattr("src.services.cloud_image.CloudImage.upload", mock_upload)
     monkeypatch.setattr("src.services.cloud_image.CloudImage.get_url_for_avatar", mock_get_url)
 
-    file = "file".encode()
+    file = image_file
     response = client.patch("api/users/accounts/",
                             headers={"Authorization": f"Bearer {token['access_token']}"},
                             files={"file": ("test_image.jpg", file)})
@@ -192,16 +192,16 @@ def test_update_account_avatar_(token, client, monkeypatch):
 
 def test_get_users(user, token_admin, client):
 
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     response = client.get("api/users/",
                           headers={"Authorization": f"Bearer {token_admin['access_token']}"}, )
     assert response.status_code == 200, response.text
-    assert response.json()[0]["email"] == user["email"]
+    assert response.json()["items"][0]["email"] == user["email"]
 
 
 def test_get_user(user, token_admin, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     cur_user = session.query(User).filter(User.username == user["username"]).first()
     response = client.get(f"api/users/{cur_user.id}/",
@@ -211,7 +211,7 @@ def test_get_user(user, token_admin, client, session):
 
 
 def test_ban(user, token_admin, client, session):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
     cur_user = session.query(User).filter(User.username == user["username"]).first()
     assert cur_user.email == user["email"]
@@ -221,9 +221,9 @@ def test_ban(user, token_admin, client, session):
 
 
 def test_ban_(user, token_admin, client, session, monkeypatch):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
-    mock_remove_folder = MagicMock()
+    mock_remove_folder = AsyncMock()
     monkeypatch.setattr(
         "src.services.cloud_image.CloudImage.remove_folder", mock_remove_folder
     )
@@ -234,9 +234,9 @@ def test_ban_(user, token_admin, client, session, monkeypatch):
 
 
 def test_remove_user(user, token_admin, client, session, monkeypatch):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
-    mock_remove_folder = MagicMock()
+    mock_remove_folder = AsyncMock()
     monkeypatch.setattr(
         "src.services.cloud_image.CloudImage.remove_folder", mock_remove_folder
     )
@@ -247,9 +247,9 @@ def test_remove_user(user, token_admin, client, session, monkeypatch):
 
 
 def test_remove_user_repeat(user, token_admin, client, session, monkeypatch):
-    with patch.object(auth_user, "red") as redis_mock:
+    with patch.object(redis_pool, "client") as redis_mock:
         redis_mock.get.return_value = None
-    mock_remove_folder = MagicMock()
+    mock_remove_folder = AsyncMock()
     monkeypatch.setattr(
         "src.services.cloud_image.CloudImage.remove_folder", mock_remove_folder
     )
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+from jose import jwt
+
+from src.database.models import BanList
+from src.database.redis_pool import redis_pool
+from src.services.ban_list_redis import CurrentBanList, auth_ban_list
+from src.services.bloom import BloomFilter
+
+
+def access_token(seconds: int) -> str:
+    return jwt.encode({"sub": "banned@example.com", "exp": int(time.time()) + seconds}, "secret")
+
+
+@pytest.mark.asyncio
+async def test_logout_token_expires_with_jwt(async_session):
+    token = access_token(3600)
+    await auth_ban_list.add(token, "logout")
+    assert await auth_ban_list.is_banned(token, async_session)
+    assert 3590 < await redis_pool.get().ttl(auth_ban_list.key(token)) <= 3600
+    assert not await auth_ban_list.is_banned(access_token(7200), async_session)
+
+
+@pytest.mark.asyncio
+async def test_banned_token_never_expires(async_session):
+    token = access_token(3600)
+    await auth_ban_list.add(token, "ban")
+    assert await auth_ban_list.is_banned(token, async_session)
+    assert await redis_pool.get().ttl(auth_ban_list.key(token)) == -1
+
+
+@pytest.mark.asyncio
+async def test_ban_list_loaded_from_database(session, async_session):
+    token = access_token(3600)
+    session.add(BanList(access_token=token, reason="ban"))
+    session.commit()
+    await redis_pool.get().delete(auth_ban_list.LOADED)
+    assert await auth_ban_list.is_banned(token, async_session)
+    assert not await auth_ban_list.is_banned(None, async_session)
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(1000, 0.01)
+    digests = [CurrentBanList.digest(str(i)) for i in range(2000)]
+    for digest in digests[:1000]:
+        bloom.add(digest)
+    assert all(digest in bloom for digest in digests[:1000])
+    assert sum(digest in bloom for digest in digests[1000:]) < 30
+
+
+@pytest.mark.asyncio
+async def test_filter_skips_redis_for_unrevoked_tokens(session, async_session, monkeypatch):
+    revoked, unrevoked = access_token(3600), access_token(7200)
+    session.add(BanList(access_token=revoked, reason="ban"))
+    session.commit()
+    await redis_pool.get().delete(auth_ban_list.LOADED)
+    ban_list = CurrentBanList()
+    ban_list.filter = await CurrentBanList.build_filter(async_session)
+    assert await ban_list.is_banned(revoked, async_session)
+
+    def unavailable():
+        raise AssertionError("Redis must not be asked")
+
+    monkeypatch.setattr(redis_pool, "get", unavailable)
+    assert not await ban_list.is_banned(unrevoked, async_session)
+
+
+def test_revocations_during_rebuild_are_kept():
+    ban_list = CurrentBanList()
+    digest = CurrentBanList.digest(access_token(3600))
+    ban_list.on_revoked(digest.encode())
+    ban_list.pending = set()
+    ban_list.on_revoked(digest.encode())
+    assert ban_list.pending == {digest}
+    ban_list.filter = BloomFilter(10, 0.01)
+    ban_list.on_revoked(digest.encode())
+    assert digest in ban_list.filter
@@ -0,0 +1,126 @@
+import io
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from src.conf.config import settings
+from src.services.cloud_client import CloudClient, CloudError
+
+
+def client_for(handler) -> CloudClient:
+    return CloudClient("demo", "123", "secret", transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "cloudinary_retry_backoff", 0)
+    monkeypatch.setattr(settings, "cloudinary_retries", 2)
+
+
+@pytest.mark.asyncio
+async def test_upload_is_signed_and_rewinds_the_file_on_retry():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.read())
+        if len(bodies) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"version": 7, "secure_url": "https://res/demo.jpg"})
+
+    client = client_for(handler)
+    result = await client.upload(io.BytesIO(b"image bytes"), public_id="share_photo/user/id", overwrite=True)
+
+    assert result["version"] == 7
+    assert len(bodies) == 2
+    for body in bodies:
+        assert b"image bytes" in body
+        assert b'name="signature"' in body
+        assert b'name="api_key"' in body
+        assert b"share_photo/user/id" in body
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_retries_end_with_error():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    client = client_for(handler)
+    with pytest.raises(CloudError):
+        await client.destroy("share_photo/user/id")
+    assert len(calls) == settings.cloudinary_retries + 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(404, json={"error": {"message": "Can't find folder with path user"}})
+
+    client = client_for(handler)
+    with pytest.raises(CloudError) as error:
+        await client.delete_folder("user")
+    assert error.value.status_code == 404
+    assert len(calls) == 1
+    assert calls[0].headers["authorization"].startswith("Basic ")
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_delete_prefix_until_all_removed():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        more = {"next_cursor": "abc"} if len(calls) < 3 else {}
+        return httpx.Response(200, json=dict(more, deleted={}))
+
+    client = client_for(handler)
+    await client.delete_prefix("share_photo/user/")
+    assert len(calls) == 3
+    assert calls[0].url.params["prefix"] == "share_photo/user/"
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_busy_pool_is_503():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.PoolTimeout("no free connection", request=request)
+
+    client = client_for(handler)
+    with pytest.raises(HTTPException) as error:
+        await client.resource("share_photo/user/id")
+    assert error.value.status_code == 503
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_upload_stream_is_sent_in_chunks(image_file):
+    from fastapi import UploadFile
+    from src.services.upload import UploadStream
+
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"version": 1})
+
+    stream = UploadStream(UploadFile(io.BytesIO(image_file * 10), size=len(image_file) * 10), chunk_size=32)
+    await stream.check()
+    client = client_for(handler)
+    await client.upload(stream, public_id="share_photo/user/id")
+
+    # A body of unknown length is streamed, not built in memory first.
+    assert requests[0].headers["transfer-encoding"] == "chunked"
+    body = requests[0].content
+    assert image_file * 10 in body
+    assert b'name="public_id"\r\n\r\nshare_photo/user/id' in body
+    assert stream.sha256 is not None
+    await client.close()
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from src.services.executor import BoundedExecutor
+
+
+@pytest.mark.asyncio
+async def test_executor_rejects_when_queue_is_full():
+    executor, release = BoundedExecutor(workers=1, max_queue=1, name="test"), threading.Event()
+    running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+    assert executor.snapshot()["queued"] == 1
+
+    with pytest.raises(HTTPException) as error:
+        await executor.run(release.wait)
+    assert error.value.status_code == 503
+
+    release.set()
+    assert await asyncio.gather(*running) == [True, True]
+    assert executor.snapshot()["rejected"] == 1
+    assert executor.snapshot()["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_executor_keeps_loop_free():
+    executor, release = BoundedExecutor(workers=1, max_queue=0, name="test"), threading.Event()
+    blocked = asyncio.ensure_future(executor.run(release.wait))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    release.set()
+    assert await blocked
+
+
+@pytest.mark.asyncio
+async def test_executor_counts_running_job_of_cancelled_caller():
+    executor, release = BoundedExecutor(workers=1, max_queue=0, name="test"), threading.Event()
+    caller = asyncio.ensure_future(executor.run(release.wait))
+    await asyncio.sleep(0.01)
+    caller.cancel()
+    await asyncio.sleep(0.01)
+
+    # The thread is still busy, so there is no room for another call.
+    assert executor.snapshot()["running"] == 1
+    with pytest.raises(HTTPException):
+        await executor.run(release.wait)
+
+    release.set()
+    await asyncio.sleep(0.05)
+    assert executor.snapshot()["running"] == 0
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.database.models import UserRole
+from src.services.local_cache import LocalCache
+from src.services.principals import Principal, PrincipalCache
+
+
+def principal(email="principal@example.com", roles=UserRole.user):
+    return Principal(1, email, "principal", roles, True)
+
+
+def test_principal_round_trip():
+    user = SimpleNamespace(id=1, email="principal@example.com", username="principal", roles="admin",
+                           confirmed=1, password="secret", access_token="token")
+    value = Principal.from_user(user)
+    assert value == Principal(1, "principal@example.com", "principal", UserRole.admin, True)
+    assert Principal.loads(value.dumps()) == value
+    assert b"secret" not in value.dumps()
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(maxsize=2, ttl=60)
+    cache.set("a", principal("a"))
+    cache.set("b", principal("b"))
+    cache.get("a")
+    cache.set("c", principal("c"))
+    assert [cache.get(key) is not None for key in "abc"] == [True, False, True]
+
+
+def test_local_cache_expires():
+    cache = LocalCache(maxsize=2, ttl=0.01)
+    cache.set("a", principal("a"))
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_tiers_and_invalidation():
+    worker, other_worker = PrincipalCache(10, 60, 60), PrincipalCache(10, 60, 60)
+    await worker.invalidate("principal@example.com")
+    assert await other_worker.get("principal@example.com") is None
+
+    await worker.set(principal())
+    assert await other_worker.get("principal@example.com") == principal()
+
+    other_worker.start()
+    try:
+        await asyncio.sleep(0.1)
+        await worker.invalidate("principal@example.com")
+        deadline = time.monotonic() + 3
+        while other_worker.local.get("principal@example.com") and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+    finally:
+        await other_worker.stop()
+    assert await other_worker.get("principal@example.com") is None
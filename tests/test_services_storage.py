@@ -0,0 +1,104 @@
+from io import BytesIO
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from src.services.cloud_client import cloud_client, CloudError
+from src.services.storage import CloudinaryStorage, LocalStorage, Storage
+from src.services.upload import UploadStream
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    return LocalStorage(str(tmp_path), "/api/files/")
+
+
+@pytest.mark.asyncio
+async def test_local_upload_is_sharded(local_storage, tmp_path, image_file):
+    stream = UploadStream(UploadFile(BytesIO(image_file * 3), size=len(image_file) * 3), chunk_size=16)
+    await stream.check()
+
+    result = await local_storage.upload(stream, "share_photo/user/image")
+
+    path = local_storage.path("share_photo/user/image")
+    assert path.parent.parent.parent == tmp_path / "share_photo" / "user"
+    assert path.read_bytes() == image_file * 3
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+    assert result["url"] == f"/api/files/share_photo/user/image?v={result['version']}"
+    assert await local_storage.download("share_photo/user/image") == image_file * 3
+
+
+@pytest.mark.asyncio
+async def test_local_upload_failure_keeps_old_file(local_storage, image_file):
+    await local_storage.upload(image_file, "share_photo/user/image")
+
+    async def broken():
+        yield b"half of a file"
+        raise ConnectionError("client went away")
+
+    class Broken:
+        def __aiter__(self):
+            return broken()
+
+    with pytest.raises(ConnectionError):
+        await local_storage.upload(Broken(), "share_photo/user/image")
+    path = local_storage.path("share_photo/user/image")
+    assert path.read_bytes() == image_file
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+
+@pytest.mark.asyncio
+async def test_local_remove_and_transform(local_storage, image_file):
+    await local_storage.upload(image_file, "share_photo/user/image")
+    transformed = await local_storage.transform(image_file, folder="effects", effect="sepia")
+
+    await local_storage.remove("share_photo/user/image")
+
+    assert await local_storage.download("share_photo/user/image") is None
+    assert await local_storage.download(transformed["public_id"]) == image_file
+    assert transformed["public_id"].startswith("effects/")
+
+
+@pytest.mark.asyncio
+async def test_local_remove_folder(local_storage, tmp_path, image_file):
+    await local_storage.upload(image_file, "share_photo/user/image")
+    await local_storage.upload(image_file, "share_photo/user/avatar")
+    await local_storage.upload(image_file, "share_photo/other/image")
+
+    await local_storage.remove_folder("share_photo/user")
+    await local_storage.remove_folder("share_photo/user")
+
+    assert await local_storage.download("share_photo/user/image") is None
+    assert await local_storage.download("share_photo/user/avatar") is None
+    assert await local_storage.download("share_photo/other/image") == image_file
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["share_photo"]
+
+
+@pytest.mark.asyncio
+async def test_local_paths_stay_in_root(local_storage):
+    with pytest.raises(ValueError):
+        local_storage.path("../../etc/passwd")
+    with pytest.raises(ValueError):
+        await local_storage.remove_folder("share_photo/..")
+
+
+def test_incomplete_storage_is_refused():
+    class Incomplete(Storage):
+        async def upload(self, file, public_id: str):
+            return {}
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.asyncio
+async def test_cloudinary_remove_missing_folder(monkeypatch):
+    monkeypatch.setattr(cloud_client, "delete_prefix", AsyncMock())
+    monkeypatch.setattr(cloud_client, "delete_folder", AsyncMock(side_effect=CloudError(404, "Can't find folder")))
+    await CloudinaryStorage().remove_folder("share_photo/user")
+
+    monkeypatch.setattr(cloud_client, "delete_folder", AsyncMock(side_effect=CloudError(504, "ConnectError")))
+    with pytest.raises(HTTPException) as error:
+        await CloudinaryStorage().remove_folder("share_photo/user")
+    assert error.value.status_code == 502
@@ -0,0 +1,15 @@
+from src.database.models import User
+from src.services import tasks
+
+
+def test_reconcile_images_task(session, monkeypatch):
+    user = User(username="drifted", email="drifted@example.com", password="drifted_password", images_count=3)
+    session.add(user)
+    session.commit()
+    # The task runs in a loop of its own, against the same file as the tests.
+    monkeypatch.setattr(tasks, "url", "sqlite+aiosqlite:///./test.db")
+
+    corrected = tasks.reconcile_images()
+
+    assert corrected == 1
+    assert session.query(User).filter(User.id == user.id).first().images_count == 0
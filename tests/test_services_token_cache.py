@@ -0,0 +1,54 @@
+import time
+
+import pytest
+from jose import JWTError, jwt
+
+from src.services import token_cache
+from src.services.ban_list_redis import auth_ban_list
+from src.services.token_cache import VerifiedTokens, token_digest
+
+
+def encode(seconds: int, key: str = "secret") -> str:
+    return jwt.encode({"sub": "verified@example.com", "exp": int(time.time()) + seconds}, key)
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    calls, decode = [], jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(token_cache.jwt, "decode", counting_decode)
+    return calls
+
+
+def test_token_verified_once(decodes):
+    tokens, token = VerifiedTokens(10), encode(60)
+    assert tokens.decode(token, "secret", "HS256") == tokens.decode(token, "secret", "HS256")
+    assert len(decodes) == 1
+    with pytest.raises(JWTError):
+        tokens.decode(token, "other secret", "HS256")
+
+
+def test_token_verified_again_after_exp(decodes, monkeypatch):
+    tokens, token = VerifiedTokens(10), encode(60)
+    tokens.decode(token, "secret", "HS256")
+    now = time.monotonic()
+    monkeypatch.setattr("src.services.local_cache.time.monotonic", lambda: now + 61)
+    tokens.decode(token, "secret", "HS256")
+    assert len(decodes) == 2
+    with pytest.raises(JWTError):
+        tokens.decode(encode(-1), "secret", "HS256")
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_discarded(monkeypatch):
+    tokens, token = VerifiedTokens(10), encode(60)
+    monkeypatch.setattr(token_cache, "verified_tokens", tokens)
+    monkeypatch.setattr("src.services.ban_list_redis.verified_tokens", tokens)
+    tokens.decode(token, "secret", "HS256")
+    assert tokens.local.get(token_digest(token)) is not None
+    await auth_ban_list.add(token, "logout")
+    assert tokens.local.get(token_digest(token)) is None
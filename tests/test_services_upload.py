@@ -0,0 +1,74 @@
+import hashlib
+import struct
+from io import BytesIO
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from src.services.upload import UploadStream, image_size
+
+
+def upload(content: bytes, size: int | None = None) -> UploadFile:
+    return UploadFile(BytesIO(content), size=len(content) if size is None else size, filename="image")
+
+
+def png(width: int, height: int) -> bytes:
+    return b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+
+
+def test_image_size_of_jpeg_after_metadata():
+    exif = b"\xff\xe1" + struct.pack(">H", 1002) + b"\x00" * 1000
+    jpeg = b"\xff\xd8" + exif + b"\xff\xc0" + struct.pack(">HBHH", 17, 8, 480, 640)
+    assert image_size(jpeg[:500]) is None
+    assert image_size(jpeg) == (640, 480)
+
+
+@pytest.mark.asyncio
+async def test_stream_hashes_chunks(image_file):
+    content = image_file + b"\x00" * 100
+    stream = UploadStream(upload(content), chunk_size=16)
+    await stream.check()
+    chunks = [chunk async for chunk in stream]
+
+    assert (stream.width, stream.height) == (1, 1)
+    assert max(map(len, chunks)) == 16
+    assert b"".join(chunks) == content
+    assert stream.size == len(content)
+    assert stream.sha256 == hashlib.sha256(content).hexdigest()
+    # A second pass, e.g. a retry, sends the whole file again.
+    assert b"".join([chunk async for chunk in stream]) == content
+
+
+@pytest.mark.asyncio
+async def test_declared_size_is_rejected_before_reading(image_file):
+    file = upload(image_file, size=2048)
+    with pytest.raises(HTTPException) as error:
+        await UploadStream(file, max_bytes=1024).check()
+    assert error.value.status_code == 413
+    assert file.file.tell() == 0
+
+
+@pytest.mark.asyncio
+async def test_pixel_limit():
+    with pytest.raises(HTTPException) as error:
+        await UploadStream(upload(png(10000, 10000)), max_pixels=40_000_000).check()
+    assert error.value.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_not_an_image():
+    with pytest.raises(HTTPException) as error:
+        await UploadStream(upload(b"plain text, not an image")).check()
+    assert error.value.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_byte_limit_while_streaming(image_file):
+    # Without a declared size the limit is enforced on the chunks as they are sent.
+    stream = UploadStream(upload(image_file + b"\x00" * 2048, size=0), max_bytes=1024, chunk_size=256)
+    stream.file.size = None
+    await stream.check()
+    with pytest.raises(HTTPException) as error:
+        async for _ in stream:
+            pass
+    assert error.value.status_code == 413